@@ -0,0 +1,266 @@
+"""Offline replay of the scanner's buy and exit rules over stored hourly candles.
+
+Usage: python backtest.py HISTORY_DIR|HISTORY.npz|HISTORY.parquet [--num-symbols N]
+
+HISTORY_DIR is a history_store.HistoryStore directory (the scanner's
+HISTORY_DIR, filled by `python history_store.py sync`); every stored 1h
+symbol is replayed. HISTORY.npz holds one (n, 6) array of ccxt rows [ts,
+open, high, low, close, volume] per symbol, keyed by symbol (save_npz
+writes it). HISTORY.parquet is a long table with a symbol column plus the
+same six columns (needs pyarrow).
+
+Rules replayed once per hourly close, as the live loop does each cycle:
+  - buy: vector_signals.buy_signals (same as check_buy_signal) among the top
+    num_symbols by 24h quote volume, in volume order, skipping symbols that
+    are held or were bought the same UTC day (has_open_position) and
+    stopping at TRADE_MAX open positions; size TRADE_AMOUNT_USD / close.
+  - exit: check_exit_signals' profit target (> PROFIT_TARGET_PCT) and
+    trailing stop (close below the max of the last 5 daily closes by
+    TRAILING_STOP_PCT), checked from the entry hour on.
+The market regime filter (market.get_market_indicator) is not replayed.
+"""
+import argparse
+import heapq
+import os
+import time
+
+import numpy as np
+
+from vector_signals import CLOSE, OPEN, TS, VOLUME, buy_signals
+
+# ------------------ CONFIG ------------------
+TRADE_MAX = int(os.environ.get("TRADE_MAX", 5))
+TRADE_AMOUNT_USD = float(os.environ.get("TRADE_AMOUNT_USD", 50))
+TRAILING_STOP_PCT = float(os.getenv("TRAILING_STOP_PCT", 5))
+PROFIT_TARGET_PCT = float(os.getenv("PROFIT_TARGET_PCT", 10))
+
+HOUR_MS = 60 * 60 * 1000
+DAY_MS = 24 * HOUR_MS
+TRAIL_DAYS = 5  # check_exit_signals: df['close'].tail(5) of the daily candles
+VOLUME_HOURS = 24  # get_top_usdt_symbols ranks by 24h quote volume
+
+
+# ------------------ HISTORY ------------------
+def load_history(path):
+    """Read a history store directory or file into {symbol: (n, 6) float64 array}."""
+    if os.path.isdir(path):
+        from history_store import HistoryStore
+        store = HistoryStore(path)
+        return store.load(store.symbols("1h"), "1h")
+    if path.endswith(".parquet"):
+        import pandas as pd
+        df = pd.read_parquet(path).sort_values(["symbol", "timestamp"])
+        cols = ["timestamp", "open", "high", "low", "close", "volume"]
+        return {sym: g[cols].to_numpy(np.float64) for sym, g in df.groupby("symbol", sort=False)}
+    with np.load(path) as npz:
+        return {sym: npz[sym].astype(np.float64) for sym in npz.files}
+
+
+def save_npz(path, history):
+    np.savez(path, **{sym: np.asarray(rows, dtype=np.float64) for sym, rows in history.items()})
+
+
+def align(history):
+    """Put every symbol on one hourly grid: returns symbols, ts (T,), candles (S, T, 6) nan-padded."""
+    symbols = list(history)
+    start = min(int(rows[0, TS]) for rows in history.values() if len(rows))
+    end = max(int(rows[-1, TS]) for rows in history.values() if len(rows))
+    ts = np.arange(start, end + HOUR_MS, HOUR_MS, dtype=np.int64)
+    candles = np.full((len(symbols), len(ts), 6), np.nan)
+    for i, sym in enumerate(symbols):
+        rows = history[sym]
+        candles[i, (rows[:, TS].astype(np.int64) - start) // HOUR_MS] = rows
+    return symbols, ts, candles
+
+
+# ------------------ REPLAY ------------------
+class Replay:
+    """Vectorized intermediates for one aligned history.
+
+    Everything that does not depend on the strategy parameters (signals,
+    volume ranks, daily closes) is computed once; masks that depend on a
+    parameter are cached per value, so repeated runs with different
+    settings only redo the part that changed.
+    """
+
+    def __init__(self, symbols, ts, candles):
+        self.symbols = symbols
+        self.ts = ts
+        self.candles = candles
+        self.close = candles[..., CLOSE]
+        self.day = ts // DAY_MS
+        self._cache = {}
+
+    def _cached(self, key, fn):
+        if key not in self._cache:
+            self._cache[key] = fn()
+        return self._cache[key]
+
+    def forget(self):
+        """Drop the per-trailing-stop index arrays, the only intermediates that grow with a sweep."""
+        self._cache = {k: v for k, v in self._cache.items() if not (isinstance(k, tuple) and k[0] == "trailing")}
+
+    def signals(self, threshold=None):
+        """Buy-signal mask; threshold additionally requires the signal candle to gain at least that %."""
+        base = self._cached("signals", lambda: buy_signals(self.candles[..., OPEN], self.close,
+                                                           self.candles[..., VOLUME]))
+        if not threshold:
+            return base
+        def compute():
+            open_ = self.candles[..., OPEN]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                return base & ((self.close - open_) / open_ * 100 >= threshold)
+        return self._cached(("signals", threshold), compute)
+
+    def quote_volume(self, hours=VOLUME_HOURS):
+        """Trailing quote volume per symbol and hour (24h is the live universe ranking)."""
+        def compute():
+            qv = np.nan_to_num(self.close * self.candles[..., VOLUME])
+            csum = np.cumsum(qv, axis=1)
+            csum[:, hours:] -= csum[:, :-hours].copy()
+            return csum
+        return self._cached("quote_volume" if hours == VOLUME_HOURS else ("quote_volume", hours), compute)
+
+    def universe(self, num_symbols, hours=VOLUME_HOURS):
+        """Mask of symbols inside the top num_symbols by quote volume at each hour."""
+        if num_symbols is None or num_symbols >= len(self.symbols):
+            return np.ones(self.close.shape, dtype=bool)
+        def compute():
+            order = np.argsort(-self.quote_volume(hours), axis=0, kind="stable")
+            mask = np.zeros(self.close.shape, dtype=bool)
+            np.put_along_axis(mask, order[:num_symbols], True, axis=0)
+            return mask
+        return self._cached(("universe", num_symbols, hours), compute)
+
+    @property
+    def daily_close(self):
+        """(days, last hour index of each day, close of each day per symbol)."""
+        def compute():
+            days, first = np.unique(self.day, return_index=True)
+            last = np.append(first[1:], len(self.day)) - 1
+            # A day's close is its last known hourly close
+            known = np.where(np.isnan(self.close), 0, np.arange(self.close.shape[1]))
+            known = np.maximum.accumulate(known, axis=1)
+            return days, last, np.take_along_axis(self.close, known, axis=1)[:, last]
+        return self._cached("daily_close", compute)
+
+    def prior_daily_high(self, trail_days=TRAIL_DAYS):
+        """Max daily close over the trail_days - 1 days before each hour's day."""
+        def compute():
+            days, _, daily = self.daily_close
+            prior = np.full(daily.shape, np.nan)
+            for k in range(1, trail_days):
+                prior[:, k:] = np.fmax(prior[:, k:], daily[:, :-k])
+            return prior[:, np.searchsorted(days, self.day)]
+        return self._cached(("prior_daily_high", trail_days), compute)
+
+    def next_trailing_stop(self, trailing_stop_pct, trail_days=TRAIL_DAYS):
+        """Index of the first hour >= t where the trailing stop fires (T when never)."""
+        def compute():
+            recent_high = np.fmax(self.prior_daily_high(trail_days), self.close)
+            with np.errstate(invalid="ignore"):
+                fired = self.close < recent_high * (1 - trailing_stop_pct / 100)
+            idx = np.where(fired, np.arange(fired.shape[1]), fired.shape[1])
+            return np.minimum.accumulate(idx[:, ::-1], axis=1)[:, ::-1]
+        return self._cached(("trailing", trailing_stop_pct, trail_days), compute)
+
+    def candidates(self, num_symbols, threshold=None, volume_hours=VOLUME_HOURS):
+        """Buy alerts as (hour index, symbol index) arrays, in the order the live loop handles them."""
+        def compute():
+            s, t = np.nonzero(self.signals(threshold) & self.universe(num_symbols, volume_hours))
+            order = np.lexsort((-self.quote_volume(volume_hours)[s, t], t))
+            return t[order], s[order]
+        return self._cached(("candidates", num_symbols, threshold, volume_hours), compute)
+
+    def run(self, trade_max=TRADE_MAX, trade_amount_usd=TRADE_AMOUNT_USD, trailing_stop_pct=TRAILING_STOP_PCT,
+            profit_target_pct=PROFIT_TARGET_PCT, num_symbols=None, threshold=None,
+            trail_days=TRAIL_DAYS, volume_hours=VOLUME_HOURS):
+        """Replay the history; returns (closed trades, positions still open at the end).
+
+        The defaults are the live rules; threshold, trail_days and
+        volume_hours only exist for tuning. Trades are tuples (symbol index,
+        entry hour, exit hour, entry price, exit price, amount, reason).
+        """
+        cand_t, cand_s = self.candidates(num_symbols, threshold, volume_hours)
+        next_stop = self.next_trailing_stop(trailing_stop_pct, trail_days)
+        close, day, horizon = self.close, self.day, self.close.shape[1]
+
+        holding = {}  # symbol index -> exit hour (horizon while still open at the end)
+        exits = []  # heap of (exit hour, symbol index)
+        last_buy_day = {}
+        trades, still_open = [], []
+        i = 0
+        np_err = np.seterr(invalid="ignore")
+        while i < len(cand_t):
+            t, s = cand_t[i], cand_s[i]
+            # Buy scan runs before the exit check, so a position exiting at hour t still counts at t
+            while exits and exits[0][0] < t:
+                del holding[heapq.heappop(exits)[1]]
+            if len(holding) >= trade_max:
+                if not exits or exits[0][0] >= horizon:
+                    break  # every slot is held to the end of the data
+                i = np.searchsorted(cand_t, exits[0][0], side="right")
+                continue
+            i += 1
+            if s in holding or last_buy_day.get(s) == day[t]:
+                continue
+
+            entry = close[s, t]
+            amount = trade_amount_usd / entry
+            stop = next_stop[s, t]
+            window = close[s, t:min(stop, horizon - 1) + 1]
+            hits = (window - entry) / entry * 100 > profit_target_pct
+            first = hits.argmax()
+            if hits[first]:
+                exit_t, reason = t + first, "profit"
+            elif stop < horizon:
+                exit_t, reason = stop, "trailing_stop"
+            else:
+                exit_t, reason = horizon, None
+
+            holding[s] = exit_t
+            heapq.heappush(exits, (exit_t, s))
+            last_buy_day[s] = day[t]
+            if reason is None:
+                still_open.append((s, t, None, entry, None, amount, None))
+            else:
+                trades.append((s, t, exit_t, entry, close[s, exit_t], amount, reason))
+        np.seterr(**np_err)
+        return trades, still_open
+
+    def positions(self, trades):
+        """Closed trades as a DataFrame shaped like performance_analysis.fetch_positions()."""
+        import pandas as pd
+        df = pd.DataFrame(trades, columns=["symbol", "entry_idx", "exit_idx", "entry_price", "last_price",
+                                           "amount", "reason"])
+        df["symbol"] = [self.symbols[s] for s in df["symbol"]]
+        df["side"] = "sale"  # update_position_exit's value for closed positions
+        df["timestamp"] = pd.to_datetime(self.ts[df["entry_idx"].to_numpy(dtype=np.int64)], unit="ms")
+        df["exit_time"] = pd.to_datetime(self.ts[df["exit_idx"].to_numpy(dtype=np.int64)], unit="ms")
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+        return df[["symbol", "side", "entry_price", "last_price", "amount", "timestamp", "exit_time", "reason"]]
+
+
+def backtest(history, num_symbols=None, **params):
+    """Replay a {symbol: rows} history; returns (positions DataFrame, open positions at the end)."""
+    replay = Replay(*align(history))
+    trades, still_open = replay.run(num_symbols=num_symbols, **params)
+    return replay.positions(trades), still_open
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("history")
+    parser.add_argument("--num-symbols", type=int, default=None, help="trade only the top N by 24h volume")
+    args = parser.parse_args()
+
+    from performance_analysis import analyze_positions
+
+    start_time = time.time()
+    history = load_history(args.history)
+    positions, still_open = backtest(history, num_symbols=args.num_symbols)
+    print(f"⏱️ Backtest of {len(history)} symbols took {time.time() - start_time:.3f}s")
+    print(f"TRADE_MAX={TRADE_MAX} TRADE_AMOUNT_USD={TRADE_AMOUNT_USD} "
+          f"TRAILING_STOP_PCT={TRAILING_STOP_PCT} PROFIT_TARGET_PCT={PROFIT_TARGET_PCT}")
+    print(f"Still open at the end: {len(still_open)}")
+    analyze_positions(positions)
@@ -0,0 +1,112 @@
+"""Time backtest.py on synthetic history and check it against a plain per-hour replay.
+
+Usage: python bench_backtest.py [symbols] [years]
+
+The parity check replays a small slice hour by hour the way the live loop
+would: scanner.check_buy_signal on the last 30 hourly candles, the
+has_open_position / TRADE_MAX checks, then check_exit_signals' profit
+target and trailing stop on daily closes. Both must produce the same trades.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import backtest
+from backtest import DAY_MS, HOUR_MS, PROFIT_TARGET_PCT, TRADE_AMOUNT_USD, TRADE_MAX, TRAILING_STOP_PCT
+from scanner import check_buy_signal, ohlcv_to_df
+
+
+def synthetic_history(num_symbols, hours, seed=7):
+    rng = np.random.default_rng(seed)
+    start = (1_600_000_000_000 // HOUR_MS) * HOUR_MS
+    ts = start + HOUR_MS * np.arange(hours, dtype=np.float64)
+    history = {}
+    for i in range(num_symbols):
+        close = 10 ** rng.uniform(-1, 3) * np.exp(np.cumsum(rng.normal(0, 0.012, hours)))
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, hours))
+        low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, hours))
+        volume = rng.lognormal(10, 0.5, hours)
+        history[f"S{i:03d}/USDT"] = np.column_stack((ts, open_, high, low, close, volume))
+    return history
+
+
+def reference(history):
+    """Hour-by-hour replay with the live functions; returns trades like Replay.run."""
+    symbols = list(history)
+    hours = len(history[symbols[0]])
+    holding, last_buy_day, trades = {}, {}, []
+    for t in range(hours):
+        day = int(history[symbols[0]][t, 0]) // DAY_MS
+        volume_24h = {s: float((history[s][max(t - 23, 0):t + 1, 4] * history[s][max(t - 23, 0):t + 1, 5]).sum())
+                      for s in symbols}
+        for s in sorted(symbols, key=lambda s: -volume_24h[s]):
+            df = check_buy_signal(s, ohlcv_to_df(history[s][max(t - 29, 0):t + 1].tolist()))
+            if not df['buy_signal'].iloc[-1]:
+                continue
+            if s in holding or last_buy_day.get(s) == day:
+                continue
+            if len(holding) >= TRADE_MAX:
+                break
+            price = history[s][t, 4]
+            holding[s] = (t, price, TRADE_AMOUNT_USD / price)
+            last_buy_day[s] = day
+        for s, (entry_t, entry, amount) in list(holding.items()):
+            rows = history[s][:t + 1]
+            last_price = rows[-1, 4]
+            days = rows[:, 0].astype(np.int64) // DAY_MS
+            daily_closes = rows[np.append(days[1:] != days[:-1], True), 4]
+            profit_pct = (last_price - entry) / entry * 100
+            reason = None
+            if profit_pct > PROFIT_TARGET_PCT:
+                reason = "profit"
+            elif last_price < daily_closes[-5:].max() * (1 - TRAILING_STOP_PCT / 100):
+                reason = "trailing_stop"
+            if reason:
+                trades.append((symbols.index(s), entry_t, t, entry, last_price, amount, reason))
+                del holding[s]
+    return sorted(trades, key=lambda tr: (tr[1], tr[0]))
+
+
+def run(num_symbols=300, years=3):
+    # Parity on a slice small enough for the pandas loop
+    small = synthetic_history(6, 24 * 45, seed=1)
+    replay = backtest.Replay(*backtest.align(small))
+    got, _ = replay.run()
+    got = sorted(((int(s), int(t), int(x), e, p, a, r) for s, t, x, e, p, a, r in got), key=lambda tr: (tr[1], tr[0]))
+    expected = reference(small)
+    assert got == expected, f"backtest differs from reference:\n{got[:5]}\n{expected[:5]}"
+    print(f"parity: {len(got)} trades identical to the per-hour replay")
+
+    hours = int(years * 365 * 24)
+    history = synthetic_history(num_symbols, hours)
+    path = os.path.join(tempfile.mkdtemp(), "history.npz")
+    backtest.save_npz(path, history)
+    del history
+
+    start = time.perf_counter()
+    loaded = backtest.load_history(path)
+    t_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    replay = backtest.Replay(*backtest.align(loaded))
+    trades, still_open = replay.run(num_symbols=30)
+    t_run = time.perf_counter() - start
+
+    start = time.perf_counter()
+    again, _ = replay.run(num_symbols=30, trailing_stop_pct=7, profit_target_pct=15)
+    t_rerun = time.perf_counter() - start
+
+    positions = replay.positions(trades)
+    pnl = ((positions['last_price'] - positions['entry_price']) * positions['amount']).sum()
+    print(f"{num_symbols} symbols x {hours} hours ({num_symbols * hours / 1e6:.1f}M candles)")
+    print(f"load {t_load:.2f}s  replay {t_run:.2f}s  re-run with new exits {t_rerun:.2f}s")
+    print(f"{len(trades)} closed trades, {len(still_open)} open at the end, PnL ${pnl:.2f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -0,0 +1,41 @@
+"""Compare per-cycle request count and rows fetched: full refetch vs CandleStore.
+
+Usage: python bench_candle_cache.py [symbols] [cycles]
+"""
+import sys
+
+from candle_cache import CandleStore
+from fake_exchange import FakeExchange
+
+CYCLE_MS = 300_000  # scanner sleeps 300s between cycles
+
+
+def run(num_symbols=100, cycles=24, timeframe='1h', limit=30):
+    start_ms = 1_700_000_000_000
+    full = FakeExchange(num_symbols=num_symbols, latency=0, now_ms=start_ms)
+    cached = FakeExchange(num_symbols=num_symbols, latency=0, now_ms=start_ms)
+    store = CandleStore(cached, max_age=0)
+    symbols = full.symbols
+
+    for cycle in range(cycles):
+        full.now_ms = cached.now_ms = start_ms + cycle * CYCLE_MS
+        expected = [full.fetch_ohlcv(s, timeframe, limit=limit) for s in symbols]
+        got = store.refresh(symbols, timeframe, limit)
+        for rows, arr in zip(expected, got):
+            assert arr.shape == (limit, 6) and arr.tolist() == rows
+
+    # the first cycle warms the cache; report the steady state
+    warm_rows = num_symbols * limit
+    print(f"{num_symbols} symbols x {cycles} cycles of {timeframe}/{limit}")
+    print(f"  full refetch: {full.calls['fetch_ohlcv']} requests, {full.rows_served} rows")
+    print(f"  candle cache: {cached.calls['fetch_ohlcv']} requests, {cached.rows_served} rows "
+          f"({warm_rows} of them on the warm-up cycle)")
+    steady_full = full.rows_served - warm_rows
+    steady_cached = cached.rows_served - warm_rows
+    print(f"  steady-state rows per cycle: {steady_full / (cycles - 1):.0f} -> {steady_cached / (cycles - 1):.0f} "
+          f"({100 * (1 - steady_cached / steady_full):.1f}% fewer)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
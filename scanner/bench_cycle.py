@@ -0,0 +1,202 @@
+"""End-to-end poll-loop benchmark: scanner.poll_cycle against FakeExchange, the Telegram stub and Postgres.
+
+Needs a reachable Postgres configured through DB_HOST/DB_NAME/DB_USER/DB_PASS;
+everything else is local.
+Usage: python bench_cycle.py [--cycles N] [--symbols M] [--latency S] ...
+
+Runs the real poll cycle (buy scan, alerts, orders, exit checks, position
+writes, signal batches, Telegram messages and charts) N times over M
+symbols. The exchange clock advances --step seconds per cycle, so candles
+close and caches expire as in production without waiting for them. Orders
+are paper trades; the account balance and market regime, which come from
+Binance outside ccxt, are fixed (balance available, market bullish).
+Postgres is used through a scratch schema that is dropped afterwards.
+
+Reported: cycles/sec, p50/p99 cycle latency (first, cold cycle excluded),
+exchange requests and weight per endpoint, rate-limit rejections, DB
+round-trips per statement (from metrics.DB) and Telegram requests.
+--save writes the summary as JSON; --baseline compares against one and
+exits non-zero if throughput or p99 regressed by more than --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+
+import numpy as np
+import psycopg2
+
+import db
+import fetcher
+import metrics
+import migrate
+import scanner
+from candle_cache import CandleStore
+from fake_exchange import FakeExchange
+from history_store import HistoryStore
+from markets_cache import MarketCache
+from notifier import TelegramNotifier
+from position_book import PositionBook
+from telegram_stub import TelegramStub
+from tickers import TickerSnapshot
+
+SCHEMA = "bench_cycle"
+START_MS = 1_700_000_000_000
+
+
+def db_counts():
+    return {labels[0]: sum(row[:-1]) for labels, row in metrics.DB.series.items()}
+
+
+def setup(args, tmp):
+    """Point scanner's module-level services at the stand-ins."""
+    if args.history:
+        exchange = FakeExchange.from_history(HistoryStore(args.history), latency=args.latency, jitter=args.jitter,
+                                             rate_limit=args.rate_limit)
+    else:
+        exchange = FakeExchange(num_symbols=args.symbols * 2, latency=args.latency, jitter=args.jitter,
+                                rate_limit=args.rate_limit, now_ms=START_MS)
+    scanner.exchange = exchange
+    scanner.candle_store = CandleStore(exchange, max_age=0)  # freshness follows the exchange clock
+    scanner.ticker_snapshot = TickerSnapshot(exchange)
+    scanner.market_cache = MarketCache(exchange, path=f"{tmp}/markets.json")
+    scanner.position_book = PositionBook()
+    scanner.NUM_SYMBOLS = args.symbols
+    scanner.get_USDT_balance = lambda: 1e6
+    scanner.get_flow_balance = lambda: 0.0
+    scanner.get_market_indicator = lambda: True
+
+    stub = TelegramStub(latency=args.telegram_latency, quiet=True).start()
+    scanner.notifier = TelegramNotifier(token="bench", chat_id="1", base_url=stub.url)
+    return exchange, stub
+
+
+def age(seconds):
+    """Let the wall-clock TTLs and the weight budget see the simulated time between cycles."""
+    limiter = fetcher.limiter
+    with limiter.lock:
+        limiter.tokens = min(limiter.capacity, limiter.tokens + seconds * limiter.rate)
+    scanner.ticker_snapshot.fetched_at = (scanner.ticker_snapshot.fetched_at or 0) - seconds
+    scanner.market_cache.fetched_at -= seconds
+    if scanner.position_book.loaded_at is not None:
+        scanner.position_book.loaded_at -= seconds
+
+
+def run(args):
+    scanner.chart_renderer.start()
+    db.DB_CONFIG["options"] = f"-c search_path={SCHEMA}"
+    conn = psycopg2.connect(**db.DB_CONFIG)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    conn.commit()
+    try:
+        migrate.migrate(conn)
+        with tempfile.TemporaryDirectory() as tmp:
+            exchange, stub = setup(args, tmp)
+            times = []
+            calls, db_before = exchange.calls.copy(), db_counts()
+            weight = dict(metrics.REQUEST_WEIGHT.values)
+            output = io.StringIO()
+            for _ in range(args.cycles):
+                with contextlib.redirect_stdout(output if not args.verbose else sys.stdout):
+                    start = time.perf_counter()
+                    scanner.poll_cycle()
+                    times.append(time.perf_counter() - start)
+                exchange.advance(args.step)
+                age(args.step)
+            with contextlib.redirect_stdout(output if not args.verbose else sys.stdout):
+                scanner.signal_writer.flush()
+                scanner.notifier.close()
+            stub.stop()
+            with conn.cursor() as cur:
+                cur.execute("SELECT count(*) FILTER (WHERE status = 'open'), count(*) FILTER (WHERE status = 'closed'),"
+                            " (SELECT count(*) FROM crypto_signals) FROM positions")
+                open_positions, closed, signals = cur.fetchone()
+    finally:
+        db.close_pool()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+    steady = np.array(times[1:] or times)
+    db_after = db_counts()
+    summary = {
+        "cycles": args.cycles,
+        "symbols": args.symbols,
+        "latency": args.latency,
+        "cold_cycle": times[0],
+        "cycles_per_sec": float(len(steady) / steady.sum()),
+        "p50": float(np.percentile(steady, 50)),
+        "p99": float(np.percentile(steady, 99)),
+        "requests": {k: v - calls.get(k, 0) for k, v in exchange.calls.items() if v - calls.get(k, 0)},
+        "weight": {k[0]: v - weight.get(k, 0) for k, v in metrics.REQUEST_WEIGHT.values.items()
+                   if v - weight.get(k, 0)},
+        "rate_limited": exchange.rejected,
+        "db_round_trips": {k: v - db_before.get(k, 0) for k, v in db_after.items() if v - db_before.get(k, 0)},
+        "telegram_requests": len(stub.requests) + stub.rate_limited,
+        "positions_open": open_positions,
+        "positions_closed": closed,
+        "signals": signals,
+    }
+    return summary
+
+
+def report(s):
+    print(f"{s['cycles']} cycles over {s['symbols']} symbols, exchange latency {s['latency'] * 1000:.0f}ms")
+    print(f"  cold cycle   {s['cold_cycle'] * 1000:9.1f}ms")
+    print(f"  cycles/sec   {s['cycles_per_sec']:9.2f}")
+    print(f"  p50 / p99    {s['p50'] * 1000:9.1f}ms / {s['p99'] * 1000:.1f}ms")
+    requests = sum(s["requests"].values())
+    print(f"  requests     {requests:9d}  ({requests / s['cycles']:.1f}/cycle) "
+          + ", ".join(f"{k}={v}" for k, v in sorted(s["requests"].items())))
+    print(f"  weight       {sum(s['weight'].values()):9d}  rate limited: {s['rate_limited']}")
+    trips = sum(s["db_round_trips"].values())
+    print(f"  DB trips     {trips:9d}  ({trips / s['cycles']:.2f}/cycle) "
+          + ", ".join(f"{k}={v}" for k, v in sorted(s["db_round_trips"].items())))
+    print(f"  telegram     {s['telegram_requests']:9d}")
+    print(f"  positions    {s['positions_open']} open, {s['positions_closed']} closed; {s['signals']} signals stored")
+
+
+def compare(summary, baseline, tolerance):
+    """Names of the metrics that regressed by more than tolerance against baseline."""
+    regressed = []
+    if summary["cycles_per_sec"] < baseline["cycles_per_sec"] * (1 - tolerance):
+        regressed.append("cycles_per_sec")
+    if summary["p99"] > baseline["p99"] * (1 + tolerance):
+        regressed.append("p99")
+    for key in ("requests", "db_round_trips"):
+        if sum(summary[key].values()) > sum(baseline[key].values()):
+            regressed.append(key)
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument("--symbols", type=int, default=100, help="scan universe; the market lists twice as many")
+    parser.add_argument("--step", type=float, default=300, help="simulated seconds between cycles")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per exchange request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random seconds per request")
+    parser.add_argument("--rate-limit", type=int, default=None, help="exchange weight per minute before 429s")
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--history", help="replay a history_store directory instead of synthetic candles")
+    parser.add_argument("--save", help="write the summary to this JSON file")
+    parser.add_argument("--baseline", help="compare against a summary saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--verbose", action="store_true", help="show the scanner's own output")
+    args = parser.parse_args()
+
+    summary = run(args)
+    report(summary)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(summary, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(summary, json.load(f), args.tolerance)
+        print(f"{'❌ regressed: ' + ', '.join(regressed) if regressed else '✅ within tolerance of the baseline'}")
+        sys.exit(1 if regressed else 0)
@@ -0,0 +1,47 @@
+"""Per-call latency of a typical scanner query: connect-per-call vs the shared pool.
+
+Needs a reachable Postgres configured through DB_HOST/DB_NAME/DB_USER/DB_PASS.
+Usage: python bench_db.py [calls]
+"""
+import statistics
+import sys
+import time
+
+import psycopg2
+
+import db
+
+QUERY = "SELECT COUNT(*) FROM positions WHERE status='open'"
+
+
+def connect_per_call():
+    conn = psycopg2.connect(**db.DB_CONFIG)
+    cur = conn.cursor()
+    cur.execute(QUERY)
+    cur.fetchone()
+    cur.close()
+    conn.close()
+
+
+def pooled():
+    db.fetchone(QUERY)
+
+
+def measure(fn, calls):
+    fn()  # warm up (first pooled call opens the pool)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.mean(samples), samples[len(samples) // 2], samples[int(len(samples) * 0.99) - 1]
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{calls} calls of: {QUERY}")
+    print(f"{'':>18} {'mean':>9} {'p50':>9} {'p99':>9}")
+    for name, fn in (("connect per call", connect_per_call), ("pooled", pooled)):
+        mean, p50, p99 = measure(fn, calls)
+        print(f"{name:>18} {mean:>7.2f}ms {p50:>7.2f}ms {p99:>7.2f}ms")
@@ -0,0 +1,34 @@
+"""Benchmark sequential vs concurrent OHLCV fetching against FakeExchange.
+
+Usage: python bench_fetch.py [latency_seconds]
+"""
+import sys
+import time
+
+from fake_exchange import FakeExchange
+from fetcher import FETCH_WORKERS, fetch_ohlcv_many
+
+
+def run(latency):
+    print(f"latency={latency * 1000:.0f}ms workers={FETCH_WORKERS}")
+    print(f"{'symbols':>8} {'sequential':>12} {'concurrent':>12} {'speedup':>8}")
+    for n in (30, 100, 300):
+        exchange = FakeExchange(num_symbols=n, latency=latency)
+        symbols = exchange.symbols
+
+        start = time.perf_counter()
+        sequential = [exchange.fetch_ohlcv(s, '1h', limit=30) for s in symbols]
+        t_seq = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = fetch_ohlcv_many(exchange, symbols, timeframe='1h', limit=30)
+        t_con = time.perf_counter() - start
+
+        # results must come back in input order
+        assert [rows[-1][0] for rows in concurrent] == [rows[-1][0] for rows in sequential]
+        assert [rows[0][4] for rows in concurrent] == [rows[0][4] for rows in sequential]
+        print(f"{n:>8} {t_seq:>11.2f}s {t_con:>11.2f}s {t_seq / t_con:>7.1f}x")
+
+
+if __name__ == "__main__":
+    run(float(sys.argv[1]) if len(sys.argv) > 1 else 0.05)
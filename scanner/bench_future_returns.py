@@ -0,0 +1,108 @@
+"""update_future_returns on a large pending backlog, against FakeExchange and Postgres.
+
+Needs a reachable Postgres configured through DB_HOST/DB_NAME/DB_USER/DB_PASS.
+Usage: python bench_future_returns.py [signals] [symbols] [days]
+
+Seeds a scratch schema with `signals` pending crypto_signals rows spread
+over `symbols` symbols and the last `days` days, then times one
+update_future_returns pass (the backlog) and a second one (nothing left but
+the rows still waiting for their 24h candle). Candles come from FakeExchange
+with a small per-request latency through an in-memory CandleStore. A sample
+of the results is checked against the old per-row lookup: the closes 6 and
+24 candles after fetch_ohlcv(since=signal time). The schema is dropped
+afterwards.
+"""
+import contextlib
+import io
+import random
+import sys
+import time
+
+import psycopg2
+
+import db
+import migrate
+import scanner
+from candle_cache import CandleStore
+from fake_exchange import FakeExchange
+
+SCHEMA = "bench_future_returns"
+SAMPLE = 200
+
+SEED_SQL = """
+    INSERT INTO crypto_signals (symbol, timestamp, close_price)
+    SELECT 'C' || lpad((i %% %(symbols)s)::text, 3, '0') || '/USDT',
+           LOCALTIMESTAMP - INTERVAL '7 hours' - i * (INTERVAL '1 day' * %(days)s / %(signals)s), 100
+    FROM generate_series(1, %(signals)s) i
+"""
+
+
+def timed_pass(exchange):
+    calls = sum(exchange.calls.values())
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        scanner.update_future_returns()
+        elapsed = time.perf_counter() - start
+    errors = [line for line in output.getvalue().splitlines() if line.startswith("❌")]
+    if errors:
+        raise RuntimeError(errors[0])
+    return elapsed, sum(exchange.calls.values()) - calls
+
+
+def reference_mismatches(cur, exchange):
+    """Sampled rows whose futures differ from the old per-row since=/iloc lookup."""
+    cur.execute("SELECT symbol, timestamp, future_6h, future_24h FROM crypto_signals WHERE future_24h IS NOT NULL")
+    rows = random.Random(0).sample(cur.fetchall(), SAMPLE)
+    mismatches = 0
+    for symbol, ts, future_6h, future_24h in rows:
+        closes = [row[4] for row in exchange.fetch_ohlcv(symbol, "1h", since=int(ts.timestamp() * 1000), limit=30)]
+        if abs(closes[6] - future_6h) > 1e-9 or abs(closes[24] - future_24h) > 1e-9:
+            mismatches += 1
+    return mismatches
+
+
+def run(signals=100_000, symbols=50, days=30):
+    db.DB_CONFIG["options"] = f"-c search_path={SCHEMA}"
+    conn = psycopg2.connect(**db.DB_CONFIG)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+    conn.commit()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            migrate.migrate(conn)
+        with conn.cursor() as cur:
+            cur.execute(SEED_SQL, {"signals": signals, "symbols": symbols, "days": days})
+        conn.commit()
+
+        exchange = FakeExchange(num_symbols=symbols, latency=0.02)
+        scanner.exchange = exchange
+        scanner.candle_store = CandleStore(exchange)
+        print(f"{signals} pending signals over {symbols} symbols and {days} days, exchange latency 20ms")
+
+        for name in ("backlog", "again"):
+            elapsed, requests = timed_pass(exchange)
+            with conn.cursor() as cur:
+                cur.execute("SELECT count(*) FILTER (WHERE future_6h IS NOT NULL),"
+                            " count(*) FILTER (WHERE future_24h IS NOT NULL) FROM crypto_signals")
+                resolved_6h, resolved_24h = cur.fetchone()
+            conn.commit()
+            print(f"  {name:<8} {elapsed:7.2f}s  {requests:5d} requests  "
+                  f"{resolved_6h} with future_6h, {resolved_24h} with future_24h")
+
+        with conn.cursor() as cur:
+            mismatches = reference_mismatches(cur, exchange)
+        print(f"{'✅' if not mismatches else '❌'} {SAMPLE - mismatches}/{SAMPLE} sampled rows match the per-row lookup")
+        return mismatches == 0
+    finally:
+        db.close_pool()
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    ok = run(*(int(a) for a in sys.argv[1:4]))
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,57 @@
+"""Cold-start import budget for the scanner entry points.
+
+Usage: python bench_importtime.py [module ...]
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter a few
+times, reports the best total and the heaviest imports, and exits non-zero
+when a module is over IMPORT_BUDGET_MS or pulls in one of the libraries that
+must only load on first use (pandas, matplotlib, mplfinance, python-binance,
+websockets).
+"""
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", 1000))
+RUNS = 3
+MODULES = ["scanner", "market", "get_list", "launchpad", "run_market_cap", "query_db"]
+LAZY = {"pandas", "matplotlib", "mplfinance", "binance", "websockets"}
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def importtime(module):
+    """One cold import; returns (total_ms, {module: cumulative_ms})."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=HERE, capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        cumulative[name] = max(cumulative.get(name, 0), int(cum) / 1000)
+    return cumulative[module], cumulative
+
+
+def run(modules):
+    failed = False
+    print(f"budget={IMPORT_BUDGET_MS:.0f}ms best of {RUNS}")
+    for module in modules:
+        best, cumulative = min((importtime(module) for _ in range(RUNS)), key=lambda r: r[0])
+        loaded = sorted(LAZY & {name.split(".")[0] for name in cumulative})
+        heaviest = sorted(((ms, name) for name, ms in cumulative.items()
+                           if "." not in name and name not in (module, "site")), reverse=True)[:5]
+        ok = best <= IMPORT_BUDGET_MS and not loaded
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {module:<16} {best:>8.1f}ms  "
+              f"heaviest: {', '.join(f'{name} {ms:.0f}ms' for ms, name in heaviest)}")
+        if loaded:
+            print(f"   eagerly imports {', '.join(loaded)}")
+    return failed
+
+
+if __name__ == "__main__":
+    sys.exit(1 if run(sys.argv[1:] or MODULES) else 0)
@@ -0,0 +1,108 @@
+"""Check StreamingIndicators against the pandas indicator code and time both.
+
+Usage: python bench_indicators.py [candles]
+
+Also checks IndicatorBook over many syncs of a sliding fetch window, as the
+scanner calls it: the values must match pandas over every candle since the
+state was seeded. The gap to pandas over just the latest window is printed
+for reference; it is expected to grow as the EMAs outgrow the window.
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import IndicatorBook, StreamingIndicators
+from market import compute_indicators
+from scanner import add_indicators
+
+TOLERANCE = 1e-8
+
+
+def run(length=1000):
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+
+    start = time.perf_counter()
+    ref = add_indicators(pd.DataFrame({"close": close}))
+    ref_market = compute_indicators(pd.DataFrame({"close": close}))
+    ref_gc_short = pd.Series(close).ewm(span=50).mean()  # check_golden_cross
+    ref_gc_long = pd.Series(close).ewm(span=200).mean()
+    t_pandas = time.perf_counter() - start
+
+    state = StreamingIndicators()
+    got = {key: [] for key in ("ema50", "ema200", "rsi", "macd", "signal",
+                               "ema20_adj", "ema50_adj", "ema200_adj", "rsi_market")}
+    start = time.perf_counter()
+    for i, c in enumerate(close):
+        values = state.update(i, float(c))
+        for key in got:
+            got[key].append(values[key])
+    t_stream = time.perf_counter() - start
+
+    pairs = [
+        ("ema50", ref["ema50"]), ("ema200", ref["ema200"]), ("rsi", ref["rsi"]),
+        ("macd", ref["macd"]), ("signal", ref["signal"]),
+        ("ema50_adj", ref_gc_short), ("ema200_adj", ref_gc_long),
+        ("ema20_adj", ref_market["ema20"]), ("rsi_market", ref_market["rsi"]),
+    ]
+    for key, expected in pairs:
+        expected = expected.to_numpy()
+        actual = np.array(got[key])
+        assert np.array_equal(np.isnan(expected), np.isnan(actual)), key
+        diff = np.nanmax(np.abs(expected - actual) / np.maximum(1, np.abs(expected)))
+        assert diff < TOLERANCE, (key, diff)
+        print(f"  {key:<11} max rel diff {diff:.2e}")
+
+    restored = StreamingIndicators.restore(state.snapshot())
+    assert restored.update(length, 101.0) == state.update(length, 101.0)
+
+    print(f"{length} candles: pandas full recompute {t_pandas * 1000:.2f}ms, "
+          f"streaming {t_stream / length * 1e6:.2f}us per candle update")
+
+
+def reference(close):
+    """Latest pandas value of each StreamingIndicators key over `close`."""
+    df = add_indicators(pd.DataFrame({"close": close}))
+    market = compute_indicators(pd.DataFrame({"close": close}))
+    series = {key: df[key] for key in ("ema50", "ema200", "rsi", "macd", "signal")}
+    series["ema50_adj"] = pd.Series(close).ewm(span=50).mean()
+    series["ema200_adj"] = pd.Series(close).ewm(span=200).mean()
+    series["ema20_adj"] = market["ema20"]
+    series["rsi_market"] = market["rsi"]
+    return {key: float(s.iloc[-1]) for key, s in series.items()}
+
+
+def rel_diff(a, b):
+    if np.isnan(a) or np.isnan(b):
+        return 0.0 if np.isnan(a) and np.isnan(b) else np.inf
+    return abs(a - b) / max(1, abs(b))
+
+
+def run_sliding(syncs=1000, window=250, check_every=50):
+    """IndicatorBook.sync over `syncs` one-candle steps of a `window`-row fetch."""
+    rng = np.random.default_rng(5)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, window + syncs)))
+    rows = np.column_stack([np.arange(len(close)), close, close, close, close, np.ones(len(close))])
+    book = IndicatorBook()
+    worst = {}
+    window_gap = {}
+    for step in range(syncs + 1):
+        end = window + step
+        values = book.sync("X/USDT", "1h", rows[end - window:end])
+        if step % check_every:
+            continue
+        full, latest = reference(close[:end]), reference(close[end - window:end])
+        for key, expected in full.items():
+            worst[key] = max(worst.get(key, 0.0), rel_diff(values[key], expected))
+            window_gap[key] = max(window_gap.get(key, 0.0), rel_diff(values[key], latest[key]))
+    print(f"{syncs} syncs of a {window}-candle window, checked every {check_every}:")
+    for key in worst:
+        assert worst[key] < TOLERANCE, (key, worst[key])
+        print(f"  {key:<11} max rel diff {worst[key]:.2e} (vs latest window only: {window_gap[key]:.2e})")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
+    run_sliding()
@@ -0,0 +1,96 @@
+"""Cost of the metrics layer on a scan cycle against FakeExchange.
+
+Usage: python bench_metrics.py [symbols] [rounds]
+
+A cycle is the poll loop's in-process work without the database: a forced
+ticker snapshot, the buy scan over every symbol and exit checks on
+OPEN_POSITIONS daily series. "cold" uses a fresh candle cache each cycle (a
+request per symbol, the most spans per cycle); "warm" serves everything from
+the cache (the least work per span). The exchange has no injected latency,
+so the cycle is pure CPU and the overhead is the worst case.
+
+Runs with METRICS_ENABLED on and off are interleaved and the median of
+`rounds` is kept for each. Cold cycles fan out over the fetch threads, so
+their A/B difference is noisy; it is complemented by an estimate:
+observations per cycle times the measured cost of one span. Off still reads
+perf_counter_ns in spans, so both numbers slightly understate the cost.
+"""
+import contextlib
+import io
+import statistics
+import sys
+import time
+
+import fetcher
+import metrics
+import scanner
+from candle_cache import CandleStore
+from fake_exchange import FakeExchange
+from tickers import TickerSnapshot
+
+OPEN_POSITIONS = 5
+
+
+def observations():
+    return sum(sum(row[:-1]) for m in metrics._metrics if isinstance(m, metrics.Histogram) for row in m.series.values())
+
+
+def span_cost(n=100_000):
+    """Nanoseconds per span(), enter to observe."""
+    hist = metrics.Histogram("bench_span_seconds", "span micro-benchmark", ("span",))
+    metrics._metrics.remove(hist)
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        with metrics.span("bench", hist):
+            pass
+    return (time.perf_counter_ns() - start) / n
+
+
+def cycle(exchange, symbols, cold):
+    if cold:
+        scanner.candle_store = CandleStore(exchange)
+    scanner.ticker_snapshot.refresh(force=True)
+    scanner.scan_symbols_last_day(len(symbols), symbols=symbols)
+    held = symbols[:OPEN_POSITIONS]
+    for sym, rows in zip(held, scanner.candle_store.refresh(held, timeframe='1d', limit=30)):
+        candles = scanner.Candles.of(sym, rows)
+        scanner.check_exit_signals(candles, candles.close[0], candles.last_close, sym, 1.0, None)
+
+
+def timed_cycle(exchange, symbols, cold, enabled):
+    metrics.METRICS_ENABLED = enabled
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        cycle(exchange, symbols, cold)
+        return time.perf_counter() - start
+
+
+def run(num_symbols=300, rounds=40):
+    exchange = FakeExchange(num_symbols=num_symbols, latency=0, now_ms=1_700_000_000_000)
+    fetcher.limiter = fetcher.WeightLimiter(10**12)  # measure the cycle, not the request budget
+    symbols = exchange.symbols
+    scanner.candle_store = CandleStore(exchange)
+    scanner.ticker_snapshot = TickerSnapshot(exchange)
+    per_span = span_cost()
+    print(f"{num_symbols} symbols, {rounds} rounds, span cost {per_span:.0f}ns")
+    print(f"{'':>5} {'off':>9} {'on':>9} {'A/B':>7} {'spans':>6} {'estimate':>9}")
+    for mode in ("cold", "warm"):
+        cold = mode == "cold"
+        timed_cycle(exchange, symbols, cold, True)  # warm up imports and caches
+        times = {True: [], False: []}
+        for _ in range(rounds):
+            for enabled in (False, True):
+                times[enabled].append(timed_cycle(exchange, symbols, cold, enabled))
+        median = {enabled: statistics.median(t) for enabled, t in times.items()}
+        before = observations()
+        timed_cycle(exchange, symbols, cold, True)
+        spans = observations() - before
+        ab = (median[True] - median[False]) / median[False] * 100
+        estimate = spans * per_span / 1e9 / median[False] * 100
+        print(f"{mode:>5} {median[False] * 1000:>7.1f}ms {median[True] * 1000:>7.1f}ms {ab:>6.2f}% {spans:>6} {estimate:>8.2f}%")
+    metrics.METRICS_ENABLED = True
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 40)
@@ -0,0 +1,139 @@
+"""Memory per trading cycle: DataFrames in the hot loop vs records.py.
+
+Usage: python bench_records.py [symbols] [cycles]
+
+One cycle is what the poll loop does in memory after its fetches: take a
+ticker snapshot of the whole market, rank it, evaluate the buy rule on the
+last 30 hourly candles of every symbol, keep the alerts, and run the exit
+rule on the daily candles of TRADE_MAX open positions. Variants:
+  per-symbol frames  ohlcv_to_df + check_buy_signal for every symbol,
+                     ccxt ticker dicts, DataFrames for exits
+  frames at edges    batch signal check, DataFrames only for alerts and
+                     exits (the loop before records.py)
+  records            batch signal check, Candles / Ticker / Position
+Each variant runs in its own forked process. Reported: tracemalloc peak and
+bytes still held after a cycle (both under tracing), the untraced time per
+cycle, and how far the cycles raise peak RSS.
+"""
+import multiprocessing as mp
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import scanner
+from bench_signals import synthetic_candles
+from records import Candles, Position, Ticker
+from vector_signals import latest_buy_signals, stack_candles
+
+MARKET_SYMBOLS = 2500  # tickers in a whole-market snapshot
+OPEN_POSITIONS = 5
+LIMIT = 30
+
+
+def ccxt_ticker(i, rng):
+    """A ticker dict shaped like ccxt's Binance parse_ticker output, raw `info` included."""
+    price = float(rng.uniform(0.01, 1000))
+    info = {k: f"{price * rng.uniform(0.9, 1.1):.8f}" for k in (
+        "priceChange", "priceChangePercent", "weightedAvgPrice", "prevClosePrice", "lastPrice", "lastQty",
+        "bidPrice", "bidQty", "askPrice", "askQty", "openPrice", "highPrice", "lowPrice", "volume", "quoteVolume")}
+    info.update(symbol=f"C{i:04d}USDT", openTime=1_700_000_000_000, closeTime=1_700_086_400_000,
+                firstId=1, lastId=100_000, count=100_000)
+    return {"symbol": f"C{i:04d}/USDT", "timestamp": 1_700_086_400_000, "datetime": "2023-11-15T22:13:20.000Z",
+            "high": price * 1.05, "low": price * 0.95, "bid": price, "bidVolume": 10.0, "ask": price, "askVolume": 10.0,
+            "vwap": price, "open": price, "close": price, "last": price, "previousClose": price, "change": 0.0,
+            "percentage": 0.0, "average": price, "baseVolume": 1e6, "quoteVolume": 1e6 * price, "info": info}
+
+
+def fetch_tickers(rng):
+    return {t["symbol"]: t for t in (ccxt_ticker(i, rng) for i in range(MARKET_SYMBOLS))}
+
+
+def per_symbol_frames(hourly, daily, positions, rng, held):
+    tickers = fetch_tickers(rng)
+    ranked = sorted(tickers, key=lambda s: tickers[s]["quoteVolume"] or 0, reverse=True)[:len(hourly)]
+    alerts = []
+    for sym, rows in zip(ranked, hourly):
+        df = scanner.check_buy_signal(sym, scanner.ohlcv_to_df(rows))
+        if df['buy_signal'].iloc[-1]:
+            alerts.append((sym, df))
+    for (pos_id, sym, side, entry_price, amount), rows in zip(positions, daily):
+        df = scanner.add_indicators(scanner.ohlcv_to_df(rows))
+        df['close'].tail(5).max()
+    held[:] = [tickers, alerts]
+
+
+def frames_at_edges(hourly, daily, positions, rng, held):
+    tickers = fetch_tickers(rng)
+    ranked = sorted(tickers, key=lambda s: tickers[s]["quoteVolume"] or 0, reverse=True)[:len(hourly)]
+    signalled = latest_buy_signals(stack_candles(hourly, LIMIT))
+    alerts = [(sym, scanner.check_buy_signal(sym, scanner.ohlcv_to_df(rows)))
+              for sym, rows, hit in zip(ranked, hourly, signalled) if hit]
+    for (pos_id, sym, side, entry_price, amount), rows in zip(positions, daily):
+        df = scanner.add_indicators(scanner.ohlcv_to_df(rows))
+        df['close'].tail(5).max()
+    held[:] = [tickers, alerts]
+
+
+def records(hourly, daily, positions, rng, held):
+    tickers = {s: Ticker.from_ccxt(t) for s, t in fetch_tickers(rng).items()}
+    ranked = sorted(tickers, key=lambda s: tickers[s].quote_volume or 0, reverse=True)[:len(hourly)]
+    signalled = latest_buy_signals(stack_candles(hourly, LIMIT))
+    alerts = [(sym, Candles.of(sym, rows)) for sym, rows, hit in zip(ranked, hourly, signalled) if hit]
+    for pos, rows in zip(positions, daily):
+        Candles.of(pos.symbol, rows).close[-5:].max()
+    held[:] = [tickers, alerts]
+
+
+VARIANTS = {"per-symbol frames": per_symbol_frames, "frames at edges": frames_at_edges, "records": records}
+
+
+def measure(name, num_symbols, cycles, out):
+    cycle = VARIANTS[name]
+    hourly = synthetic_candles(num_symbols, LIMIT)
+    daily = synthetic_candles(OPEN_POSITIONS, LIMIT, seed=3)
+    positions = [Position(i, f"P{i}/USDT", "buy", 1.0, 10.0) for i in range(OPEN_POSITIONS)]
+    if name != "records":
+        positions = [(p.id, p.symbol, p.side, p.entry_price, p.amount) for p in positions]
+    rng = np.random.default_rng(1)
+    held = []
+    cycle(hourly, daily, positions, rng, held)  # warm up pandas / numpy caches
+    held.clear()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    cycle(hourly, daily, positions, rng, held)
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = len(tracemalloc.take_snapshot().traces)
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(cycles):
+        cycle(hourly, daily, positions, rng, held)
+    elapsed = (time.perf_counter() - start) / cycles
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    out.put((peak - base, current - base, blocks, elapsed, (rss_after - rss_before) / 1024,
+             len(held[1])))
+
+
+def run(num_symbols=300, cycles=10):
+    ctx = mp.get_context("fork")
+    print(f"{num_symbols} symbols, {MARKET_SYMBOLS} tickers, {OPEN_POSITIONS} positions, {cycles} cycles per variant")
+    print(f"{'':>18} {'peak':>10} {'held':>10} {'blocks':>8} {'cycle':>9} {'+RSS':>8} {'alerts':>7}")
+    for name in VARIANTS:
+        out = ctx.Queue()
+        proc = ctx.Process(target=measure, args=(name, num_symbols, cycles, out))
+        proc.start()
+        peak, held, blocks, elapsed, rss, alerts = out.get()
+        proc.join()
+        print(f"{name:>18} {peak / 2**20:>8.2f}MB {held / 2**20:>8.2f}MB {blocks:>8} "
+              f"{elapsed * 1000:>7.1f}ms {rss:>6.1f}MB {alerts:>7}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10)
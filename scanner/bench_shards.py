@@ -0,0 +1,57 @@
+"""Buy-scan throughput of the sharded scanner against FakeExchange.
+
+Usage: python bench_shards.py [symbols] [latency]
+
+Runs scanner.scan_shard in ShardPools of 1, 2 and 4 processes, each worker
+with its own FakeExchange-backed CandleStore, and reports the cold cycle
+(full history fetch) and warm cycles (cache hits) plus the speedup over one
+worker. Every worker count must return the same alerts.
+"""
+import os
+import sys
+import time
+
+import scanner
+from candle_cache import CandleStore
+from fake_exchange import FakeExchange
+from shards import ShardPool
+
+WARM_CYCLES = 3
+
+
+def use_fake_exchange(num_symbols, latency):
+    """ShardPool initializer: point this worker's scanner at its own fake exchange."""
+    scanner.candle_store = CandleStore(FakeExchange(num_symbols=num_symbols, latency=latency))
+
+
+def run(num_symbols=600, latency=0.05):
+    symbols = FakeExchange(num_symbols=num_symbols).symbols
+    print(f"symbols={num_symbols} latency={latency * 1000:.0f}ms cpus={os.cpu_count()}")
+    print(f"{'workers':>8} {'cold':>9} {'warm':>9} {'cycles/s':>9} {'speedup':>8} {'alerts':>7}")
+    baseline = reference = None
+    for workers in (1, 2, 4):
+        pool = ShardPool(scanner.scan_shard, workers, initializer=use_fake_exchange,
+                         initargs=(num_symbols, latency)).start()
+        try:
+            start = time.perf_counter()
+            alerts = pool.map(symbols)
+            cold = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(WARM_CYCLES):
+                pool.map(symbols)
+            warm = (time.perf_counter() - start) / WARM_CYCLES
+        finally:
+            pool.close()
+
+        found = [sym for sym, _ in alerts]
+        if reference is None:
+            reference = found
+        assert found == reference, "sharding changed the scan result"
+        baseline = baseline or cold
+        print(f"{workers:>8} {cold:>8.2f}s {warm:>8.3f}s {1 / cold:>9.2f} {baseline / cold:>7.1f}x {len(found):>7}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 600,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 0.05)
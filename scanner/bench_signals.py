@@ -0,0 +1,47 @@
+"""Per-cycle CPU time of the buy-signal check: per-symbol check_buy_signal vs the batch evaluator.
+
+Usage: python bench_signals.py [symbols] [candles]
+"""
+import sys
+import time
+
+import numpy as np
+
+from scanner import check_buy_signal, ohlcv_to_df
+from vector_signals import latest_buy_signals, stack_candles
+
+
+def synthetic_candles(num_symbols, length, seed=7):
+    rng = np.random.default_rng(seed)
+    ts = 1_700_000_000_000 + 3_600_000 * np.arange(length)
+    candles = []
+    for _ in range(num_symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, length)))
+        open_ = np.concatenate([[close[0]], close[:-1]])
+        volume = rng.lognormal(8, 0.5, length)
+        candles.append(np.column_stack([ts, open_, np.maximum(open_, close), np.minimum(open_, close), close, volume]))
+    return candles
+
+
+def run(num_symbols=500, length=30, repeats=5):
+    candles = synthetic_candles(num_symbols, length)
+
+    start = time.process_time()
+    for _ in range(repeats):
+        expected = [bool(check_buy_signal(None, ohlcv_to_df(c))['buy_signal'].iloc[-1]) for c in candles]
+    t_loop = (time.process_time() - start) / repeats
+
+    start = time.process_time()
+    for _ in range(repeats):
+        got = latest_buy_signals(stack_candles(candles, length))
+    t_batch = (time.process_time() - start) / repeats
+
+    assert got.tolist() == expected
+    print(f"{num_symbols} symbols x {length} candles, {sum(expected)} signals")
+    print(f"  check_buy_signal loop: {t_loop * 1000:8.2f} ms CPU per cycle")
+    print(f"  batch evaluator:       {t_batch * 1000:8.2f} ms CPU per cycle ({t_loop / t_batch:.0f}x)")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run(*args)
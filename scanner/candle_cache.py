@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+import ccxt
+import numpy as np
+
+from fetcher import FETCH_WORKERS, WEIGHTS, call, fetch_many
+
+# ------------------ CONFIG ------------------
+CANDLE_CACHE_SIZE = int(os.getenv("CANDLE_CACHE_SIZE", 500))  # candles kept per (symbol, timeframe)
+CANDLE_MAX_AGE = float(os.getenv("CANDLE_MAX_AGE", 30))  # seconds a refresh is reused without a request
+CANDLE_HISTORY_KEYS = int(os.getenv("CANDLE_HISTORY_KEYS", 256))  # (symbol, timeframe) histories kept without a store
+CANDLE_HISTORY_ROWS = int(os.getenv("CANDLE_HISTORY_ROWS", 2000))  # newest closed candles kept per history
+HISTORY_PAGE = 1000  # Binance klines page size limit
+
+# ccxt row layout: [timestamp, open, high, low, close, volume]
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+def timeframe_ms(timeframe):
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+class CandleRing:
+    """Fixed-size ring buffer of OHLCV rows ordered by timestamp."""
+
+    def __init__(self, capacity=CANDLE_CACHE_SIZE):
+        self.data = np.empty((capacity, 6), dtype=np.float64)
+        self.capacity = capacity
+        self.start = 0
+        self.size = 0
+        self.refreshed = 0.0  # monotonic time of the last merge
+        self.lock = threading.Lock()  # the kline stream merges from its own thread
+
+    @property
+    def last_ts(self):
+        if not self.size:
+            return None
+        return int(self.data[(self.start + self.size - 1) % self.capacity, TS])
+
+    @property
+    def first_ts(self):
+        return int(self.data[self.start, TS]) if self.size else None
+
+    def merge(self, rows, replace=False):
+        """Merge rows fetched from the exchange.
+
+        Rows older than the newest stored candle are ignored, a row with the
+        same timestamp replaces it (the still-forming candle), newer rows are
+        appended, evicting the oldest once the ring is full. With replace=True
+        the ring is emptied first.
+        """
+        with self.lock:
+            self._merge(rows, replace)
+
+    def _merge(self, rows, replace):
+        self.refreshed = time.monotonic()
+        if replace:
+            self.start = self.size = 0
+        if rows is None or not len(rows):
+            return
+        rows = np.asarray(rows, dtype=np.float64)
+        last_ts = self.last_ts
+        if last_ts is not None:
+            rows = rows[rows[:, TS] >= last_ts]
+            if len(rows) and rows[0, TS] == last_ts:
+                self.data[(self.start + self.size - 1) % self.capacity] = rows[0]
+                rows = rows[1:]
+        if not len(rows):
+            return
+        rows = rows[-self.capacity:]
+        idx = (self.start + self.size + np.arange(len(rows))) % self.capacity
+        self.data[idx] = rows
+        overflow = max(0, self.size + len(rows) - self.capacity)
+        self.start = (self.start + overflow) % self.capacity
+        self.size = min(self.capacity, self.size + len(rows))
+
+    def tail(self, limit):
+        """Return a copy of the newest `limit` rows in chronological order."""
+        with self.lock:
+            n = min(limit, self.size)
+            idx = (self.start + self.size - n + np.arange(n)) % self.capacity
+            return self.data[idx]
+
+
+class CandleStore:
+    """In-process OHLCV cache keyed by (symbol, timeframe).
+
+    After the first full fetch, each refresh only requests the candles from the
+    last stored timestamp onwards, which re-reads and deduplicates the
+    still-forming candle and appends anything that closed since.
+    """
+
+    def __init__(self, exchange, capacity=CANDLE_CACHE_SIZE, max_age=CANDLE_MAX_AGE, store=None,
+                 history_keys=CANDLE_HISTORY_KEYS, history_rows=CANDLE_HISTORY_ROWS):
+        self.exchange = exchange
+        self.capacity = capacity
+        self.max_age = max_age
+        self.store = store  # optional history_store.HistoryStore behind rings and history()
+        self.rings = {}
+        self.histories = OrderedDict()  # (symbol, timeframe) -> closed candles, sorted, least recently used first
+        self.history_keys = history_keys
+        self.history_rows = history_rows
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def _ring(self, symbol, timeframe):
+        with self.lock:
+            ring = self.rings.get((symbol, timeframe))
+        if ring is not None:
+            return ring
+        ring = CandleRing(self.capacity)
+        if self.store is not None:
+            # Start from the stored candles so a restart only fetches what closed since
+            ring.merge(self.store.tail(symbol, timeframe, self.capacity))
+            ring.refreshed = 0.0
+        with self.lock:
+            return self.rings.setdefault((symbol, timeframe), ring)
+
+    def _plan(self, ring, timeframe, limit):
+        """Return (since, limit) for the request that brings ring up to date, or None."""
+        if ring.size >= limit and time.monotonic() - ring.refreshed < self.max_age:
+            return None
+        if ring.size < limit:
+            return None, limit
+        missing = (self.exchange.milliseconds() - ring.last_ts) // timeframe_ms(timeframe) + 1
+        if missing >= limit:
+            return None, limit
+        return ring.last_ts, int(missing)
+
+    def refresh(self, symbols, timeframe='1h', limit=30, max_workers=FETCH_WORKERS):
+        """Bring the given symbols up to date; returns the newest `limit` rows per symbol, in order."""
+        rings = [self._ring(sym, timeframe) for sym in symbols]
+        plans = [self._plan(ring, timeframe, limit) for ring in rings]
+        todo = [(sym, ring, plan) for sym, ring, plan in zip(symbols, rings, plans) if plan]
+        self.stats["hits"] += len(symbols) - len(todo)
+
+        def fetch(item):
+            sym, _, (since, n) = item
+            return self.exchange.fetch_ohlcv(sym, timeframe, since=since, limit=n)
+
+        results = fetch_many(fetch, todo, weight=WEIGHTS["fetch_ohlcv"], max_workers=max_workers,
+                             label=lambda item: item[0], endpoint="fetch_ohlcv")
+        now = self.exchange.milliseconds()
+        for (sym, ring, (since, _)), rows in zip(todo, results):
+            if rows is None:
+                continue
+            self.stats["requests"] += 1
+            self.stats["rows"] += len(rows)
+            ring.merge(rows, replace=since is None)
+            if self.store is not None:
+                try:
+                    self.store.extend(sym, timeframe, rows, now)
+                except OSError as e:
+                    print(f"⚠️ Could not store {sym} {timeframe} candles: {e}")
+        return [ring.tail(limit) if ring.size else None for ring in rings]
+
+    def push(self, symbol, timeframe, row):
+        """Merge one candle update received outside of refresh (e.g. from the kline stream)."""
+        self._ring(symbol, timeframe).merge([row])
+
+    def get(self, symbol, timeframe='1h', limit=30):
+        """Return the newest `limit` rows for one symbol, refreshing it if needed."""
+        return self.refresh([symbol], timeframe, limit, max_workers=1)[0]
+
+    def range(self, symbol, timeframe, since, limit):
+        """Return up to `limit` rows starting at `since`, served from the ring when it covers them."""
+        ring = self._ring(symbol, timeframe)
+        if ring.size and ring.first_ts <= since:
+            rows = ring.tail(ring.size)
+            rows = rows[rows[:, TS] >= since][:limit]
+            if len(rows) == limit or time.monotonic() - ring.refreshed < self.max_age:
+                self.stats["hits"] += 1
+                return rows
+        rows = call(self.exchange.fetch_ohlcv, symbol, timeframe, since=since, limit=limit,
+                    weight=WEIGHTS["fetch_ohlcv"])
+        self.stats["requests"] += 1
+        self.stats["rows"] += len(rows)
+        return np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+
+    def _fetch_pages(self, symbol, timeframe, since, until):
+        tf = timeframe_ms(timeframe)
+        closed_before = self.exchange.milliseconds() - tf
+        pages = []
+        while since < until:
+            rows = call(self.exchange.fetch_ohlcv, symbol, timeframe, since=since, limit=HISTORY_PAGE,
+                        weight=WEIGHTS["fetch_ohlcv"])
+            self.stats["requests"] += 1
+            self.stats["rows"] += len(rows)
+            if not rows:
+                break
+            rows = np.asarray(rows, dtype=np.float64)
+            pages.append(rows[(rows[:, TS] < until) & (rows[:, TS] <= closed_before)])
+            since = int(rows[-1, TS]) + tf
+            if len(rows) < HISTORY_PAGE:
+                break
+        return pages
+
+    def history(self, symbol, timeframe, since, until):
+        """Return closed candles with since <= timestamp < until.
+
+        Closed candles never change, so they are kept per (symbol, timeframe)
+        and later calls only fetch the part of the range not yet held. In
+        memory that is the newest history_rows candles of the history_keys
+        most recently used keys; with a store they live on disk and survive
+        restarts.
+        """
+        if self.store is not None:
+            self.store.ensure(symbol, timeframe, since, until,
+                              lambda a, b: self._fetch_pages(symbol, timeframe, a, b),
+                              self.exchange.milliseconds())
+            return self.store.read(symbol, timeframe, since, until)
+        key = (symbol, timeframe)
+        with self.lock:
+            held = self.histories.get(key)
+        if held is None or not len(held):
+            pages = self._fetch_pages(symbol, timeframe, since, until)
+        else:
+            pages = [held]
+            if since < held[0, TS]:
+                pages += self._fetch_pages(symbol, timeframe, since, int(held[0, TS]))
+            if until > held[-1, TS] + timeframe_ms(timeframe):
+                pages += self._fetch_pages(symbol, timeframe, int(held[-1, TS]) + timeframe_ms(timeframe), until)
+            if len(pages) == 1:
+                self.stats["hits"] += 1
+        merged = np.concatenate(pages) if pages else np.empty((0, 6))
+        _, first = np.unique(merged[:, TS], return_index=True)
+        merged = merged[first]
+        lo, hi = np.searchsorted(merged[:, TS], [since, until])
+        with self.lock:
+            # Keep the newest rows; what is dropped is still contiguous with the rest, so it is refetched if asked for
+            self.histories[key] = merged[-self.history_rows:].copy() if len(merged) > self.history_rows else merged
+            self.histories.move_to_end(key)
+            while len(self.histories) > self.history_keys:
+                self.histories.popitem(last=False)
+                self.stats["histories_evicted"] += 1
+        return merged[lo:hi]
@@ -0,0 +1,101 @@
+import io
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# ------------------ CONFIG ------------------
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", 2))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", 64))  # rendered charts kept in memory
+CHART_CANDLES = 30
+
+# Per-worker state, created once by _init_worker
+_style = None
+_figure = None
+
+
+def _init_worker():
+    global _style
+    import matplotlib
+    matplotlib.use("Agg")
+    import mplfinance as mpf
+    _style = mpf.make_mpf_style(base_mpf_style='yahoo')
+
+
+def _render(rows, title):
+    """Render candles + volume into PNG bytes, reusing the worker's figure."""
+    global _figure
+    import mplfinance as mpf
+    import pandas as pd
+
+    df = pd.DataFrame(rows, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df.index = pd.to_datetime(df.pop('timestamp'), unit='ms')
+    if _figure is None:
+        _figure = mpf.figure(style=_style, figsize=(10, 7))
+        price_ax = _figure.add_axes([0.08, 0.30, 0.88, 0.62])
+        _figure.add_axes([0.08, 0.08, 0.88, 0.20], sharex=price_ax)
+    price_ax, volume_ax = _figure.axes
+    price_ax.clear()
+    volume_ax.clear()
+    mpf.plot(df, type='candle', ax=price_ax, volume=volume_ax, mav=(9, 21, 50))
+    price_ax.set_title(title)
+    buf = io.BytesIO()
+    _figure.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+class ChartRenderer:
+    """Renders candlestick charts in a process pool into in-memory PNGs.
+
+    Results are cached by (symbol, last candle timestamp), so a chart for the
+    same candle is rendered once no matter how many paths ask for it.
+    """
+
+    def __init__(self, workers=CHART_WORKERS, cache_size=CHART_CACHE_SIZE):
+        self.workers = workers
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (symbol, last_ts) -> Future[bytes]
+        self.lock = threading.Lock()
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            # fork, not spawn: spawn re-imports scanner.py (exchange client, market checks) in every worker
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("fork"),
+                                             initializer=_init_worker)
+        return self._pool
+
+    def start(self):
+        """Fork the workers now, before the notifier/stream threads exist."""
+        self._get_pool().submit(int).result()
+        return self
+
+    def render(self, symbol, rows, title=None):
+        """Return a Future of PNG bytes for the last CHART_CANDLES rows of [ts, o, h, l, c, v]."""
+        rows = [list(map(float, r)) for r in rows[-CHART_CANDLES:]]
+        key = (symbol, int(rows[-1][0]))
+        with self.lock:
+            future = self.cache.get(key)
+            if future is not None and not (future.done() and future.exception()):
+                self.cache.move_to_end(key)
+                return future
+            title = title or f"{symbol} - Last 30 Days"
+            try:
+                future = self._get_pool().submit(_render, rows, title)
+            except BrokenProcessPool:
+                # A worker died (OOM kill, segfault); the executor never recovers, so start a new one
+                print("⚠️ Chart pool broken, restarting it")
+                self._pool.shutdown(wait=False)
+                self._pool = None
+                future = self._get_pool().submit(_render, rows, title)
+            self.cache[key] = future
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return future
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
@@ -0,0 +1,254 @@
+import atexit
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extras import execute_values
+
+from metrics import DB
+
+# ------------------ CONFIG ------------------
+DB_CONFIG = {
+    "host": os.getenv("DB_HOST", "localhost"),
+    "dbname": os.getenv("DB_NAME", "crypto_db"),
+    "user": os.getenv("DB_USER", "crypto_user"),
+    "password": os.getenv("DB_PASS", "crypto_pass"),
+    "port": int(os.getenv("DB_PORT", 5432)),
+    # TCP keepalives so a silently dropped connection is noticed by the OS
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 5))
+DB_HEALTHCHECK_IDLE = float(os.getenv("DB_HEALTHCHECK_IDLE", 30))  # seconds idle before a connection is pinged
+DB_FLUSH_ROWS = int(os.getenv("DB_FLUSH_ROWS", 200))  # buffered rows that trigger a flush
+DB_FLUSH_SECONDS = float(os.getenv("DB_FLUSH_SECONDS", 60))  # max age of a buffered row
+
+# Errors that mean the connection itself is unusable, not the statement
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_last_used = {}
+_statements = {}  # sql -> metrics label
+
+
+def get_pool():
+    """Return the shared connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **DB_CONFIG)
+        return _pool
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+
+
+atexit.register(close_pool)
+
+
+def _healthy(conn):
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < DB_HEALTHCHECK_IDLE:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except CONNECTION_ERRORS:
+        return False
+
+
+def _checkout():
+    p = get_pool()
+    for _ in range(DB_POOL_MAX + 1):
+        conn = p.getconn()
+        if _healthy(conn):
+            return conn
+        print("⚠️ Dropping dead DB connection, reconnecting")
+        _last_used.pop(id(conn), None)
+        p.putconn(conn, close=True)
+    raise psycopg2.OperationalError("no healthy database connection available")
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection for one transaction.
+
+    Commits on success and rolls back on error. A connection that failed at
+    the connection level is closed instead of being returned to the pool.
+    """
+    _slots.acquire()
+    conn = None
+    broken = False
+    try:
+        conn = _checkout()
+        yield conn
+        conn.commit()
+    except CONNECTION_ERRORS:
+        broken = True
+        raise
+    except Exception:
+        if conn is not None and not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        if conn is not None:
+            broken = broken or bool(conn.closed)
+            if broken:
+                _last_used.pop(id(conn), None)
+            else:
+                _last_used[id(conn)] = time.monotonic()
+            get_pool().putconn(conn, close=broken)
+        _slots.release()
+
+
+@contextmanager
+def cursor():
+    """Borrow a pooled connection and yield a cursor inside one transaction."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            yield cur
+
+
+def statement_label(sql):
+    """Short metrics label for a statement: its verb and first table, e.g. "UPDATE positions"."""
+    label = _statements.get(sql)
+    if label is None:
+        verb = sql.split(None, 1)[0].upper() if sql.strip() else "?"
+        table = re.search(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+([A-Za-z_][\w.]*)", sql, re.IGNORECASE)
+        label = _statements[sql] = f"{verb} {table.group(1)}" if table else verb
+    return label
+
+
+def _run(fn, retries=1, sql=""):
+    # A statement that fails because its connection died is retried once on a fresh one
+    start = time.perf_counter_ns()
+    try:
+        for attempt in range(retries + 1):
+            try:
+                with cursor() as cur:
+                    return fn(cur)
+            except CONNECTION_ERRORS:
+                if attempt == retries:
+                    raise
+    finally:
+        DB.observe_ns(time.perf_counter_ns() - start, statement_label(sql))
+
+
+def execute(sql, params=None):
+    """Run one statement in its own transaction; returns the affected row count."""
+    def fn(cur):
+        cur.execute(sql, params)
+        return cur.rowcount
+    return _run(fn, sql=sql)
+
+
+def fetchall(sql, params=None):
+    def fn(cur):
+        cur.execute(sql, params)
+        return cur.fetchall()
+    return _run(fn, sql=sql)
+
+
+def fetchone(sql, params=None):
+    def fn(cur):
+        cur.execute(sql, params)
+        return cur.fetchone()
+    return _run(fn, sql=sql)
+
+
+def insert_many(table, columns, rows, page_size=500):
+    """Insert all rows with multi-row VALUES statements in a single transaction."""
+    if not rows:
+        return 0
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s"
+    def fn(cur):
+        execute_values(cur, sql, rows, page_size=page_size)
+        return len(rows)
+    return _run(fn, retries=0, sql=sql)
+
+
+class BatchWriter:
+    """Buffers rows for one table and writes them with insert_many.
+
+    A flush happens when DB_FLUSH_ROWS rows are pending, when the oldest
+    pending row is DB_FLUSH_SECONDS old, on an explicit flush() (e.g. at the
+    end of a scan cycle) and at interpreter exit. Rows from a failed flush
+    stay buffered for the next attempt.
+    """
+
+    def __init__(self, table, columns, max_rows=DB_FLUSH_ROWS, max_seconds=DB_FLUSH_SECONDS):
+        self.table = table
+        self.columns = columns
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.rows = []
+        self.oldest = None
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self._thread = None
+        atexit.register(self.close)
+
+    def add(self, row):
+        with self.lock:
+            if self._thread is None:
+                # Started on first use so importing a module that owns a writer spawns no thread
+                self._thread = threading.Thread(target=self._timer, name=f"flush-{self.table}", daemon=True)
+                self._thread.start()
+            if not self.rows:
+                self.oldest = time.monotonic()
+            self.rows.append(row)
+            full = len(self.rows) >= self.max_rows
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write all pending rows in one transaction; returns the number written."""
+        with self.flush_lock:
+            with self.lock:
+                rows, self.rows = self.rows, []
+                oldest, self.oldest = self.oldest, None
+            if not rows:
+                return 0
+            try:
+                insert_many(self.table, self.columns, rows)
+            except Exception as e:
+                print(f"❌ Batch insert into {self.table} failed, keeping {len(rows)} rows: {e}")
+                with self.lock:
+                    self.rows[:0] = rows
+                    self.oldest = oldest
+                    # Cap the backlog while the database is unreachable
+                    del self.rows[:-self.max_rows * 10]
+                return 0
+            return len(rows)
+
+    def close(self):
+        """Stop the background timer and write whatever is still buffered."""
+        self.wakeup.set()
+        return self.flush()
+
+    def _timer(self):
+        while not self.wakeup.wait(self.max_seconds / 2):
+            with self.lock:
+                due = self.oldest is not None and time.monotonic() - self.oldest >= self.max_seconds
+            if due:
+                self.flush()
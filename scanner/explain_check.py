@@ -0,0 +1,143 @@
+"""Check that the hot scanner queries are served by the indexes and partitions.
+
+Needs a reachable Postgres configured through DB_HOST/DB_NAME/DB_USER/DB_PASS/DB_PORT;
+without one it prints a warning and exits 0.
+Usage: python explain_check.py [positions] [signals]
+
+Runs the migrations into a scratch schema, seeds it with synthetic positions
+and a year of signals, then EXPLAINs each query the scanner, Grafana and
+update_future_returns issue and asserts on the plan: no sequential scan of
+the big tables, the expected index, and partition pruning. Exits non-zero if
+any check fails; the scratch schema is dropped either way.
+"""
+import sys
+
+import psycopg2
+
+import db
+import migrate
+from queries import PENDING_SIGNALS_SQL, POSITION_BOOK_SQL
+
+SCHEMA = "explain_check"
+
+SEED_SQL = """
+    INSERT INTO positions (symbol, side, entry_price, last_price, amount, timestamp, status)
+    SELECT 'S' || (i %% 1000) || '/USDT', 'sale', 1, 1 + random() / 10, 10,
+           LOCALTIMESTAMP - i * INTERVAL '5 minutes', CASE WHEN i %% 5000 = 0 THEN 'open' ELSE 'closed' END
+    FROM generate_series(1, %(positions)s) i;
+
+    INSERT INTO crypto_signals (symbol, timestamp, close_price, future_6h, future_24h)
+    SELECT 'S' || (i %% 1000) || '/USDT', ts, 1,
+           CASE WHEN ts < LOCALTIMESTAMP - INTERVAL '25 hours' THEN 1 END,
+           CASE WHEN ts < LOCALTIMESTAMP - INTERVAL '25 hours' THEN 1 END
+    FROM generate_series(1, %(signals)s) i,
+         LATERAL (SELECT LOCALTIMESTAMP - i * (INTERVAL '365 days' / %(signals)s)) AS t(ts);
+"""
+
+
+def plan_nodes(cur, sql, params=None):
+    """Flattened plan nodes of EXPLAIN (FORMAT JSON) for sql."""
+    cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+    nodes, todo = [], [cur.fetchone()[0][0]["Plan"]]
+    while todo:
+        node = todo.pop()
+        nodes.append(node)
+        todo.extend(node.get("Plans", []))
+    return nodes
+
+
+def parent_index(cur, index):
+    """The index on the partitioned parent that a partition's index belongs to."""
+    cur.execute("""
+        WITH RECURSIVE up(rel) AS (
+            SELECT %s::regclass::oid
+            UNION ALL SELECT inhparent FROM pg_inherits JOIN up ON inhrelid = up.rel
+        )
+        SELECT rel::regclass::text FROM up WHERE NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = up.rel)
+    """, (index,))
+    return cur.fetchone()[0]
+
+
+def check(cur, name, nodes, table, uses=(), max_relations=None):
+    """Print the scans of table (or its partitions) and whether the plan meets the expectations.
+
+    uses lists the (parent) indexes the plan must use.
+
+    Empty partitions are ignored: scanning them sequentially costs nothing,
+    and partitions ahead of the clock cannot be pruned by a lower bound.
+    """
+    found = [n for n in nodes if n.get("Relation Name", "").startswith(table) and n["Node Type"] != "ModifyTable"]
+    cur.execute("SELECT relname FROM pg_class WHERE relname = ANY(%s) AND reltuples > 0",
+                ([n["Relation Name"] for n in found],))
+    populated = {row[0] for row in cur.fetchall()}
+    indexes = {parent_index(cur, n["Index Name"]) for n in nodes if "Index Name" in n}
+
+    problems = []
+    if any(n["Node Type"] == "Seq Scan" and n["Relation Name"] in populated for n in found):
+        problems.append("sequential scan")
+    for index in uses:
+        if index not in indexes:
+            problems.append(f"{index} not used")
+    scanned = populated & {n["Relation Name"] for n in found}
+    if max_relations is not None and len(scanned) > max_relations:
+        problems.append(f"{len(scanned)} populated partitions scanned")
+    print(f"{'✅' if not problems else '❌'} {name}: {', '.join(problems) or 'ok'}")
+    for n in found:
+        print(f"     {n['Node Type']} on {n['Relation Name']}" + (f" using {n['Index Name']}" if "Index Name" in n else ""))
+    if indexes:
+        print(f"     indexes: {', '.join(sorted(indexes))}")
+    return not problems
+
+
+def run(cur, positions, signals):
+    cur.execute(SEED_SQL, {"positions": positions, "signals": signals})
+    cur.execute("ANALYZE positions; ANALYZE crypto_signals")
+    cur.execute("SELECT id, timestamp FROM crypto_signals ORDER BY timestamp DESC LIMIT 1")
+    sig_id, sig_ts = cur.fetchone()
+    print(f"seeded {positions} positions and {signals} signals")
+
+    return all([
+        check(cur, "position book load", plan_nodes(cur, POSITION_BOOK_SQL), "positions",
+              ("idx_positions_open", "idx_positions_time")),
+        check(cur, "recent closed trades (Grafana)", plan_nodes(cur, """
+            SELECT symbol, entry_price, last_price, amount, timestamp FROM positions
+            WHERE status='closed' ORDER BY timestamp DESC LIMIT 20
+        """), "positions"),
+        check(cur, "pending future returns", plan_nodes(cur, PENDING_SIGNALS_SQL), "crypto_signals",
+              ("idx_signals_pending",)),
+        check(cur, "future return update", plan_nodes(cur, """
+            UPDATE crypto_signals SET future_6h = 1 WHERE id = %s AND timestamp = %s
+        """, (sig_id, sig_ts)), "crypto_signals", ("crypto_signals_pkey",), max_relations=1),
+        check(cur, "symbol activity, last 7 days (Grafana)", plan_nodes(cur, """
+            SELECT symbol, COUNT(*) FROM crypto_signals
+            WHERE symbol = %s AND timestamp >= LOCALTIMESTAMP - INTERVAL '7 days'
+            GROUP BY symbol
+        """, ("S7/USDT",)), "crypto_signals", ("idx_symbol_time",), max_relations=2),
+    ])
+
+
+if __name__ == "__main__":
+    positions = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    signals = int(sys.argv[2]) if len(sys.argv) > 2 else 500_000
+
+    try:
+        conn = psycopg2.connect(**db.DB_CONFIG)
+    except psycopg2.OperationalError as e:
+        print(f"⚠️ No Postgres at {db.DB_CONFIG['host']}:{db.DB_CONFIG['port']}, skipping: {str(e).strip()}")
+        sys.exit(0)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}; SET search_path TO {SCHEMA}")
+        conn.commit()
+        migrate.migrate(conn)
+        with conn.cursor() as cur:
+            cur.execute("SELECT create_crypto_signals_partitions(CURRENT_DATE - 366, %s)",
+                        (migrate.PARTITION_MONTHS_AHEAD,))
+            ok = run(cur, positions, signals)
+        conn.rollback()
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+    sys.exit(0 if ok else 1)
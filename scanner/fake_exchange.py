@@ -0,0 +1,158 @@
+import math
+import random
+import threading
+import time
+import zlib
+from collections import Counter, deque
+
+import ccxt
+import numpy as np
+
+from fetcher import WEIGHTS
+
+TIMEFRAME_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+}
+
+
+def _noise(*parts):
+    """Deterministic pseudo-random value in [-1, 1) derived from parts."""
+    return zlib.crc32(":".join(map(str, parts)).encode()) / 2**31 - 1
+
+
+class FakeExchange:
+    """Offline ccxt-like exchange serving synthetic or recorded candles with injected latency.
+
+    Synthetic candles are a pure function of (symbol, timeframe, candle
+    index), so any range query is consistent with any other and runs are
+    reproducible. `recorded` maps (symbol, timeframe) to OHLCV rows (see
+    from_history()); those series are replayed up to the exchange clock and
+    anything missing from the recording stays synthetic.
+
+    latency + uniform(0, jitter) seconds are slept per request (seeded, so
+    repeatable). With rate_limit set, requests spend fetcher.WEIGHTS per
+    rolling minute and raise ccxt.RateLimitExceeded past the limit, as
+    Binance answers 429. now_ms pins the clock (advance() moves it); None
+    follows the wall clock.
+    """
+
+    def __init__(self, num_symbols=300, latency=0.05, now_ms=None, jitter=0.0, rate_limit=None,
+                 recorded=None, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.recorded = {key: np.asarray(rows, dtype=np.float64) for key, rows in (recorded or {}).items()}
+        if self.recorded:
+            self.symbols = sorted({sym for sym, _ in self.recorded})
+            if now_ms is None:
+                # Just after the newest recorded candle closed
+                now_ms = max(int(rows[-1, 0]) + TIMEFRAME_MS[tf] for (_, tf), rows in self.recorded.items() if len(rows))
+        else:
+            self.symbols = [f"C{i:03d}/USDT" for i in range(num_symbols)]
+        self.now_ms = now_ms
+        self.markets = {}
+        self.calls = Counter()
+        self.rows_served = 0
+        self.rejected = 0  # requests answered with a rate-limit error
+        self.spent = deque()  # (monotonic time, weight) within the last minute
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_history(cls, store, timeframes=("1h", "1d"), **kwargs):
+        """Replay the candles of a history_store.HistoryStore."""
+        recorded = {(sym, tf): store.read(sym, tf, 0, 2**62) for tf in timeframes for sym in store.symbols(tf)}
+        return cls(recorded={key: rows for key, rows in recorded.items() if len(rows)}, **kwargs)
+
+    def _now(self):
+        return self.now_ms if self.now_ms is not None else int(time.time() * 1000)
+
+    def milliseconds(self):
+        return self._now()
+
+    def advance(self, seconds):
+        """Move the pinned clock forward, e.g. by one poll interval."""
+        self.now_ms = self._now() + int(seconds * 1000)
+
+    def set_markets(self, markets):
+        self.markets = markets
+        self.symbols = sorted(markets)
+
+    def _record(self, endpoint, rows=0):
+        weight = WEIGHTS.get(endpoint, 1)
+        with self._lock:
+            if self.rate_limit:
+                now = time.monotonic()
+                while self.spent and self.spent[0][0] <= now - 60:
+                    self.spent.popleft()
+                if sum(w for _, w in self.spent) + weight > self.rate_limit:
+                    self.rejected += 1
+                    raise ccxt.RateLimitExceeded(f"binance 429 Too many requests; weight limit {self.rate_limit}/min")
+                self.spent.append((now, weight))
+            self.calls[endpoint] += 1
+            self.rows_served += rows
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+    def _close(self, symbol, timeframe, i):
+        base = 1 + zlib.crc32(symbol.encode()) % 1000
+        phase = _noise(symbol, "phase") * math.pi
+        return base * (1 + 0.1 * math.sin(i / 50 + phase) + 0.02 * _noise(symbol, timeframe, i))
+
+    def _candle(self, symbol, timeframe, i):
+        tf = TIMEFRAME_MS[timeframe]
+        o = self._close(symbol, timeframe, i - 1)
+        c = self._close(symbol, timeframe, i)
+        spread = 0.005 * (1 + _noise(symbol, timeframe, i, "hl"))
+        volume = 1000 * (2 + _noise(symbol, timeframe, i, "v"))
+        return [i * tf, o, max(o, c) * (1 + spread), min(o, c) * (1 - spread), c, volume]
+
+    def load_markets(self, reload=False):
+        self._record("load_markets")
+        return {s: {"symbol": s, "base": s.split("/")[0], "quote": "USDT", "type": "spot", "spot": True,
+                    "active": True} for s in self.symbols}
+
+    def _replay(self, symbol, timeframe, since, limit):
+        rows = self.recorded[(symbol, timeframe)]
+        stop = np.searchsorted(rows[:, 0], self._now(), side="right")  # candles opened by now
+        if since is None:
+            return rows[max(stop - limit, 0):stop].tolist()
+        start = np.searchsorted(rows[:, 0], since)
+        return rows[start:min(start + limit, stop)].tolist()
+
+    def fetch_ohlcv(self, symbol, timeframe="1m", since=None, limit=None):
+        limit = limit or 500
+        if (symbol, timeframe) in self.recorded:
+            rows = self._replay(symbol, timeframe, since, limit)
+        else:
+            tf = TIMEFRAME_MS[timeframe]
+            last = self._now() // tf  # index of the still-forming candle
+            first = last - limit + 1 if since is None else -(-since // tf)
+            stop = min(last, first + limit - 1)
+            rows = [self._candle(symbol, timeframe, i) for i in range(first, stop + 1)]
+        self._record("fetch_ohlcv", len(rows))
+        return rows
+
+    def _ticker(self, symbol):
+        hourly = self._replay(symbol, "1h", None, 24) if (symbol, "1h") in self.recorded else None
+        if hourly:
+            last = hourly[-1][4]
+            quote_volume = sum(row[4] * row[5] for row in hourly)
+        else:
+            last = self._close(symbol, "1m", self._now() // TIMEFRAME_MS["1m"])
+            quote_volume = 1e6 * (2 + _noise(symbol, "qv")) * last
+        return {"symbol": symbol, "last": last, "quoteVolume": quote_volume, "timestamp": self._now()}
+
+    def fetch_ticker(self, symbol):
+        self._record("fetch_ticker")
+        return self._ticker(symbol)
+
+    def fetch_tickers(self, symbols=None):
+        self._record("fetch_tickers")
+        return {s: self._ticker(s) for s in (symbols or self.symbols)}
@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+
+from metrics import EXCHANGE, RATE_LIMIT_WAIT, REQUEST_ERRORS, REQUEST_WEIGHT, span
+
+# ------------------ CONFIG ------------------
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", 10))  # concurrent REST requests
+# Binance spot allows 6000 request weight per minute per IP; keep some headroom
+RATE_LIMIT_WEIGHT = int(os.getenv("RATE_LIMIT_WEIGHT", 4800))
+
+# Request weight per ccxt call on Binance spot
+WEIGHTS = {
+    "fetch_ohlcv": 2,
+    "fetch_ticker": 2,
+    "fetch_tickers": 80,
+    "load_markets": 20,
+}
+
+
+class WeightLimiter:
+    """Token bucket over Binance request weight, shared by all fetch threads."""
+
+    def __init__(self, weight_per_minute=RATE_LIMIT_WEIGHT):
+        self.capacity = weight_per_minute
+        self.rate = weight_per_minute / 60.0
+        self.tokens = float(weight_per_minute)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, weight=1):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= weight:
+                    self.tokens -= weight
+                    return
+                wait = (weight - self.tokens) / self.rate
+            RATE_LIMIT_WAIT.inc(wait)
+            time.sleep(wait)
+
+
+limiter = WeightLimiter()
+
+
+def call(fn, *args, weight=1, retries=2, endpoint=None, **kwargs):
+    """Run one exchange call under the shared weight budget, retrying on 429s.
+
+    Latency, weight and errors are recorded per endpoint (the function name
+    unless given). weight=0 marks a wrapper around calls that go through
+    here themselves, which is not recorded twice.
+    """
+    if not weight:
+        return fn(*args, **kwargs)
+    endpoint = endpoint or getattr(fn, "__name__", "call")
+    for attempt in range(retries + 1):
+        limiter.acquire(weight)
+        REQUEST_WEIGHT.inc(weight, endpoint)
+        start = time.perf_counter_ns()
+        try:
+            return fn(*args, **kwargs)
+        except (ccxt.RateLimitExceeded, ccxt.DDoSProtection) as e:
+            REQUEST_ERRORS.inc(1, endpoint, type(e).__name__)
+            if attempt == retries:
+                raise
+            print(f"⚠️ Rate limited, backing off {2 ** attempt}s")
+            time.sleep(2 ** attempt)
+        except Exception as e:
+            REQUEST_ERRORS.inc(1, endpoint, type(e).__name__)
+            raise
+        finally:
+            EXCHANGE.observe_ns(time.perf_counter_ns() - start, endpoint)
+
+
+def fetch_many(fn, items, weight=1, max_workers=FETCH_WORKERS, label=str, endpoint=None):
+    """Call fn(item) for every item concurrently.
+
+    Results come back in input order; an item whose call fails yields None.
+    """
+    def task(item):
+        try:
+            return call(fn, item, weight=weight, endpoint=endpoint)
+        except Exception as e:
+            print(f"❌ Fetch failed for {label(item)}: {e}")
+            return None
+
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(task, items))
+
+
+def fetch_ohlcv_many(exchange, symbols, timeframe='1h', limit=30, since=None, max_workers=FETCH_WORKERS):
+    """Fetch OHLCV for many symbols; returns raw ccxt rows (or None) per symbol, in order."""
+    with span("fetch_ohlcv_many"):
+        return fetch_many(
+            lambda sym: exchange.fetch_ohlcv(sym, timeframe, since=since, limit=limit),
+            symbols, weight=WEIGHTS["fetch_ohlcv"], max_workers=max_workers, endpoint="fetch_ohlcv")
+
+
+def fetch_tickers_many(exchange, symbols, max_workers=FETCH_WORKERS):
+    """Fetch tickers for a handful of symbols concurrently, in order."""
+    return fetch_many(exchange.fetch_ticker, symbols, weight=WEIGHTS["fetch_ticker"], max_workers=max_workers)
@@ -1,18 +1,32 @@
-from binance.client import Client
-import pandas as pd
 import os
 import csv
+import threading
 import time
 # import logging
-from binance.enums import *
-from binance.exceptions import BinanceAPIException, BinanceOrderException
 
 
 api_key = os.environ.get('BINANCE_API_KEY')
 api_secret = os.environ.get('BINANCE_SECRET_KEY')
 
+# python-binance pings the API in Client(), so it is created on first use, not at import
+_client = None
+_client_lock = threading.Lock()
 
-client = Client(api_key, api_secret)
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            from binance.client import Client
+            _client = Client(api_key, api_secret)
+        return _client
+
+
+def __getattr__(name):
+    # Keep `get_list.client` working for callers that used the old module global
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 
@@ -21,7 +35,9 @@ client = Client(api_key, api_secret)
 def get_usdt_pairs(num=50):
 
 
-    symbols = client.get_ticker()
+    import pandas as pd
+
+    symbols = get_client().get_ticker()
 
     
     df = pd.DataFrame(symbols)
@@ -66,32 +82,32 @@ def get_gainer():
 
 
 def get_flow_balance():
-    balance = client.get_asset_balance(asset="FLOW")
+    balance = get_client().get_asset_balance(asset="FLOW")
     balance = float(balance['free'])
     # print(bnb_balance)
     return balance
 
 def get_icp_balance():
-    balance = client.get_asset_balance(asset="ICP")
+    balance = get_client().get_asset_balance(asset="ICP")
     balance = float(balance['free'])
     # print(bnb_balance)
     return balance
 
 def get_balance(symbol):
-    balance = client.get_asset_balance(asset=symbol)
+    balance = get_client().get_asset_balance(asset=symbol)
     balance = float(balance['free'])
     # print(bnb_balance)
     return balance
 
 
 def get_USDT_balance():
-    balance = client.get_asset_balance(asset='USDT')
+    balance = get_client().get_asset_balance(asset='USDT')
     balance = float(balance['free'])
     # print(bnb_balance)
     return balance
 
 def get_balance_all(symbol):
-    balance = client.get_asset_balance(asset=symbol)
+    balance = get_client().get_asset_balance(asset=symbol)
     balance = float(balance['locked']) + float(balance['free'])
     # print(bnb_balance)
     return balance
@@ -104,7 +120,7 @@ def get_symbol_ticker(symbol):
     for i in range(tries):
               try:
                  # do stuff
-                 price = client.get_symbol_ticker(symbol)
+                 price = get_client().get_symbol_ticker(symbol)
               except:
                  time.sleep(1)
                  continue
@@ -114,7 +130,10 @@ def get_symbol_ticker(symbol):
 
 def get_trend(pair):
     # klines = client.get_historical_klines(pair, Client.KLINE_INTERVAL_15MINUTE, "15 minute ago UTC")
-    klines = client.get_historical_klines(pair, Client.KLINE_INTERVAL_1HOUR, "1 hour ago UTC")
+    import pandas as pd
+    from binance.client import Client
+
+    klines = get_client().get_historical_klines(pair, Client.KLINE_INTERVAL_1HOUR, "1 hour ago UTC")
     
     # print(klines)
 
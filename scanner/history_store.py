@@ -0,0 +1,280 @@
+"""On-disk store of closed candles, read through memory maps.
+
+Layout: HISTORY_DIR/<BASE-QUOTE>/<timeframe>/<YYYY-MM>.f8 holds raw float64
+rows [ts, open, high, low, close, volume] sorted by timestamp, plus a
+coverage.json with the [start, end) range known to be complete. New candles
+are appended to the month file; reads map the files and slice them.
+
+  python history_store.py sync --days 365 [--timeframe 1h] [--num-symbols 100]
+  python history_store.py info
+"""
+import argparse
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from candle_cache import TS, timeframe_ms
+
+# ------------------ CONFIG ------------------
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "history"))
+HISTORY_OPEN_MAPS = int(os.getenv("HISTORY_OPEN_MAPS", 64))  # month files kept mapped; each map holds an fd
+ROW_BYTES = 6 * 8
+
+
+def _months(since, until):
+    """'YYYY-MM' names of the months touched by [since, until)."""
+    first = np.datetime64(int(since), "ms").astype("datetime64[M]")
+    last = np.datetime64(int(until) - 1, "ms").astype("datetime64[M]")
+    return [str(m) for m in np.arange(first, last + 1)]
+
+
+class HistoryStore:
+    """Closed candles per (symbol, timeframe), partitioned by month.
+
+    Rows are only appended once closed, so files never change under a
+    reader; read() returns a read-only view into the mapped file when the
+    range sits in one month and a concatenated copy otherwise. Writers take
+    a per-key thread lock and an flock, so shard processes can share a store.
+    The most recently read `open_maps` month files stay mapped.
+    """
+
+    def __init__(self, root=HISTORY_DIR, open_maps=HISTORY_OPEN_MAPS):
+        self.root = root
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+        self.open_maps = open_maps
+        self._maps = OrderedDict()  # path -> (stat key, memmap), least recently used first
+        self._maps_lock = threading.Lock()
+        self.stats = Counter()
+
+    def _dir(self, symbol, timeframe):
+        return os.path.join(self.root, symbol.replace("/", "-"), timeframe)
+
+    def _path(self, symbol, timeframe, month):
+        return os.path.join(self._dir(symbol, timeframe), f"{month}.f8")
+
+    @contextmanager
+    def _locked(self, symbol, timeframe):
+        with self.locks_lock:
+            lock = self.locks.setdefault((symbol, timeframe), threading.Lock())
+        with lock:
+            directory = self._dir(symbol, timeframe)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, ".lock"), "w") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                yield
+
+    # ------------------ COVERAGE ------------------
+    def coverage(self, symbol, timeframe):
+        """(start, end) in ms of the stored complete range, or None."""
+        try:
+            with open(os.path.join(self._dir(symbol, timeframe), "coverage.json")) as f:
+                cov = json.load(f)
+            return cov["start"], cov["end"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _set_coverage(self, symbol, timeframe, start, end):
+        path = os.path.join(self._dir(symbol, timeframe), "coverage.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump({"start": int(start), "end": int(end)}, f)
+        os.replace(f"{path}.tmp", path)
+
+    # ------------------ READ ------------------
+    def _map(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        rows = st.st_size // ROW_BYTES
+        if not rows:
+            return None
+        # A month file grows by appends and is replaced on backfill; either changes the key
+        key = (st.st_ino, st.st_mtime_ns, rows)
+        with self._maps_lock:
+            cached = self._maps.get(path)
+            if cached is not None and cached[0] == key:
+                self._maps.move_to_end(path)
+                return cached[1]
+            cached = self._maps[path] = (key, np.memmap(path, dtype=np.float64, mode="r", shape=(rows, 6)))
+            self._maps.move_to_end(path)
+            # An evicted map (and its fd) is released once no view returned by read() refers to it
+            while len(self._maps) > self.open_maps:
+                self._maps.popitem(last=False)
+                self.stats["maps_evicted"] += 1
+        return cached[1]
+
+    def read(self, symbol, timeframe, since, until):
+        """Stored candles with since <= timestamp < until."""
+        cov = self.coverage(symbol, timeframe)
+        if cov is None:
+            return np.empty((0, 6))
+        since, until = max(since, cov[0]), min(until, cov[1])
+        parts = []
+        if since < until:
+            for month in _months(since, until):
+                rows = self._map(self._path(symbol, timeframe, month))
+                if rows is None:
+                    continue
+                lo, hi = np.searchsorted(rows[:, TS], [since, until])
+                if hi > lo:
+                    parts.append(rows[lo:hi])
+        self.stats["reads"] += 1
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts) if parts else np.empty((0, 6))
+
+    def tail(self, symbol, timeframe, limit):
+        """The newest `limit` stored candles."""
+        cov = self.coverage(symbol, timeframe)
+        if cov is None:
+            return np.empty((0, 6))
+        since = max(cov[0], cov[1] - limit * timeframe_ms(timeframe))
+        return self.read(symbol, timeframe, since, cov[1])[-limit:]
+
+    def load(self, symbols, timeframe="1h", since=0, until=None):
+        """{symbol: rows} for the backtest; symbols without stored data are left out."""
+        until = until if until is not None else int(time.time() * 1000)
+        history = {}
+        for sym in symbols:
+            rows = self.read(sym, timeframe, since, until)
+            if len(rows):
+                history[sym] = rows
+        return history
+
+    def symbols(self, timeframe="1h"):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d.replace("-", "/", 1) for d in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, d, timeframe)))
+
+    # ------------------ WRITE ------------------
+    def _write(self, symbol, timeframe, rows):
+        """Store rows (sorted by timestamp); caller holds the key lock."""
+        if not len(rows):
+            return
+        months = rows[:, TS].astype(np.int64).astype("datetime64[ms]").astype("datetime64[M]")
+        for month in np.unique(months):
+            part = rows[months == month]
+            path = self._path(symbol, timeframe, str(month))
+            existing = self._map(path)
+            if existing is None or part[0, TS] > existing[-1, TS]:
+                with open(path, "ab") as f:
+                    size = f.tell()
+                    if size % ROW_BYTES:
+                        f.truncate(size - size % ROW_BYTES)  # drop a torn row from an interrupted write
+                    f.write(np.ascontiguousarray(part, dtype=np.float64).tobytes())
+            else:
+                # Backfill inside an existing month: rewrite that month in order
+                merged = np.concatenate([part, np.asarray(existing)])
+                _, first = np.unique(merged[:, TS], return_index=True)
+                with open(f"{path}.tmp", "wb") as f:
+                    f.write(merged[first].tobytes())
+                os.replace(f"{path}.tmp", path)
+                with self._maps_lock:
+                    self._maps.pop(path, None)
+            self.stats["rows_written"] += len(part)
+
+    def ensure(self, symbol, timeframe, since, until, fetch, now_ms):
+        """Make [since, until) of closed candles available locally.
+
+        fetch(since, until) is called only for the parts outside the stored
+        coverage and returns a list of row arrays (CandleStore._fetch_pages).
+        """
+        step = timeframe_ms(timeframe)
+        since = since // step * step
+        until = min(until, now_ms // step * step)  # later candles have not closed
+        if since >= until:
+            return
+        with self._locked(symbol, timeframe):
+            cov = self.coverage(symbol, timeframe)
+            if cov is None:
+                gaps = [(since, until)]
+            else:
+                gaps = [(a, b) for a, b in ((since, cov[0]), (cov[1], until)) if a < b]
+            if not gaps:
+                self.stats["hits"] += 1
+                return
+            for a, b in gaps:
+                pages = [p for p in fetch(a, b) if len(p)]
+                self.stats["fetches"] += 1
+                if pages:
+                    rows = np.concatenate(pages)
+                    self._write(symbol, timeframe, rows[(rows[:, TS] >= a) & (rows[:, TS] < b)])
+            start, end = (since, until) if cov is None else (min(since, cov[0]), max(until, cov[1]))
+            self._set_coverage(symbol, timeframe, start, end)
+
+    def extend(self, symbol, timeframe, rows, now_ms):
+        """Append freshly fetched candles that continue the stored range.
+
+        rows is one contiguous exchange response; only closed candles are
+        kept, and nothing is stored when it would leave a gap after the
+        coverage end (ensure() fills gaps).
+        """
+        if rows is None or not len(rows):
+            return
+        step = timeframe_ms(timeframe)
+        rows = np.asarray(rows, dtype=np.float64)
+        rows = rows[rows[:, TS] < now_ms // step * step]
+        if not len(rows):
+            return
+        with self._locked(symbol, timeframe):
+            cov = self.coverage(symbol, timeframe)
+            if cov is None:
+                start = rows[0, TS]
+            elif rows[0, TS] <= cov[1] < rows[-1, TS] + step:
+                start = cov[0]
+                rows = rows[rows[:, TS] >= cov[1]]
+            else:
+                return
+            self._write(symbol, timeframe, rows)
+            self._set_coverage(symbol, timeframe, start, rows[-1, TS] + step)
+
+
+def _sync(store, exchange, symbols, timeframe, days):
+    from candle_cache import CandleStore
+    from fetcher import fetch_many
+
+    candles = CandleStore(exchange, store=store)
+    now = exchange.milliseconds()
+    since = now - int(days * 86_400_000)
+    start_time = time.time()
+    fetch_many(lambda sym: candles.history(sym, timeframe, since, now), symbols, weight=0, label=str)
+    print(f"⏱️ Synced {len(symbols)} symbols ({timeframe}, {days} days) in {time.time() - start_time:.3f}s, "
+          f"{candles.stats['requests']} requests, {store.stats['rows_written']} new rows")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["sync", "info"])
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--num-symbols", type=int, default=100, help="top USDT pairs by 24h volume")
+    parser.add_argument("--symbols", help="comma-separated list instead of the top pairs")
+    args = parser.parse_args()
+
+    store = HistoryStore()
+    if args.command == "info":
+        for sym in store.symbols(args.timeframe):
+            start, end = store.coverage(sym, args.timeframe) or (0, 0)
+            print(f"{sym:<16} {time.strftime('%Y-%m-%d %H:%M', time.gmtime(start / 1000))} .. "
+                  f"{time.strftime('%Y-%m-%d %H:%M', time.gmtime(end / 1000))}")
+    else:
+        import ccxt
+        from markets_cache import MarketCache
+        from tickers import TickerSnapshot
+
+        exchange = ccxt.binance({"enableRateLimit": False})
+        if args.symbols:
+            symbols = args.symbols.split(",")
+        else:
+            tickers = TickerSnapshot(exchange).refresh()
+            usdt = [s for s in MarketCache(exchange).usdt_symbols() if s in tickers]
+            symbols = sorted(usdt, key=lambda s: tickers[s].quote_volume or 0, reverse=True)[:args.num_symbols]
+        _sync(store, exchange, symbols, args.timeframe, args.days)
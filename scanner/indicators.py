@@ -0,0 +1,185 @@
+import copy
+import math
+from collections import deque
+
+# ccxt row layout: [timestamp, open, high, low, close, volume]
+TS, CLOSE = 0, 4
+
+
+class EMA:
+    """Incremental equivalent of pandas Series.ewm(span=span, adjust=adjust).mean()."""
+
+    def __init__(self, span, adjust=False):
+        self.alpha = 2 / (span + 1)
+        self.adjust = adjust
+        self.num = 0.0  # adjust=True: weighted sum of inputs / adjust=False: current value
+        self.den = 0.0  # adjust=True: sum of weights / adjust=False: 1 once seeded
+        self.value = math.nan
+
+    def update(self, x):
+        if self.adjust:
+            self.num = x + (1 - self.alpha) * self.num
+            self.den = 1 + (1 - self.alpha) * self.den
+        elif self.den:
+            self.num = self.alpha * x + (1 - self.alpha) * self.num
+        else:
+            self.num, self.den = x, 1.0
+        self.value = self.num / self.den
+        return self.value
+
+
+class RollingMean:
+    """Mean of the last `window` values, nan until the window is full."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        return self.value
+
+    @property
+    def value(self):
+        return self.total / self.window if len(self.values) == self.window else math.nan
+
+
+class RSI:
+    """Simple-average RSI over `period` closes.
+
+    seed_zero=True matches scanner.add_indicators, where the first (undefined)
+    change counts as a zero gain/loss; seed_zero=False matches
+    market.compute_indicators, where it is skipped.
+    """
+
+    def __init__(self, period=14, seed_zero=True):
+        self.gain = RollingMean(period)
+        self.loss = RollingMean(period)
+        self.seed_zero = seed_zero
+        self.prev = None
+        self.value = math.nan
+
+    def update(self, close):
+        if self.prev is None:
+            if self.seed_zero:
+                self.gain.update(0.0)
+                self.loss.update(0.0)
+        else:
+            delta = close - self.prev
+            self.gain.update(max(delta, 0.0))
+            self.loss.update(max(-delta, 0.0))
+        self.prev = close
+        avg_gain, avg_loss = self.gain.value, self.loss.value
+        if math.isnan(avg_gain) or math.isnan(avg_loss):
+            self.value = math.nan
+        elif avg_loss:
+            self.value = 100 - 100 / (1 + avg_gain / avg_loss)
+        else:
+            self.value = 100.0 if avg_gain else math.nan
+        return self.value
+
+
+class StreamingIndicators:
+    """Indicator state for one (symbol, timeframe), updated in O(1) per closed candle.
+
+    Values match the pandas implementations:
+      ema50, ema200, rsi, macd, signal  -> scanner.add_indicators
+      ema50_adj, ema200_adj             -> ewm(span=50/200), read by scanner.check_golden_cross
+      ema20_adj, ema50_adj, rsi_market  -> market.compute_indicators, read by market.MarketRegime
+    """
+
+    def __init__(self):
+        self.ema50 = EMA(50)
+        self.ema200 = EMA(200)
+        self.ema12 = EMA(12)
+        self.ema26 = EMA(26)
+        self.signal = EMA(9)
+        self.rsi = RSI(14)
+        self.ema20_adj = EMA(20, adjust=True)
+        self.ema50_adj = EMA(50, adjust=True)
+        self.ema200_adj = EMA(200, adjust=True)
+        self.rsi_market = RSI(14, seed_zero=False)
+        self.last_ts = None
+        self.count = 0
+        self.values = {}
+
+    def update(self, ts, close):
+        """Feed one closed candle; candles at or before the last one seen are ignored."""
+        if self.last_ts is not None and ts <= self.last_ts:
+            return self.values
+        macd = self.ema12.update(close) - self.ema26.update(close)
+        self.values = {
+            "close": close,
+            "ema50": self.ema50.update(close),
+            "ema200": self.ema200.update(close),
+            "rsi": self.rsi.update(close),
+            "macd": macd,
+            "signal": self.signal.update(macd),
+            "ema20_adj": self.ema20_adj.update(close),
+            "ema50_adj": self.ema50_adj.update(close),
+            "ema200_adj": self.ema200_adj.update(close),
+            "rsi_market": self.rsi_market.update(close),
+        }
+        self.last_ts = ts
+        self.count += 1
+        return self.values
+
+    def seed(self, candles):
+        for row in candles:
+            self.update(int(row[TS]), float(row[CLOSE]))
+        return self.values
+
+    def preview(self, ts, close):
+        """Values as if the still-forming candle closed at `close`, without changing state."""
+        return copy.deepcopy(self).update(ts, close)
+
+    def snapshot(self):
+        return copy.deepcopy(self.__dict__)
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls.__new__(cls)
+        state.__dict__.update(copy.deepcopy(snapshot))
+        return state
+
+
+class IndicatorBook:
+    """StreamingIndicators per (symbol, timeframe), fed from cached candle arrays.
+
+    The state covers every candle since it was seeded, not just the rows
+    passed to the latest sync(): the values equal the pandas functions run
+    over that whole history. They drift from pandas over only the latest
+    fetch window as the EMAs outgrow it (~1% for ema200_adj after 1000
+    hourly syncs of 250 rows); the full-history value is the reference.
+    bench_indicators.py checks the parity over many sliding syncs.
+    """
+
+    def __init__(self):
+        self.states = {}
+
+    def sync(self, symbol, timeframe, candles):
+        """Advance the state with every closed candle not yet seen.
+
+        The last row of `candles` is the still-forming candle; the returned
+        values include it as a preview, like the pandas versions that run over
+        the full DataFrame (of every candle since the state was seeded).
+        """
+        if candles is None or not len(candles):
+            return {}
+        closed, forming = candles[:-1], candles[-1]
+        state = self.states.get((symbol, timeframe))
+        # Reseed when the new rows no longer overlap what the state has seen
+        if state is None or (len(closed) and state.last_ts is not None and closed[0][TS] > state.last_ts):
+            state = self.states[(symbol, timeframe)] = StreamingIndicators()
+        state.seed(closed)
+        return state.preview(int(forming[TS]), float(forming[CLOSE]))
+
+    def snapshot(self):
+        return {key: state.snapshot() for key, state in self.states.items()}
+
+    def restore(self, snapshot):
+        self.states = {key: StreamingIndicators.restore(state) for key, state in snapshot.items()}
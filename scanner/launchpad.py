@@ -1,6 +1,4 @@
 import ccxt
-import time
-import requests
 import os
 from datetime import datetime
 
@@ -8,6 +6,8 @@ from dotenv import load_dotenv
 
 load_dotenv()  # Loads .env file
 
+from notifier import notifier  # reads TELEGRAM_TOKEN / CHAT_ID, so load .env first
+
 # ------------------ CONFIG ------------------
 DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
@@ -42,64 +42,38 @@ if TRADING_MODE == "live":
 
 
 def send_telegram_message(message: str):
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    payload = {"chat_id": CHAT_ID, "text": message}
-    try:
-        requests.post(url, data=payload)
-    except Exception as e:
-        print(f"Failed to send Telegram message: {e}")
-
-# 🔹 Binance connection
-exchange = ccxt.binance()
-
-def get_usdt_pairs():
-    markets = exchange.load_markets()
-    return {symbol for symbol in markets.keys() if symbol.endswith("/USDT")}
-
-def get_pair_info(symbol: str):
-    """
-    Fetches detailed info about a trading pair (status, base asset, quote asset, etc.)
-    """
-    info = exchange.publicGetExchangeInfo()
-    for s in info["symbols"]:
-        if s["symbol"] == symbol.replace("/", ""):  # e.g. BTC/USDT → BTCUSDT
-            return {
-                "symbol": symbol,
-                "status": s["status"],  # TRADING, PENDING_TRADING, etc.
-                "baseAsset": s["baseAsset"],
-                "quoteAsset": s["quoteAsset"],
-                "permissions": s.get("permissions", [])
-            }
-    return None
-
-# Initial snapshot
-old_pairs = get_usdt_pairs()
-print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Initial number of USDT pairs: {len(old_pairs)}")
-
-while True:
-    time.sleep(300)  # check every 60 seconds
-    new_pairs = get_usdt_pairs()
-    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Current number of USDT pairs: {len(new_pairs)}")
-
-    added = new_pairs - old_pairs
-
-
-    if added:
-        for pair in added:
-            info = get_pair_info(pair)
-            if info:
-                msg = (
-                    f"🆕 New USDT Pair Listed on Binance!\n"
-                    f"• Symbol: {info['symbol']}\n"
-                    f"• Base Asset: {info['baseAsset']}\n"
-                    f"• Quote Asset: {info['quoteAsset']}\n"
-                    f"• Status: {info['status']}\n"
-                    f"• Permissions: {', '.join(info['permissions'])}"
-                )
-            else:
-                msg = f"🆕 New USDT Pair: {pair} (details not available yet)"
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
-            send_telegram_message(msg)
-
-
-    old_pairs = new_pairs
+    notifier.send_text(message)
+
+def format_listing(event):
+    info = event.info
+    if event.kind == "listed":
+        return (
+            f"🆕 New USDT Pair Listed on Binance!\n"
+            f"• Symbol: {info['symbol']}\n"
+            f"• Base Asset: {info['baseAsset']}\n"
+            f"• Quote Asset: {info['quoteAsset']}\n"
+            f"• Status: {info['status']}\n"
+            f"• Permissions: {', '.join(info['permissions']) or 'n/a'}"
+        )
+    return f"🔔 {info['symbol']} status: {event.old_status} → {event.new_status}"
+
+def main():
+    from listings import ListingDetector
+
+    detector = ListingDetector(quote="USDT")
+
+    @detector.on_event
+    def notify(event):
+        msg = format_listing(event)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
+        send_telegram_message(msg)
+
+    # Initial snapshot
+    detector.sync()
+    usdt = sum(1 for s in detector.index.values() if s["quoteAsset"] == "USDT")
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Initial number of USDT pairs: {usdt}")
+    detector.run()
+
+
+if __name__ == "__main__":
+    main()
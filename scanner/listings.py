@@ -0,0 +1,208 @@
+"""New Binance spot listings and symbol status changes, detected from a local exchangeInfo index.
+
+One full exchangeInfo (without the bulky permission sets) builds the index.
+After that each poll only asks for small views of it:
+  - exchangeInfo?symbolStatus=PENDING_TRADING: announced pairs, a few KB.
+    A pair that drops out of it has changed status and is re-read on its own.
+  - ticker/price (idle polls only): ids not in the index are pairs that went
+    straight to trading.
+Polls run every LISTING_FAST_SECONDS while a pair is waiting to open and
+every LISTING_POLL_SECONDS otherwise, and a full resync every
+LISTING_FULL_SECONDS catches everything else (halts, delistings).
+
+  python listings.py    # print events as they happen
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, namedtuple
+
+import requests
+
+from fetcher import call
+from metrics import timed
+
+# ------------------ CONFIG ------------------
+BINANCE_API_URL = os.getenv("BINANCE_API_URL", "https://api.binance.com/api/v3")
+LISTING_POLL_SECONDS = float(os.getenv("LISTING_POLL_SECONDS", 30))  # idle poll interval
+LISTING_FAST_SECONDS = float(os.getenv("LISTING_FAST_SECONDS", 5))  # poll interval while a pair is PENDING_TRADING
+LISTING_FULL_SECONDS = float(os.getenv("LISTING_FULL_SECONDS", 1800))  # full exchangeInfo resync
+LISTING_TIMEOUT = float(os.getenv("LISTING_TIMEOUT", 10))  # HTTP timeout per request
+LISTING_BACKOFF_MAX = 300  # seconds between polls after repeated failures
+
+# Binance request weights
+EXCHANGE_INFO_WEIGHT = 20
+TICKER_PRICE_WEIGHT = 4
+
+# kind: "listed" for an id not in the index, "status" when a known pair's status changes
+ListingEvent = namedtuple("ListingEvent", "kind symbol old_status new_status info")
+
+
+def _summary(s):
+    """The fields the detector keeps from one exchangeInfo symbol entry."""
+    return {
+        "id": s["symbol"],
+        "symbol": f"{s['baseAsset']}/{s['quoteAsset']}",
+        "status": s["status"],
+        "baseAsset": s["baseAsset"],
+        "quoteAsset": s["quoteAsset"],
+        "permissions": [name for name, key in (("SPOT", "isSpotTradingAllowed"), ("MARGIN", "isMarginTradingAllowed"))
+                        if s.get(key)],
+    }
+
+
+class ListingDetector:
+    """Polls Binance for new pairs and status transitions and calls the listeners.
+
+    listeners are called as fn(ListingEvent) on the detector thread, only for
+    pairs quoted in `quote` (None for all). The first sync builds the index
+    without events.
+    """
+
+    def __init__(self, quote="USDT", base_url=BINANCE_API_URL, poll=LISTING_POLL_SECONDS,
+                 fast=LISTING_FAST_SECONDS, full=LISTING_FULL_SECONDS):
+        self.quote = quote
+        self.base_url = base_url
+        self.poll_seconds = poll
+        self.fast_seconds = fast
+        self.full_seconds = full
+        self.index = {}  # exchange id (e.g. BTCUSDT) -> _summary()
+        self.listeners = []
+        self.session = requests.Session()
+        self.synced_at = 0.0  # monotonic time of the last full sync
+        self.priced_at = 0.0  # monotonic time of the last ticker/price check
+        self.status_filter = True  # cleared if the API rejects symbolStatus
+        self.unlisted = set()  # ids in ticker/price that exchangeInfo does not know
+        self.stats = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def on_event(self, fn):
+        self.listeners.append(fn)
+        return fn
+
+    def _get(self, path, weight, **params):
+        resp = call(self.session.get, f"{self.base_url}/{path}", params=params, timeout=LISTING_TIMEOUT, weight=weight,
+                    endpoint=path)
+        resp.raise_for_status()
+        self.stats["requests"] += 1
+        self.stats["bytes"] += len(resp.content)
+        return resp.json()
+
+    def _exchange_info(self, **params):
+        return [_summary(s) for s in
+                self._get("exchangeInfo", EXCHANGE_INFO_WEIGHT, showPermissionSets="false", **params)["symbols"]]
+
+    def _apply(self, summary):
+        """Update the index with one symbol entry and notify on anything new."""
+        old = self.index.get(summary["id"])
+        self.index[summary["id"]] = summary
+        if old is None:
+            event = ListingEvent("listed", summary["symbol"], None, summary["status"], summary)
+        elif old["status"] != summary["status"]:
+            event = ListingEvent("status", summary["symbol"], old["status"], summary["status"], summary)
+        else:
+            return
+        self.stats[event.kind] += 1
+        if self.quote is not None and summary["quoteAsset"] != self.quote:
+            return
+        for fn in self.listeners:
+            try:
+                fn(event)
+            except Exception as e:
+                print(f"❌ Listing listener failed for {event.symbol}: {e}")
+
+    def _recheck(self, ids):
+        """Re-read a few pairs by id (exchangeInfo?symbols=...)."""
+        ids = set(ids) - self.unlisted
+        if not ids:
+            return
+        try:
+            symbols = self._exchange_info(symbols=json.dumps(sorted(ids), separators=(",", ":")))
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code != 400:
+                raise
+            if len(ids) == 1:
+                self.unlisted |= ids  # priced but not in exchangeInfo; don't ask again
+                return
+            # One unknown id fails the whole request; retry them one by one
+            for i in ids:
+                self._recheck({i})
+            return
+        for summary in symbols:
+            self._apply(summary)
+
+    # ------------------ POLLING ------------------
+    @timed("listing_sync")
+    def sync(self):
+        """Full exchangeInfo: build the index, or diff against it on later calls."""
+        symbols = self._exchange_info()
+        if not self.index:
+            self.index = {s["id"]: s for s in symbols}
+        else:
+            for summary in symbols:
+                self._apply(summary)
+        self.synced_at = time.monotonic()
+        self.stats["syncs"] += 1
+
+    def pending(self):
+        return {i for i, s in self.index.items() if s["status"] == "PENDING_TRADING"}
+
+    def poll(self):
+        """One detection step; returns seconds until the next one."""
+        now = time.monotonic()
+        if not self.index or now - self.synced_at >= self.full_seconds:
+            self.sync()
+        else:
+            waiting = self.pending()
+            if self.status_filter:
+                try:
+                    announced = self._exchange_info(symbolStatus="PENDING_TRADING")
+                except requests.HTTPError as e:
+                    if e.response is None or e.response.status_code != 400:
+                        raise
+                    print("⚠️ exchangeInfo has no symbolStatus filter here; new pending pairs wait for the full sync")
+                    self.status_filter = False
+                    announced = None
+                if announced is not None:
+                    for summary in announced:
+                        self._apply(summary)
+                    waiting -= {s["id"] for s in announced}  # left PENDING_TRADING: fetch their new status
+                    self._recheck(waiting)
+            else:
+                self._recheck(waiting)
+
+            if now - self.priced_at >= self.poll_seconds:
+                self.priced_at = now
+                trading = {t["symbol"] for t in self._get("ticker/price", TICKER_PRICE_WEIGHT)}
+                self._recheck(trading - self.index.keys())
+        self.stats["polls"] += 1
+        return self.fast_seconds if self.pending() else self.poll_seconds
+
+    def run(self):
+        """Poll until stop(); failures back off exponentially up to LISTING_BACKOFF_MAX."""
+        failures = 0
+        while not self._stop.is_set():
+            try:
+                wait = self.poll()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                wait = min(self.poll_seconds * 2 ** failures, LISTING_BACKOFF_MAX)
+                print(f"❌ Listing poll failed, retrying in {wait:.0f}s: {e}")
+            self._stop.wait(wait)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="listings", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    detector = ListingDetector()
+    detector.on_event(lambda e: print(f"🆕 {e.kind}: {e.symbol} {e.old_status} -> {e.new_status}"))
+    detector.run()
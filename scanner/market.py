@@ -1,26 +1,36 @@
+import os
+import threading
 import time
-import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+
+from fetcher import WEIGHTS, fetch_many
+from indicators import IndicatorBook
+from metrics import timed
 
 # List of major cryptos to monitor
 major_cryptos = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "ADAUSDT", "XRPUSDT"]
 
 # Binance API endpoint (public, no auth required)
-BINANCE_URL = "https://api.binance.com/api/v3/klines"
+BINANCE_URL = os.getenv("BINANCE_KLINES_URL", "https://api.binance.com/api/v3/klines")
+MARKET_TIMEOUT = float(os.getenv("MARKET_TIMEOUT", 10))  # HTTP timeout per kline request
+MARKET_RETRY_SECONDS = 60  # how soon to retry after a failed refresh
+HOUR_MS = 60 * 60 * 1000
+
+# One keep-alive pool shared by the concurrent kline requests
+session = requests.Session()
+session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=len(major_cryptos)))
 
 def get_crypto_data(symbol, interval="15m", limit=100):
-    """Fetch OHLCV data from Binance"""
-    url = f"{BINANCE_URL}?symbol={symbol}&interval={interval}&limit={limit}"
-    data = requests.get(url).json()
-    df = pd.DataFrame(data, columns=[
-        "time","open","high","low","close","volume","close_time",
-        "qav","trades","taker_base_vol","taker_quote_vol","ignore"
-    ])
-    df["close"] = df["close"].astype(float)
-    return df
+    """Fetch klines from Binance as ccxt-layout OHLCV rows with the close time appended"""
+    resp = session.get(BINANCE_URL, params={"symbol": symbol, "interval": interval, "limit": limit},
+                       timeout=MARKET_TIMEOUT)
+    resp.raise_for_status()
+    return [[int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), int(k[6])]
+            for k in resp.json()]
 
 def compute_indicators(df):
-    """Add EMA and RSI indicators"""
+    """Add EMA and RSI indicators (pandas reference for IndicatorBook's ema20_adj, ema50_adj, rsi_market)"""
     df["ema20"] = df["close"].ewm(span=20).mean()
     df["ema50"] = df["close"].ewm(span=50).mean()
 
@@ -32,46 +42,90 @@ def compute_indicators(df):
     df["rsi"] = 100 - (100 / (1 + rs))
     return df
 
-def detect_buy_signal(df):
-    """Buy if EMA20 > EMA50 and RSI < 70"""
-    return (df["ema20"].iloc[-1] > df["ema50"].iloc[-1]) and (df["rsi"].iloc[-1] < 70)
+def detect_buy_signal(values):
+    """Buy if EMA20 > EMA50 and RSI < 70 (latest values from IndicatorBook.sync)"""
+    return values["ema20_adj"] > values["ema50_adj"] and values["rsi_market"] < 70
 
-def  get_market_indicator():
-    while True:
-        signals = {}
-        bullish_count = 0
+class MarketRegime:
+    """Broad-market verdict from the majors' hourly EMA20/EMA50 + RSI.
 
-        for sym in major_cryptos:
-            df = get_crypto_data(sym, interval="1h", limit=100)
-            df = compute_indicators(df)
-            last_price = df["close"].iloc[-1]
+    The klines for all majors are fetched concurrently and the verdict is
+    memoized until the current hourly candle closes, so callers in the buy
+    loop and health check share one computation per hour. Indicators are
+    kept in an IndicatorBook, so each refresh only feeds the candles that
+    closed since the last one.
+    """
 
-            if detect_buy_signal(df):
-                signals[sym] = f"BUY ✅ ({last_price:.2f})"
-                bullish_count += 1
-            else:
-                signals[sym] = f"HOLD ⚪ ({last_price:.2f})"
+    def __init__(self, symbols=major_cryptos, interval="1h", limit=100):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.limit = limit
+        self.breakdown = {}  # symbol -> {"price", "ema20", "ema50", "rsi", "bullish"}
+        self.bullish = None
+        self.indicators = IndicatorBook()
+        self.valid_until = 0  # ms; the verdict is recomputed after this
+        self.lock = threading.Lock()
+
+    @timed("market_regime_refresh")
+    def refresh(self):
+        klines = fetch_many(lambda s: get_crypto_data(s, interval=self.interval, limit=self.limit),
+                            self.symbols, weight=WEIGHTS["fetch_ohlcv"], endpoint="fetch_ohlcv")
+        breakdown = {}
+        next_close = None
+        for sym, rows in zip(self.symbols, klines):
+            if not rows:
+                continue
+            values = self.indicators.sync(sym, self.interval, rows)
+            breakdown[sym] = {"price": values["close"], "ema20": values["ema20_adj"],
+                              "ema50": values["ema50_adj"], "rsi": values["rsi_market"],
+                              "bullish": bool(detect_buy_signal(values))}
+            # The last kline is still forming; its close_time marks the next hourly close
+            next_close = max(next_close or 0, rows[-1][6] + 1)
 
-        # Print dashboard
+        if len(breakdown) < len(self.symbols) and self.bullish is not None:
+            print("❌ Market regime refresh incomplete, keeping previous verdict")
+            self.valid_until = int(time.time() * 1000) + MARKET_RETRY_SECONDS * 1000
+            return
+        if len(breakdown) < len(self.symbols):
+            # Missing majors count as not bullish; try again soon
+            next_close = int(time.time() * 1000) + MARKET_RETRY_SECONDS * 1000
+        bullish_count = sum(b["bullish"] for b in breakdown.values())
+        self.breakdown = breakdown
+        self.bullish = bullish_count >= len(self.symbols) * 0.7
+        self.valid_until = next_close or (int(time.time() * 1000) // HOUR_MS + 1) * HOUR_MS
+        self.print_dashboard(bullish_count)
+
+    def print_dashboard(self, bullish_count):
         print("\n--- Market Signal Dashboard ---")
-        for sym, sig in signals.items():
-            print(f"{sym}: {sig}")
-        print(f"Overall: {bullish_count}/{len(major_cryptos)} showing BUY")
+        for sym in self.symbols:
+            b = self.breakdown.get(sym)
+            if b is None:
+                print(f"{sym}: n/a")
+            else:
+                print(f"{sym}: {'BUY ✅' if b['bullish'] else 'HOLD ⚪'} ({b['price']:.2f})")
+        print(f"Overall: {bullish_count}/{len(self.symbols)} showing BUY")
 
-        if bullish_count >= len(major_cryptos) * 0.7:
+        if bullish_count >= len(self.symbols) * 0.7:
             print("🚀 Market is broadly bullish!")
-            return True
-        elif bullish_count <= len(major_cryptos) * 0.3:
+        elif bullish_count <= len(self.symbols) * 0.3:
             print("🔻 Market is broadly bearish!")
         else:
             print("🤔 Mixed signals across the market.")
 
-        return False
+    def is_bullish(self):
+        with self.lock:
+            if int(time.time() * 1000) >= self.valid_until:
+                self.refresh()
+            return self.bullish
+
+
+market_regime = MarketRegime()
 
+def get_market_indicator():
+    """True when at least 70% of the majors show a buy signal (cached until the next hourly close)."""
+    return market_regime.is_bullish()
 
-        # time.sleep(60)  # refresh every 1 minute
 
-# Run dashboard
-is_bullish = get_market_indicator()
-if is_bullish:
-    print("Market is bullish, consider trading strategies.")
\ No newline at end of file
+if __name__ == "__main__":
+    if get_market_indicator():
+        print("Market is bullish, consider trading strategies.")
@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+import time
+
+from fetcher import WEIGHTS, call
+
+# ------------------ CONFIG ------------------
+MARKETS_CACHE_PATH = os.getenv("MARKETS_CACHE_PATH",
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), ".markets_cache.json"))
+MARKETS_TTL = float(os.getenv("MARKETS_TTL", 6 * 3600))  # seconds before market metadata is reloaded
+
+
+class MarketCache:
+    """Exchange market metadata with a TTL, persisted to disk for warm starts.
+
+    The raw exchange `info` is dropped before saving; the public exchange only
+    needs ids, symbols and precision to fetch data. On startup a fresh enough
+    file is loaded into the exchange with set_markets, so no load_markets
+    request is made until the TTL expires.
+    """
+
+    def __init__(self, exchange, path=MARKETS_CACHE_PATH, ttl=MARKETS_TTL):
+        self.exchange = exchange
+        self.path = path
+        self.ttl = ttl
+        self.fetched_at = 0.0  # wall-clock time the metadata was fetched from the exchange
+        self.lock = threading.Lock()
+        self._usdt = []
+
+    def _apply(self, markets, fetched_at):
+        self.exchange.set_markets(markets)
+        self.fetched_at = fetched_at
+        self._usdt = [s for s in self.exchange.symbols if s.endswith("/USDT")]
+
+    def _load_file(self):
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if time.time() - cached["fetched_at"] >= self.ttl:
+            return False
+        self._apply(cached["markets"], cached["fetched_at"])
+        print(f"🔧 DEBUG: loaded {len(cached['markets'])} markets from {self.path}")
+        return True
+
+    def _save_file(self, markets):
+        compact = {s: {k: v for k, v in m.items() if k != "info"} for s, m in markets.items()}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump({"fetched_at": self.fetched_at, "markets": compact}, f, separators=(",", ":"))
+            os.replace(tmp, self.path)
+        except OSError as e:
+            print(f"⚠️ Could not persist market cache: {e}")
+
+    def ensure(self, force=False):
+        """Make sure the exchange has market metadata younger than the TTL.
+
+        force reloads from the exchange regardless, e.g. after a new listing.
+        """
+        with self.lock:
+            if not force and time.time() - self.fetched_at < self.ttl:
+                return
+            if not force and not self.fetched_at and self._load_file():
+                return
+            try:
+                markets = call(self.exchange.load_markets, True, weight=WEIGHTS["load_markets"])
+            except Exception as e:
+                if not self._usdt:
+                    raise
+                # Keep serving the old metadata and try again in a minute
+                print(f"❌ load_markets failed, keeping cached markets: {e}")
+                self.fetched_at = time.time() - self.ttl + 60
+                return
+            self._apply(markets, time.time())
+            self._save_file(markets)
+
+    def usdt_symbols(self):
+        self.ensure()
+        return self._usdt
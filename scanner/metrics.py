@@ -0,0 +1,245 @@
+"""In-process metrics with a Prometheus /metrics endpoint.
+
+Spans are timed with perf_counter_ns and recorded into fixed-bucket
+histograms; counters are plain floats under a lock. Components that already
+keep a `stats` Counter (caches, the position book, the listing detector) are
+registered once and read at scrape time, so their hot paths stay untouched.
+
+  with span("scan"):            # scanner_span_seconds{span="scan"}
+  @timed("place_order")         # same, as a decorator
+  EXCHANGE.observe_ns(ns, "fetch_ohlcv")
+  register_stats("candle_cache", candle_store.stats)
+  serve()                       # GET http://host:METRICS_PORT/metrics
+
+  python metrics.py             # micro-benchmark of span / observe cost
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# ------------------ CONFIG ------------------
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))  # 0 disables the HTTP endpoint
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"  # 0 turns every observe/inc into a no-op
+
+# Upper bounds in seconds, from a cached DB lookup up to a slow full-market scan
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(v):
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Counter:
+    """Monotonic total per label set."""
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, *labels):
+        if not METRICS_ENABLED:
+            return
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [(self.name, _labels(self.labelnames, k), v) for k, v in items]
+
+
+class Gauge(Counter):
+    """Last value set per label set."""
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        if not METRICS_ENABLED:
+            return
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations, observed in nanoseconds."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.bounds_ns = [b * 1e9 for b in self.buckets]
+        self.series = {}  # labels -> [count per bucket..., +Inf count, sum_ns]
+        self.lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe_ns(self, ns, *labels):
+        if not METRICS_ENABLED:
+            return
+        i = bisect_left(self.bounds_ns, ns)
+        with self.lock:
+            row = self.series.get(labels)
+            if row is None:
+                row = self.series[labels] = [0] * (len(self.buckets) + 2)
+            row[i] += 1
+            row[-1] += ns
+
+    def observe(self, seconds, *labels):
+        self.observe_ns(seconds * 1e9, *labels)
+
+    def count(self, *labels):
+        with self.lock:
+            row = self.series.get(labels)
+            return sum(row[:-1]) if row else 0
+
+    def samples(self):
+        with self.lock:
+            items = [(k, list(v)) for k, v in self.series.items()]
+        out = []
+        for labels, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), row[:-1]):
+                cumulative += n
+                le = bound if bound == "+Inf" else _number(bound)
+                out.append((f"{self.name}_bucket", _labels(self.labelnames + ("le",), labels + (le,)), cumulative))
+            out.append((f"{self.name}_sum", _labels(self.labelnames, labels), row[-1] / 1e9))
+            out.append((f"{self.name}_count", _labels(self.labelnames, labels), cumulative))
+        return out
+
+
+# ------------------ SCANNER METRICS ------------------
+SPANS = Histogram("scanner_span_seconds", "Duration of instrumented functions and blocks", ("span",))
+CYCLES = Histogram("scanner_cycle_seconds", "Duration of one scheduler cycle", ("cycle",))
+EXCHANGE = Histogram("scanner_exchange_request_seconds", "Exchange REST call latency, rate-limit wait excluded",
+                     ("endpoint",))
+DB = Histogram("scanner_db_statement_seconds", "Database statement latency, connection checkout included",
+               ("statement",))
+REQUEST_WEIGHT = Counter("scanner_exchange_request_weight_total", "Binance request weight spent", ("endpoint",))
+REQUEST_ERRORS = Counter("scanner_exchange_errors_total", "Exchange calls that raised", ("endpoint", "error"))
+RATE_LIMIT_WAIT = Counter("scanner_rate_limit_wait_seconds_total", "Time spent waiting on the local weight limiter")
+COMPONENT_EVENTS = Counter("scanner_component_events_total",
+                           "Events counted by caches and books (hits, requests, loads, ...)", ("component", "event"))
+
+
+class span:
+    """Time a block into a histogram (SPANS by default)."""
+    __slots__ = ("labels", "histogram", "start")
+
+    def __init__(self, name, histogram=SPANS):
+        self.labels = (name,)
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe_ns(time.perf_counter_ns() - self.start, *self.labels)
+        return False
+
+
+def timed(name=None, histogram=SPANS):
+    """Decorator form of span(); the label defaults to the function name."""
+    def wrap(fn):
+        label = (name or fn.__name__,)
+        observe = histogram.observe_ns
+
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(time.perf_counter_ns() - start, *label)
+        return inner
+    return wrap
+
+
+def register_stats(component, stats):
+    """Export a collections.Counter as scanner_component_events_total{component=...}.
+
+    The Counter is read at scrape time; the owner keeps incrementing it as before.
+    """
+    def collect():
+        return [(COMPONENT_EVENTS.name, _labels(COMPONENT_EVENTS.labelnames, (component, event)), value)
+                for event, value in list(stats.items())]
+    _collectors.append(collect)
+
+
+# ------------------ EXPOSITION ------------------
+def render():
+    """All metrics in the Prometheus text format (0.0.4)."""
+    lines = []
+    extra = [s for collect in _collectors for s in collect()]
+    for metric in _metrics:
+        samples = metric.samples()
+        if metric is COMPONENT_EVENTS:
+            samples += extra
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in samples)
+    return "\n".join(lines) + "\n"
+
+
+def serve(port=METRICS_PORT, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread; returns the server (None when port is 0)."""
+    if not port:
+        return None
+    # Imported here so modules that only record metrics don't pay for http.server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # one line per scrape would drown the scanner's own output
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
+
+
+if __name__ == "__main__":
+    n = 200_000
+    bench = Histogram("bench_seconds", "micro-benchmark", ("span",))
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        with span("bench", bench):
+            pass
+    per_span = (time.perf_counter_ns() - start) / n
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        bench.observe_ns(1234, "bench")
+    per_observe = (time.perf_counter_ns() - start) / n
+    print(f"span: {per_span:.0f}ns, observe_ns: {per_observe:.0f}ns")
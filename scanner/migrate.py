@@ -0,0 +1,105 @@
+"""Versioned schema migrations for the scanner's Postgres tables.
+
+Usage: python migrate.py [--status]
+
+migrations/NNNN_name.sql files are applied in version order, each in its own
+transaction, and recorded in schema_migrations. A transaction-level advisory
+lock keeps two processes from migrating at once. Every run also makes sure
+crypto_signals has partitions for the coming PARTITION_MONTHS_AHEAD months.
+"""
+import argparse
+import os
+import re
+import time
+
+import db
+
+# ------------------ CONFIG ------------------
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 2))
+LOCK_KEY = 7_310_019  # pg_advisory_xact_lock key shared by every migrate() caller
+
+
+def available():
+    """[(version, name, path)] of the migration files, sorted by version."""
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = re.fullmatch(r"(\d+)_(\w+)\.sql", filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(found)
+
+
+def _applied(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
+
+
+def ensure_partitions(cur, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Create the missing crypto_signals month partitions up to months_ahead; returns how many."""
+    cur.execute("SELECT to_regproc('create_crypto_signals_partitions')")
+    if cur.fetchone()[0] is None:
+        return 0
+    cur.execute("SELECT create_crypto_signals_partitions(CURRENT_DATE, %s)", (months_ahead,))
+    return cur.fetchone()[0]
+
+
+def migrate(conn=None):
+    """Apply every pending migration; returns the versions applied.
+
+    conn is an open psycopg2 connection (the caller's search_path applies);
+    by default one is borrowed from the db pool.
+    """
+    if conn is None:
+        with db.connection() as conn:
+            return migrate(conn)
+
+    done = []
+    for version, name, path in available():
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", (LOCK_KEY,))
+            if version in _applied(cur):
+                conn.commit()
+                continue
+            start_time = time.time()
+            with open(path) as f:
+                cur.execute(f.read())
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        conn.commit()
+        done.append(version)
+        print(f"💾 Applied migration {version:04d}_{name} in {time.time() - start_time:.3f}s")
+
+    with conn.cursor() as cur:
+        created = ensure_partitions(cur)
+    conn.commit()
+    if created:
+        print(f"💾 Created {created} crypto_signals partitions")
+    return done
+
+
+def status(conn):
+    with conn.cursor() as cur:
+        applied = _applied(cur)
+    conn.commit()
+    for version, name, _ in available():
+        print(f"{'applied' if version in applied else 'pending':>8}  {version:04d}_{name}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--status", action="store_true", help="list migrations without applying them")
+    args = parser.parse_args()
+
+    with db.connection() as conn:
+        if args.status:
+            status(conn)
+        else:
+            applied = migrate(conn)
+            print(f"✅ Schema up to date ({len(applied)} migrations applied)")
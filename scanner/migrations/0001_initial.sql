@@ -1,3 +1,5 @@
+-- Baseline schema (formerly postgres_schema.sql); IF NOT EXISTS keeps it a no-op on existing databases
+
 CREATE TABLE IF NOT EXISTS crypto_signals (
     id SERIAL PRIMARY KEY,
     symbol VARCHAR(20) NOT NULL,
@@ -29,3 +31,27 @@ CREATE TABLE IF NOT EXISTS positions (
     timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     status VARCHAR(10) DEFAULT 'open'
 );
+
+-- Ranked parameter sweeps written by sweep.py --db
+CREATE TABLE IF NOT EXISTS sweep_results (
+    id SERIAL PRIMARY KEY,
+    run_id VARCHAR(20) NOT NULL,
+    rank INTEGER,
+    threshold FLOAT,
+    trail_days INTEGER,
+    volume_hours INTEGER,
+    num_symbols INTEGER,
+    trailing_stop_pct FLOAT,
+    profit_target_pct FLOAT,
+    trade_max INTEGER,
+    total_trades INTEGER,
+    win_rate FLOAT,
+    avg_profit FLOAT,
+    avg_loss FLOAT,
+    total_pnl FLOAT,
+    max_drawdown FLOAT,
+    open_at_end INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_sweep_run_rank ON sweep_results(run_id, rank);
@@ -0,0 +1,11 @@
+-- has_open_coin / get_open_positions and the open arm of has_open_position:
+-- only a handful of positions are open at any time
+CREATE INDEX IF NOT EXISTS idx_positions_open ON positions(symbol) WHERE status = 'open';
+
+-- The "already traded today" arm of has_open_position
+CREATE INDEX IF NOT EXISTS idx_positions_symbol_time ON positions(symbol, timestamp);
+
+-- performance_analysis, pnl.py and the Grafana panels read closed positions in
+-- time order; the included columns let them run as index-only scans
+CREATE INDEX IF NOT EXISTS idx_positions_closed_time ON positions(timestamp)
+    INCLUDE (symbol, entry_price, last_price, amount) WHERE status = 'closed';
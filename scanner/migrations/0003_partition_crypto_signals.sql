@@ -0,0 +1,70 @@
+-- crypto_signals becomes a table partitioned by month on timestamp, so time
+-- filtered queries only touch the months they need and old months can be
+-- detached or dropped whole. migrate.py keeps PARTITION_MONTHS_AHEAD months
+-- of partitions ready; anything outside them lands in crypto_signals_default.
+
+CREATE OR REPLACE FUNCTION create_crypto_signals_partitions(first_month DATE, months_ahead INTEGER)
+RETURNS INTEGER LANGUAGE plpgsql AS $$
+DECLARE
+    part_month DATE := date_trunc('month', first_month);
+    last_month DATE := date_trunc('month', CURRENT_DATE) + make_interval(months => months_ahead);
+    part_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE part_month <= last_month LOOP
+        part_name := 'crypto_signals_' || to_char(part_month, 'YYYY_MM');
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I PARTITION OF crypto_signals FOR VALUES FROM (%L) TO (%L)',
+                           part_name, part_month, part_month + INTERVAL '1 month');
+            created := created + 1;
+        END IF;
+        part_month := part_month + INTERVAL '1 month';
+    END LOOP;
+    RETURN created;
+END
+$$;
+
+ALTER TABLE crypto_signals RENAME TO crypto_signals_unpartitioned;
+ALTER TABLE crypto_signals_unpartitioned RENAME CONSTRAINT crypto_signals_pkey TO crypto_signals_unpartitioned_pkey;
+DROP INDEX IF EXISTS idx_symbol_time;
+
+-- The partition key has to be part of the primary key
+CREATE TABLE crypto_signals (
+    id INTEGER NOT NULL DEFAULT nextval('crypto_signals_id_seq'),
+    symbol VARCHAR(20) NOT NULL,
+    timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    surge FLOAT,
+    rsi FLOAT,
+    macd FLOAT,
+    macd_signal FLOAT,
+    golden_cross BOOLEAN,
+    signals TEXT,
+    close_price FLOAT,
+    llm_summary TEXT,
+    llm_risk TEXT,
+    future_6h FLOAT,
+    future_24h FLOAT,
+    return_6h FLOAT,
+    return_24h FLOAT,
+    PRIMARY KEY (id, timestamp)
+) PARTITION BY RANGE (timestamp);
+
+CREATE TABLE crypto_signals_default PARTITION OF crypto_signals DEFAULT;
+
+SELECT create_crypto_signals_partitions(
+    COALESCE((SELECT min(timestamp) FROM crypto_signals_unpartitioned)::date, CURRENT_DATE), 2);
+
+INSERT INTO crypto_signals (id, symbol, timestamp, surge, rsi, macd, macd_signal, golden_cross, signals,
+                            close_price, llm_summary, llm_risk, future_6h, future_24h, return_6h, return_24h)
+SELECT id, symbol, COALESCE(timestamp, LOCALTIMESTAMP), surge, rsi, macd, macd_signal, golden_cross, signals,
+       close_price, llm_summary, llm_risk, future_6h, future_24h, return_6h, return_24h
+FROM crypto_signals_unpartitioned;
+
+ALTER SEQUENCE crypto_signals_id_seq OWNED BY crypto_signals.id;
+DROP TABLE crypto_signals_unpartitioned;
+
+-- Grafana and query_db.py aggregate by symbol over time ranges
+CREATE INDEX idx_symbol_time ON crypto_signals(symbol, timestamp);
+
+-- update_future_returns only looks at rows still waiting for their 24h return
+CREATE INDEX idx_signals_pending ON crypto_signals(timestamp) WHERE future_24h IS NULL;
@@ -0,0 +1,4 @@
+-- position_book.PositionBook now answers has_open_position from memory; its
+-- load query needs today's entries across all symbols instead of per symbol
+DROP INDEX IF EXISTS idx_positions_symbol_time;
+CREATE INDEX IF NOT EXISTS idx_positions_time ON positions(timestamp);
@@ -0,0 +1,158 @@
+import atexit
+import os
+import queue
+import threading
+import time
+
+import requests
+
+from metrics import span
+
+# ------------------ CONFIG ------------------
+TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
+CHAT_ID = os.getenv("CHAT_ID")
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")  # point at telegram_stub.py for testing
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", 500))
+NOTIFY_COALESCE_SECONDS = float(os.getenv("NOTIFY_COALESCE_SECONDS", 2))  # texts within this window go out as one
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", 10))  # HTTP timeout per request
+NOTIFY_RETRIES = 3
+TELEGRAM_MAX_TEXT = 4096
+
+_STOP = object()  # queued by close(); None already means "nothing pending"
+
+
+class TelegramNotifier:
+    """Background Telegram sender with a bounded queue.
+
+    send_text/send_photo only enqueue, so the trading loop never waits on
+    Telegram. A worker thread posts over a persistent requests.Session,
+    merges texts queued within NOTIFY_COALESCE_SECONDS into one message,
+    honours retry_after on 429 responses and drains the queue on close().
+    """
+
+    def __init__(self, token=TELEGRAM_TOKEN, chat_id=CHAT_ID, base_url=TELEGRAM_API_URL,
+                 maxsize=NOTIFY_QUEUE_SIZE, coalesce=NOTIFY_COALESCE_SECONDS):
+        self.url = f"{base_url}/bot{token}"
+        self.chat_id = chat_id
+        self.coalesce = coalesce
+        self.queue = queue.Queue(maxsize)
+        self.session = requests.Session()
+        self.sent = 0
+        self.dropped = 0
+        self._pending = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="telegram", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _put(self, item):
+        self._ensure_worker()
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ Telegram queue full, dropping {item[0]} message")
+
+    def send_text(self, text):
+        self._put(("text", text))
+
+    def send_photo(self, photo, caption=""):
+        """Queue a photo given as PNG bytes or a file path (read now, so the file can be removed)."""
+        if isinstance(photo, str):
+            with open(photo, "rb") as f:
+                photo = f.read()
+        self._put(("photo", photo, caption))
+
+    def close(self, timeout=30):
+        """Send everything still queued, then stop the worker."""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self.queue.put(_STOP)
+        self._thread.join(timeout)
+
+    # ------------------ WORKER ------------------
+    def _next(self, timeout=None):
+        if self._pending is not None:
+            item, self._pending = self._pending, None
+            return item
+        return self.queue.get(timeout=timeout)
+
+    def _collect_texts(self, first):
+        texts = [first[1]]
+        deadline = time.monotonic() + self.coalesce
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._next(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP or item[0] != "text":
+                self._pending = item  # handled after the merged text goes out
+                break
+            texts.append(item[1])
+        # Merge into as few messages as Telegram's length limit allows
+        messages = [texts[0]]
+        for text in texts[1:]:
+            if len(messages[-1]) + 2 + len(text) <= TELEGRAM_MAX_TEXT:
+                messages[-1] += "\n\n" + text
+            else:
+                messages.append(text)
+        return messages
+
+    def _worker(self):
+        while True:
+            item = self._next()
+            if item is _STOP:
+                return
+            try:
+                if item[0] == "text":
+                    for text in self._collect_texts(item):
+                        self._post("sendMessage", {"chat_id": self.chat_id, "text": text[:TELEGRAM_MAX_TEXT]})
+                else:
+                    _, photo, caption = item
+                    self._post("sendPhoto", {"chat_id": self.chat_id, "caption": caption},
+                               files={"photo": ("chart.png", photo)})
+            except Exception as e:
+                print(f"❌ Telegram send failed: {e}")
+
+    def _post(self, method, data, files=None):
+        with span(f"telegram_{method}"):
+            return self._send(method, data, files)
+
+    def _send(self, method, data, files):
+        for attempt in range(NOTIFY_RETRIES + 1):
+            try:
+                resp = self.session.post(f"{self.url}/{method}", data=data, files=files, timeout=NOTIFY_TIMEOUT)
+            except requests.RequestException as e:
+                if attempt == NOTIFY_RETRIES:
+                    raise
+                print(f"⚠️ Telegram {method} error, retrying: {e}")
+                time.sleep(2 ** attempt)
+                continue
+            if resp.status_code == 429:
+                try:
+                    retry_after = resp.json()["parameters"]["retry_after"]
+                except (ValueError, KeyError, TypeError):
+                    retry_after = 2 ** attempt
+                print(f"⚠️ Telegram rate limited, retrying {method} in {retry_after}s")
+                time.sleep(retry_after)
+                continue
+            if resp.status_code >= 500 and attempt < NOTIFY_RETRIES:
+                time.sleep(2 ** attempt)
+                continue
+            if resp.ok:
+                self.sent += 1
+            else:
+                print(f"❌ Telegram {method} returned {resp.status_code}: {resp.text[:200]}")
+            return resp
+        raise RuntimeError(f"Telegram {method} still rate limited after {NOTIFY_RETRIES} retries")
+
+
+notifier = TelegramNotifier()
@@ -0,0 +1,52 @@
+"""Check that TelegramNotifier.close() delivers what is queued and returns promptly.
+
+Usage: python notify_check.py
+
+Runs against telegram_stub.py, no network needed. close() is called right
+after the sends, while the worker is still inside its coalesce window, which
+is where the shutdown sentinel used to get lost: the worker then blocked on
+the queue and close() waited out its whole timeout. Exits non-zero if any
+check fails.
+"""
+import sys
+import time
+
+from notifier import TelegramNotifier
+from telegram_stub import TelegramStub
+
+COALESCE = 1.0
+TIMEOUT = 8
+
+
+def check(name, sends, expected):
+    """Queue `sends`, close() immediately, and compare what reached the stub."""
+    stub = TelegramStub(quiet=True).start()
+    notifier = TelegramNotifier(token="check", chat_id="1", base_url=stub.url, coalesce=COALESCE)
+    for send in sends:
+        send(notifier)
+    start = time.monotonic()
+    notifier.close(timeout=TIMEOUT)
+    elapsed = time.monotonic() - start
+    stub.stop()
+    methods = [method for method, _ in stub.requests]
+    failures = []
+    if notifier._thread.is_alive():
+        failures.append("worker still running")
+    if elapsed > COALESCE + 1:
+        failures.append(f"close() took {elapsed:.1f}s")
+    if methods != expected:
+        failures.append(f"sent {methods}, expected {expected}")
+    print(f"{'❌' if failures else '✅'} {name}: close() in {elapsed:.2f}s, sent {methods} {'; '.join(failures)}")
+    return not failures
+
+
+if __name__ == "__main__":
+    photo = b"\x89PNG fake"
+    results = [
+        check("one text", [lambda n: n.send_text("a")], ["sendMessage"]),
+        check("texts coalesced", [lambda n: n.send_text("a"), lambda n: n.send_text("b")], ["sendMessage"]),
+        check("text then photo", [lambda n: n.send_text("a"), lambda n: n.send_photo(photo, "c")],
+              ["sendMessage", "sendPhoto"]),
+        check("photo only", [lambda n: n.send_photo(photo, "c")], ["sendPhoto"]),
+    ]
+    sys.exit(0 if all(results) else 1)
@@ -1,30 +1,18 @@
 import pandas as pd
 import matplotlib.pyplot as plt
-import psycopg2
 import numpy as np
-import os
-
-# ------------------ CONFIG ------------------
-DB_CONFIG = {
-    "host": os.environ.get("DB_HOST", "localhost"),
-    "dbname": os.environ.get("DB_NAME", "crypto_db"),
-    "user": os.environ.get("DB_USER", "crypto_user"),
-    "password": os.environ.get("DB_PASS", "crypto_pass"),
-    "port": 5432
-}
+import db
 
 # ------------------ FETCH DATA ------------------
 def fetch_positions():
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        df = pd.read_sql("""
-            SELECT symbol, side, entry_price, last_price, amount, timestamp
-            FROM positions
-            WHERE status='closed'
-            ORDER BY timestamp
-        """, conn)
-        conn.close()
-        return df
+        with db.connection() as conn:
+            return pd.read_sql("""
+                SELECT symbol, side, entry_price, last_price, amount, timestamp
+                FROM positions
+                WHERE status='closed'
+                ORDER BY timestamp
+            """, conn)
     except Exception as e:
         print(f"❌ DB fetch error: {e}")
         return pd.DataFrame()
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import db
+from metrics import timed
+from queries import POSITION_BOOK_SQL
+from records import Position
+
+# ------------------ CONFIG ------------------
+POSITION_RECONCILE_SECONDS = float(os.getenv("POSITION_RECONCILE_SECONDS", 600))  # how often the book is checked against Postgres
+
+
+
+class PositionBook:
+    """Open positions and today's entries, held in memory and written through to Postgres.
+
+    Loaded with one query on first use; open_count(), is_blocked() and
+    open_positions() then answer without a DB round-trip. add()/close()
+    write to the positions table first and update the book only when the
+    write succeeded, and reconcile() reloads it so changes made outside this
+    process (or a failed write) are picked up. "Today" follows the database
+    clock, as the SQL it replaces did.
+    """
+
+    def __init__(self, reconcile_seconds=POSITION_RECONCILE_SECONDS):
+        self.reconcile_seconds = reconcile_seconds
+        self.open = {}  # symbol -> [Position, ...]
+        self.entries = {}  # symbol -> latest entry timestamp (DB local time)
+        self.clock_offset = None  # DB LOCALTIMESTAMP minus local datetime.now() at the last load
+        self.loaded_at = None  # monotonic time of the last load
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    def _fetch(self):
+        rows = db.fetchall(POSITION_BOOK_SQL)
+        opened, entries = {}, {}
+        for db_now, pos_id, symbol, side, entry_price, amount, ts, status in rows:
+            if pos_id is None:
+                continue
+            if status == 'open':
+                opened.setdefault(symbol, []).append(Position(pos_id, symbol, side, entry_price, amount, ts))
+            if ts is not None and (symbol not in entries or ts > entries[symbol]):
+                entries[symbol] = ts
+        return opened, entries, rows[0][0] - datetime.now()
+
+    @timed("position_book_load")
+    def load(self):
+        """Rebuild the book from the positions table with a single query."""
+        opened, entries, offset = self._fetch()
+        with self.lock:
+            self.open, self.entries, self.clock_offset = opened, entries, offset
+            self.loaded_at = time.monotonic()
+        self.stats["loads"] += 1
+        print(f"📒 Position book loaded {self.open_count()} open positions")
+
+    def reconcile(self):
+        """Reload from Postgres and report anything the book had wrong."""
+        try:
+            opened, entries, offset = self._fetch()
+        except Exception as e:
+            print(f"❌ Position book reconcile failed, keeping the current book: {e}")
+            return
+        with self.lock:
+            ids = lambda book: {pos.id for rows in book.values() for pos in rows}
+            missing, extra = ids(opened) - ids(self.open), ids(self.open) - ids(opened)
+            self.open, self.entries, self.clock_offset = opened, entries, offset
+            self.loaded_at = time.monotonic()
+        self.stats["reconciles"] += 1
+        if missing or extra:
+            self.stats["drift"] += 1
+            print(f"⚠️ Position book drift: {len(missing)} open positions added, {len(extra)} removed")
+
+    def _ready(self):
+        if self.loaded_at is None:
+            self.load()
+        elif time.monotonic() - self.loaded_at >= self.reconcile_seconds:
+            self.reconcile()
+
+    def _today(self):
+        return (datetime.now() + self.clock_offset).date()
+
+    # ------------------ QUERIES ------------------
+    def open_count(self):
+        self._ready()
+        with self.lock:
+            return sum(len(rows) for rows in self.open.values())
+
+    def is_blocked(self, symbol):
+        """True if symbol is held or was bought today (DB date)."""
+        self._ready()
+        with self.lock:
+            entry = self.entries.get(symbol)
+            return symbol in self.open or (entry is not None and entry.date() == self._today())
+
+    def open_positions(self):
+        """records.Position for every open position."""
+        self._ready()
+        with self.lock:
+            return [pos for rows in self.open.values() for pos in rows]
+
+    # ------------------ WRITES ------------------
+    def add(self, symbol, side, amount, entry_price):
+        """Insert an open position, then record it."""
+        self._ready()
+        pos_id, ts = db.fetchone("""
+            INSERT INTO positions (symbol, side, entry_price, amount)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id, timestamp
+        """, (symbol, side, entry_price, amount))
+        with self.lock:
+            self.open.setdefault(symbol, []).append(Position(pos_id, symbol, side, entry_price, amount, ts))
+            self.entries[symbol] = max(ts, self.entries.get(symbol, ts))
+
+    def close(self, symbol, exit_price):
+        """Mark every open position of symbol closed at exit_price, then drop them."""
+        self._ready()
+        db.execute("""
+            UPDATE positions SET last_price=%s, side='sale', status='closed'
+            WHERE symbol=%s AND status='open'
+        """, (exit_price, symbol))
+        with self.lock:
+            self.open.pop(symbol, None)
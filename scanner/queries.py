@@ -0,0 +1,18 @@
+"""SQL of the hot scanner queries, kept apart so explain_check.py can EXPLAIN them without importing scanner."""
+
+# Everything the position book holds: open positions plus today's entries for the one-buy-per-day rule.
+# The leading LOCALTIMESTAMP row makes the query return the DB clock even when no position matches.
+POSITION_BOOK_SQL = """
+    SELECT now.ts, p.id, p.symbol, p.side, p.entry_price, p.amount, p.timestamp, p.status
+    FROM (SELECT LOCALTIMESTAMP AS ts) AS now
+    LEFT JOIN positions AS p ON p.status = 'open' OR p.timestamp >= CURRENT_DATE
+"""
+
+# Signals still waiting for a future return; served by the partial idx_signals_pending index
+PENDING_SIGNALS_SQL = """
+    SELECT id, symbol, timestamp, close_price
+    FROM crypto_signals
+    WHERE future_24h IS NULL
+      AND timestamp <= LOCALTIMESTAMP - INTERVAL '7 hours'
+      AND (future_6h IS NULL OR timestamp <= LOCALTIMESTAMP - INTERVAL '25 hours')
+"""
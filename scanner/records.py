@@ -0,0 +1,100 @@
+"""Compact record types for the trading loop.
+
+Candles wrap the (n, 6) float64 rows the candle cache already holds, so the
+scan and exit paths read prices without building a DataFrame; to_df() and
+ohlcv_to_df() are for the edges (analysis, benchmarks, ad-hoc debugging).
+Ticker and Position are slotted dataclasses holding only the fields the
+loop reads.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+import numpy as np
+
+from vector_signals import CLOSE, HIGH, LOW, OPEN, TS, VOLUME
+
+
+def ohlcv_to_df(ohlcv):
+    """Convert raw ccxt OHLCV rows into the DataFrame layout used by the scanner."""
+    import pandas as pd
+
+    # ccxt returns [timestamp, open, high, low, close, volume]
+    df = pd.DataFrame(ohlcv, columns=['timestamp','open','high','low','close','volume'])
+    df['timestamp'] = df['timestamp'].astype('int64')
+    df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df.set_index('date', inplace=True)
+    return df[['open','close','volume','high','low','timestamp']]
+
+
+@dataclass(slots=True)
+class Candles:
+    """OHLCV rows [ts, open, high, low, close, volume] of one symbol, oldest first."""
+    symbol: str
+    rows: np.ndarray
+
+    @classmethod
+    def of(cls, symbol, rows):
+        return cls(symbol, np.asarray(rows, dtype=np.float64).reshape(-1, 6))
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def timestamp(self):
+        return self.rows[:, TS]
+
+    @property
+    def open(self):
+        return self.rows[:, OPEN]
+
+    @property
+    def high(self):
+        return self.rows[:, HIGH]
+
+    @property
+    def low(self):
+        return self.rows[:, LOW]
+
+    @property
+    def close(self):
+        return self.rows[:, CLOSE]
+
+    @property
+    def volume(self):
+        return self.rows[:, VOLUME]
+
+    @property
+    def last_close(self):
+        return float(self.rows[-1, CLOSE])
+
+    @property
+    def last_time(self):
+        """UTC datetime of the newest candle's open."""
+        return datetime.fromtimestamp(self.rows[-1, TS] / 1000, timezone.utc)
+
+    def to_df(self):
+        """The scanner's DataFrame layout (see ohlcv_to_df)."""
+        return ohlcv_to_df(self.rows.tolist())
+
+
+@dataclass(slots=True)
+class Ticker:
+    symbol: str
+    last: float | None
+    quote_volume: float | None
+    timestamp: int | None
+
+    @classmethod
+    def from_ccxt(cls, ticker):
+        return cls(ticker["symbol"], ticker.get("last"), ticker.get("quoteVolume"), ticker.get("timestamp"))
+
+
+@dataclass(slots=True)
+class Position:
+    """One open row of the positions table."""
+    id: int
+    symbol: str
+    side: str
+    entry_price: float
+    amount: float
+    timestamp: datetime | None = None
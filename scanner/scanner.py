@@ -1,30 +1,46 @@
 import ccxt
-import pandas as pd
 # import talib
 import requests
-import mplfinance as mpf
-import tempfile
 import os
-import psycopg2
+import db
+import metrics
+import migrate
 import time
+import queue
+import signal
+import threading
+import sys
 from datetime import datetime
 import pytz
-import functools
+import heapq
+from collections import defaultdict
+import numpy as np
+from psycopg2.extras import execute_values
 from dotenv import load_dotenv
 from market import get_market_indicator
-from get_list import *
-import schedule
+from get_list import get_USDT_balance, get_flow_balance
+from fetcher import fetch_many
+from candle_cache import CandleStore
+from history_store import HistoryStore
+from position_book import PositionBook
+from queries import PENDING_SIGNALS_SQL
+from records import Candles, ohlcv_to_df
+from vector_signals import latest_buy_signals, stack_candles
+from indicators import IndicatorBook
+from stream import KlineStream
+from tickers import TickerSnapshot
+from markets_cache import MarketCache
+from notifier import notifier
+from charts import ChartRenderer
+from shards import ShardPool
+from listings import ListingDetector
+from metrics import CYCLES, span, timed
+from scheduler import Scheduler
 
 # load_dotenv()  # Loads .env file
 
 # ------------------ CONFIG ------------------
-DB_CONFIG = {
-    "host": os.getenv("DB_HOST"),
-    "dbname": os.getenv("DB_NAME"),
-    "user": os.getenv("DB_USER"),
-    "password": os.getenv("DB_PASS"),
-    "port": 5432
-}
+# Database settings live in db.py (DB_HOST, DB_NAME, DB_USER, DB_PASS)
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
@@ -41,6 +57,16 @@ TRADING_MODE = os.environ.get("TRADING_MODE", "paper")
 TRADE_AMOUNT_USD = float(os.environ.get("TRADE_AMOUNT_USD", 50))
 TRADE_MAX = int(os.environ.get("TRADE_MAX", 5)) # maximum number of trades
 
+SCAN_MODE = os.getenv("SCAN_MODE", "poll")  # poll: REST every BUY_SCAN_SECONDS, stream: Binance kline websocket, sharded: poll over SHARD_WORKERS processes
+STREAM_EXIT_SECONDS = float(os.getenv("STREAM_EXIT_SECONDS", 60))  # exit check interval in stream mode
+BUY_SCAN_SECONDS = float(os.getenv("BUY_SCAN_SECONDS", 300))  # poll-mode buy scan cadence, aligned to the clock
+EXIT_CHECK_SECONDS = float(os.getenv("EXIT_CHECK_SECONDS", 30))  # poll-mode exit check cadence
+UNIVERSE_SECONDS = float(os.getenv("UNIVERSE_SECONDS", 3600))  # top-volume universe refresh
+CANDLE_CLOSE_DELAY = float(os.getenv("CANDLE_CLOSE_DELAY", 5))  # seconds after a candle close before scanning it
+FUTURE_RETURNS_OFFSET = 120  # seconds past the hour for the future-returns backfill, clear of the scan
+LISTINGS_ENABLED = os.getenv("LISTINGS_ENABLED", "1") == "1"  # watch for new Binance listings and scan them
+LISTING_UNIVERSE_HOURS = float(os.getenv("LISTING_UNIVERSE_HOURS", 72))  # how long a new listing stays in the scan universe
+
 # Initialize exchange for live trading
 exchange_live = None
 if TRADING_MODE == "live":
@@ -53,26 +79,12 @@ if TRADING_MODE == "live":
 def sydney_time():
     return datetime.now(pytz.timezone('Australia/Sydney')).strftime('%Y-%m-%d %H:%M:%S')
 
-def sydney_time_logger(func):
-    """A decorator to log function execution time with Sydney timestamps."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        print(f"[{sydney_time()}] --- Entering {func.__name__} ---")
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        print(f"[{sydney_time()}] --- Exiting {func.__name__}. Execution time: {end_time - start_time:.3f}s ---")
-        return result
-    return wrapper
-
 # Function to place order with logging
-@sydney_time_logger
+@timed()
 def place_order(symbol, side, amount):
-    start_time = time.time()
     print(f"🔧 DEBUG: place_order called with symbol={symbol}, side={side}, amount={amount}")
     try:
-        ticker = exchange.fetch_ticker(symbol)
-        price = ticker['last']
+        price = ticker_snapshot.last(symbol)
     
         if side == "sell":
             # Update position with exit price
@@ -96,133 +108,88 @@ def place_order(symbol, side, amount):
                 print(f"❌ Trade failed: {e}")
                 return None
     finally:
-        print(f"⏱️ place_order took {time.time() - start_time:.3f}s")
         msg = f"📊 {symbol}\n {side}"
         send_telegram_text(msg)
 
 
+# Open positions and today's entries, kept in memory and written through to Postgres
+position_book = PositionBook()
+
 # Save position to Postgres
+@timed()
 def save_position(symbol, side, amount, entry_price):
-    start_time = time.time()
     print(f"🔧 DEBUG: save_position called with symbol={symbol}, side={side}, amount={amount}, entry_price={entry_price}")
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO positions (symbol, side, entry_price, amount)
-            VALUES (%s, %s, %s, %s)
-        """, (symbol, side, entry_price, amount))
-        conn.commit()
-        cur.close()
-        conn.close()
+        position_book.add(symbol, side, amount, entry_price)
     except Exception as e:
         print(f"❌ Position DB error: {e}")
-    finally:
-        print(f"⏱️ save_position took {time.time() - start_time:.3f}s")
 
 # Update position with exit price for paper trading
+@timed()
 def update_position_exit(symbol, exit_price):
-    start_time = time.time()
     print(f"🔧 DEBUG: update_position_exit called with symbol={symbol}, exit_price={exit_price}")
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("""
-            UPDATE positions SET last_price=%s, side='sale', status='closed' 
-            WHERE symbol=%s AND status='open'
-        """, (exit_price, symbol))
-        conn.commit()
-        cur.close()
-        conn.close()
+        position_book.close(symbol, exit_price)
     except Exception as e:
         print(f"❌ Position exit update error: {e}")
-    finally:
-        print(f"⏱️ update_position_exit took {time.time() - start_time:.3f}s")
 
-# Check open positions for exit rules
-@sydney_time_logger
-def  get_open_positions():
-    start_time = time.time()
-    print(f"🔧 DEBUG: get_open_positions called")
+# Position checks are answered from the book; only its load and reconcile query Postgres
+def get_open_positions():
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("SELECT id, symbol, side, entry_price, amount FROM positions WHERE status='open'")
-        rows = cur.fetchall()
-        cur.close()
-        conn.close()
-        return rows
+        return position_book.open_positions()
     except Exception as e:
         print(f"❌ Failed to fetch positions: {e}")
         return []
-    finally:
-        print(f"⏱️ get_open_positions took {time.time() - start_time:.3f}s")
 
 def has_open_position(symbol):
-    start_time = time.time()
-    print(f"🔧 DEBUG: has_open_position called with symbol={symbol}")
+    # Open positions, or a trade for this symbol has already been made today
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        # Check for open positions or if a trade for this symbol has already been made today
-        cur.execute("SELECT COUNT(*) FROM positions WHERE symbol=%s AND (status='open' OR timestamp::date = CURRENT_DATE)", (symbol,))
-        count = cur.fetchone()[0]
-        cur.close()
-        conn.close()
-        return count > 0
+        return position_book.is_blocked(symbol)
     except Exception as e:
         print(f"❌ Failed to check position for {symbol}: {e}")
         return False
-    finally:
-        print(f"⏱️ has_open_position took {time.time() - start_time:.3f}s")
 
-@sydney_time_logger
 def has_open_coin():
-    start_time = time.time()
-    print("🔧 DEBUG: has_open_position called ")
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        # Check for open positions or if a trade for this symbol has already been made today
-        cur.execute("SELECT COUNT(*) FROM positions WHERE status='open'")
-        count = cur.fetchone()[0]
-        cur.close()
-        conn.close()
-        return count
+        return position_book.open_count()
     except Exception as e:
-        print(f"❌ Failed to check position for {symbol}: {e}")
+        print(f"❌ Failed to count open positions: {e}")
         return False
-    finally:
-        print(f"⏱️ has_open_position took {time.time() - start_time:.3f}s")
 
-exchange = ccxt.binance()
+# Request weight is budgeted by fetcher.limiter; ccxt's own throttle would serialise the fetch threads
+exchange = ccxt.binance({"enableRateLimit": False})
+history_store = HistoryStore()
+candle_store = CandleStore(exchange, store=history_store)
+indicator_book = IndicatorBook()
+ticker_snapshot = TickerSnapshot(exchange)
+market_cache = MarketCache(exchange)
+chart_renderer = ChartRenderer()
+
+# Cache hits, requests and reloads, read by /metrics at scrape time
+metrics.register_stats("candle_cache", candle_store.stats)
+metrics.register_stats("history_store", history_store.stats)
+metrics.register_stats("ticker_snapshot", ticker_snapshot.stats)
+metrics.register_stats("position_book", position_book.stats)
 
 # ------------------ TELEGRAM ------------------
+# Both only queue the message; notifier's worker thread does the HTTP calls
 def send_telegram_text(msg):
-    start_time = time.time()
     print(f"🔧 DEBUG: send_telegram_text called with msg length={len(msg)}")
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    requests.post(url, data={"chat_id": CHAT_ID, "text": msg})
-    print(f"⏱️ send_telegram_text took {time.time() - start_time:.3f}s")
-
-def send_telegram_chart(image_path, caption=""):
-    start_time = time.time()
-    print(f"🔧 DEBUG: send_telegram_chart called with image_path={image_path}, caption={caption}")
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendPhoto"
-    with open(image_path, "rb") as img:
-        files = {"photo": img}
-        data = {"chat_id": CHAT_ID, "caption": caption}
-        requests.post(url, files=files, data=data)
-    print(f"⏱️ send_telegram_chart took {time.time() - start_time:.3f}s")
+    notifier.send_text(msg)
+
+def send_telegram_chart(image, caption=""):
+    """Queue a chart given as a PNG file path or PNG bytes."""
+    print(f"🔧 DEBUG: send_telegram_chart called with caption={caption}")
+    notifier.send_photo(image, caption)
 
 # ------------------ DATABASE ------------------
+SIGNAL_COLUMNS = ("symbol", "rsi", "macd", "macd_signal", "golden_cross", "signals", "close_price")
+signal_writer = db.BatchWriter("crypto_signals", SIGNAL_COLUMNS)
+
 def save_to_postgres(symbol, rsi=None, macd=None, sig=None, golden_cross=None, signals=None, close_price=None):
-    start_time = time.time()
     # print(f"🔧 DEBUG: save_to_postgres called with symbol={symbol}, rsi={rsi}, signals={signals}")
+    # Rows are buffered and written in one transaction per cycle, see signal_writer.flush()
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-
         # Handle optional parameters. psycopg2 converts None to NULL.
         db_rsi = float(rsi) if rsi is not None else None
         db_macd = float(macd) if macd is not None else None
@@ -231,86 +198,149 @@ def save_to_postgres(symbol, rsi=None, macd=None, sig=None, golden_cross=None, s
         db_signals = ", ".join(signals) if signals else ""
         db_close_price = float(close_price) if close_price is not None else None
 
-        cur.execute("""
-            INSERT INTO crypto_signals 
-            (symbol, rsi, macd, macd_signal, golden_cross, signals, close_price)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """, (symbol, db_rsi, db_macd, db_sig, db_golden_cross, db_signals, db_close_price))
-        conn.commit()
-        cur.close()
-        conn.close()
+        signal_writer.add((symbol, db_rsi, db_macd, db_sig, db_golden_cross, db_signals, db_close_price))
     except Exception as e:
         print(f"❌ DB Error for {symbol}: {e}")
-    # finally:
-    #     print(f"⏱️ save_to_postgres took {time.time() - start_time:.3f}s")
 
 
+HOUR_MS = 3_600_000
+FUTURE_HORIZONS = (6, 24)  # hours after the signal candle
+
+
+@timed()
 def update_future_returns():
-    start_time = time.time()
     print(f"🔧 DEBUG: update_future_returns called")
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT id, symbol, timestamp, close_price
-            FROM crypto_signals
-            WHERE future_24h IS NULL;
-        """)
-        rows = cur.fetchall()
-        for row in rows:
-            sig_id, symbol, ts, entry_price = row
-            ohlcv = exchange.fetch_ohlcv(symbol, '1h', since=int(ts.timestamp() * 1000), limit=30)
-            if not ohlcv: 
+        # Rows younger than 7h cannot resolve either horizon yet; rows that already
+        # have future_6h only need another look once the 24h candle has closed
+        rows = db.fetchall(PENDING_SIGNALS_SQL)
+        if not rows:
+            return
+
+        pending = defaultdict(list)
+        for sig_id, symbol, ts, entry_price in rows:
+            pending[symbol].append((sig_id, ts, int(ts.timestamp() * 1000), entry_price))
+        symbols = list(pending)
+
+        # One covering candle range per symbol, fetched concurrently through the shared cache
+        now = exchange.milliseconds()
+        def load(sym):
+            ts_ms = [t for _, _, t, _ in pending[sym]]
+            until = min(max(ts_ms) + (FUTURE_HORIZONS[-1] + 2) * HOUR_MS, now)
+            return candle_store.history(sym, '1h', min(ts_ms), until)
+        histories = fetch_many(load, symbols, weight=0)
+
+        values = []
+        for sym, candles in zip(symbols, histories):
+            if candles is None or not len(candles):
                 continue
-            df = pd.DataFrame(ohlcv, columns=['time','open','high','low','close','volume'])
-            df['time'] = pd.to_datetime(df['time'], unit='ms')
-            future_6h = float(df['close'].iloc[6]) if len(df) > 6 else None
-            future_24h = float(df['close'].iloc[24]) if len(df) > 24 else None
-            return_6h = float((future_6h - entry_price)/entry_price*100) if future_6h else None
-            return_24h = float((future_24h - entry_price)/entry_price*100) if future_24h else None
-            cur.execute("""
-                UPDATE crypto_signals
-                SET future_6h=%s, future_24h=%s, return_6h=%s, return_24h=%s
-                WHERE id=%s
-            """, (future_6h, future_24h, return_6h, return_24h, sig_id))
-            conn.commit()
-        cur.close()
-        conn.close()
+            ids, stamps, ts_ms, entry = zip(*pending[sym])
+            entry = np.array(entry, dtype=np.float64)  # NULL close_price becomes nan
+            # ccxt's since= starts at the first candle opening at or after the signal
+            first_open = -(-np.array(ts_ms, dtype=np.int64) // HOUR_MS) * HOUR_MS
+            futures = []
+            for hours in FUTURE_HORIZONS:
+                target = first_open + hours * HOUR_MS
+                # As-of lookup: latest candle opening at or before the target, which must have closed
+                idx = np.searchsorted(candles[:, 0], target, side='right') - 1
+                ok = (idx >= 0) & (target + HOUR_MS <= now)
+                idx = np.clip(idx, 0, None)
+                ok &= candles[idx, 0] >= first_open
+                futures.append(np.where(ok, candles[idx, 4], np.nan))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                returns = [(f - entry) / entry * 100 for f in futures]
+            returns = [np.where(np.isfinite(r), r, np.nan) for r in returns]
+            resolved = ~(np.isnan(futures[0]) & np.isnan(futures[1]))
+            keys = [np.array(ids)[resolved].tolist(), np.array(stamps, dtype=object)[resolved].tolist()]
+            columns = keys + [c[resolved].tolist() for c in (*futures, *returns)]
+            # nan != nan, so this maps unresolved values to NULL
+            values.extend(tuple(None if v != v else v for v in row) for row in zip(*columns))
+
+        if values:
+            with db.cursor() as cur:
+                execute_values(cur, """
+                    UPDATE crypto_signals AS s
+                    SET future_6h = v.future_6h, future_24h = v.future_24h,
+                        return_6h = v.return_6h, return_24h = v.return_24h
+                    FROM (VALUES %s) AS v(id, timestamp, future_6h, future_24h, return_6h, return_24h)
+                    WHERE s.id = v.id AND s.timestamp = v.timestamp
+                """, values, template="(%s::int, %s::timestamp, %s::float8, %s::float8, %s::float8, %s::float8)",
+                    page_size=len(values))
+        print(f"🔧 DEBUG: resolved {len(values)} of {len(rows)} pending signals across {len(symbols)} symbols")
     except Exception as e:
         print(f"❌ Future return update error: {e}")
-    finally:
-        print(f"⏱️ update_future_returns took {time.time() - start_time:.3f}s")
+
+@timed()
+def maintain_schema():
+    """Apply pending migrations and keep crypto_signals partitions ahead of the clock."""
+    try:
+        migrate.migrate()
+    except Exception as e:
+        print(f"❌ Schema migration error: {e}")
 
 # ------------------ UTILS ------------------
 def percent_change(open_price, close_price):
     return (close_price - open_price) / open_price * 100
 
-def check_golden_cross(df, short=50, long=200):
-    df["ema_short"] = df["close"].ewm(span=short).mean()
-    df["ema_long"] = df["close"].ewm(span=long).mean()
-    return df["ema_short"].iloc[-1] > df["ema_long"].iloc[-1]
+def check_golden_cross(values):
+    """EMA50 above EMA200 (pandas ewm, adjust=True), given the values of indicator_book.sync()."""
+    return values['ema50_adj'] > values['ema200_adj']
 
 
-def plot_chart(df, symbol):
-    df_plot = df.copy()
-    df_plot.index = pd.to_datetime(df_plot['timestamp'], unit='ms')
-    df_plot = df_plot[['open','high','low','close','volume']]
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    mpf.plot(df_plot.tail(30), type='candle', volume=True, style='yahoo',
-             title=f"{symbol} - Last 30 Days", mav=(9,21,50), savefig=temp_file.name)
-    return temp_file.name
+def plot_chart(candles, symbol):
+    """Submit the last 30 candles (records.Candles) to the chart pool; returns a Future of PNG bytes."""
+    return chart_renderer.render(symbol, candles.rows[-30:])
+
+def send_chart(candles, symbol, caption):
+    """Render off-loop and queue the PNG for Telegram once it is ready; never raises, charts are cosmetic."""
+    def deliver(future):
+        try:
+            send_telegram_chart(future.result(), caption=caption)
+        except Exception as e:
+            print(f"❌ Chart for {symbol} failed: {e}")
+    try:
+        plot_chart(candles, symbol).add_done_callback(deliver)
+    except Exception as e:
+        print(f"❌ Chart for {symbol} failed: {e}")
 
+@timed()
 def get_top_usdt_symbols(limit=50):
-    start_time = time.time()
     print(f"🔧 DEBUG: get_top_usdt_symbols called with limit={limit}")
-    exchange.load_markets()
-    usdt_pairs = [s for s in exchange.symbols if s.endswith("/USDT")]
-    tickers = exchange.fetch_tickers()
-    volume_data = [(s, tickers[s]["quoteVolume"]) for s in usdt_pairs if s in tickers and "quoteVolume" in tickers[s]]
-    top_symbols = sorted(volume_data, key=lambda x: x[1], reverse=True)[:limit]
-    print(f"⏱️ get_top_usdt_symbols took {time.time() - start_time:.3f}s")
+    usdt_pairs = market_cache.usdt_symbols()
+    tickers = ticker_snapshot.refresh()
+    volume_data = [(s, tickers[s].quote_volume or 0) for s in usdt_pairs if s in tickers]
+    top_symbols = heapq.nlargest(limit, volume_data, key=lambda x: x[1])
     return [s[0] for s in top_symbols]
 
+# ------------------ NEW LISTINGS ------------------
+listing_detector = ListingDetector(quote="USDT")
+metrics.register_stats("listings", listing_detector.stats)
+recent_listings = {}  # symbol -> time it opened for trading
+listing_wakeup = threading.Event()  # set when a pair opens; refresh_universe then queues an early buy scan
+
+@listing_detector.on_event
+def on_listing(event):
+    print(f"🆕 Listing {event.kind}: {event.symbol} {event.old_status} -> {event.new_status}")
+    if event.new_status != "TRADING":
+        recent_listings.pop(event.symbol, None)
+        return
+    # ccxt only fetches symbols it has market metadata for
+    market_cache.ensure(force=True)
+    recent_listings[event.symbol] = time.time()
+    send_telegram_text(f"🆕 {event.symbol} is now trading on Binance, added to the scan universe")
+    listing_wakeup.set()
+    if "refresh_universe" in scheduler.jobs:
+        scheduler.trigger("refresh_universe")
+
+def scan_universe(num_symbols=NUM_SYMBOLS):
+    """Top USDT pairs by volume plus pairs listed in the last LISTING_UNIVERSE_HOURS."""
+    cutoff = time.time() - LISTING_UNIVERSE_HOURS * 3600
+    for sym, opened in list(recent_listings.items()):
+        if opened < cutoff:
+            recent_listings.pop(sym, None)
+    symbols = get_top_usdt_symbols(num_symbols)
+    return symbols + [sym for sym in recent_listings if sym not in symbols]
+
 def get_top_market_cap_symbols_db():
     """Fetch top 20 cryptocurrencies by market cap and save to database"""
     try:
@@ -338,16 +368,8 @@ def get_top_market_cap_symbols_db():
 
         
         # Save to database
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
-        for rank, item in enumerate(top_20, 1):
-            cur.execute("""
-                INSERT INTO market_caps (symbol, market_cap, rank)
-                VALUES (%s, %s, %s)
-            """, (item['symbol'], item['market_cap'], rank))
-        conn.commit()
-        cur.close()
-        conn.close()
+        db.insert_many("market_caps", ("symbol", "market_cap", "rank"),
+                       [(item['symbol'], item['market_cap'], rank) for rank, item in enumerate(top_20, 1)])
         
         return [item['symbol'] for item in top_20]
     except Exception as e:
@@ -379,9 +401,6 @@ def get_top_market_cap_symbols():
             for coin in data
         ]
         
-        exchange.load_markets()
-        usdt_pairs = [s for s in exchange.symbols if s.endswith("/USDT")]
-
         return [f"{item['symbol']}/USDT" for item in top_20]
     except Exception as e:
         print(f"❌ Failed to fetch market caps: {e}")
@@ -389,12 +408,8 @@ def get_top_market_cap_symbols():
     
 def get_ohlcv(symbol, timeframe='1d', limit=10):
     """Fetch OHLCV and return a pandas DataFrame."""
-    ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
-    # ccxt returns [timestamp, open, high, low, close, volume]
-    df = pd.DataFrame(ohlcv, columns=['timestamp','open','high','low','close','volume'])
-    df['date'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df.set_index('date', inplace=True)
-    return df[['open','close','volume','high','low','timestamp']]
+    ohlcv = candle_store.get(symbol, timeframe=timeframe, limit=limit)
+    return ohlcv_to_df(ohlcv)
 
 def check_buy_signal(symbol, df):
     """Add columns and return the last row with buy signal status."""
@@ -426,13 +441,12 @@ def check_buy_signal(symbol, df):
     # print(f"🔍 {symbol} {df.index[-1]} Buy signal: {df['buy_signal'].iloc[-1]}, Price change %: {df['price_change_pct'].iloc[-1]:.2f}%, Volume change: {df['volume_change'].iloc[-1]:.2f}")
     return df
 
-@sydney_time_logger
-def scan_symbols_last_day(num_symbols=10):
-    start_time = time.time()
+@timed()
+def scan_symbols_last_day(num_symbols=10, symbols=None):
     print(f"🔧 DEBUG: scan_symbols called")
     # SYMBOLS = fetch_binance_marketcap_top20(num_symbols)['symbol_pair'].tolist()
 
-    SYMBOLS = get_top_usdt_symbols(num_symbols)
+    SYMBOLS = symbols or scan_universe(num_symbols)
 
     # SYMBOLS = get_top_market_cap_symbols()
 
@@ -446,45 +460,47 @@ def scan_symbols_last_day(num_symbols=10):
 
     buy_signals_today = []
 
-    for sym in SYMBOLS:
-        df = get_ohlcv(sym, timeframe=timeframe, limit=limit)
+    candles = candle_store.refresh(SYMBOLS, timeframe=timeframe, limit=limit)
 
-        # ohlcv = exchange.fetch_ohlcv(sym, timeframe=timeframe, limit=limit)
-        # df = pd.DataFrame(ohlcv, columns=['time','open','high','low','close','volume'])
-        
-        # print(f"DEBUG: {sym} df.head(5):")
-        # print(df.head(5))
-
-        df = check_buy_signal(sym, df)
-        if df['buy_signal'].iloc[-1]:
-            buy_signals_today.append(sym)
-            alerts.append((sym, df))
-            print(f"✅ Buy signal for {sym} on {df.index[-1].date()}")
+    # Evaluate every symbol at once (same rule as check_buy_signal); alerts carry the raw rows
+    signalled = latest_buy_signals(stack_candles(candles, limit))
+    for sym, ohlcv, hit in zip(SYMBOLS, candles, signalled):
+        if not hit:
+            continue
+        record = Candles.of(sym, ohlcv)
+        buy_signals_today.append(sym)
+        alerts.append((sym, record))
+        print(f"✅ Buy signal for {sym} on {record.last_time.date()}")
 
     if buy_signals_today:
         print("✅ Buy signals detected today for:", ", ".join(buy_signals_today))
     else:
         print("❌ No buy signals today.")
 
-    print(f"⏱️ scan_symbols took {time.time() - start_time:.3f}s")
     return alerts
 
+def scan_shard(symbols):
+    """Buy scan for one shard's symbols; runs inside a ShardPool worker, which only reads market data."""
+    return scan_symbols_last_day(len(symbols), symbols=symbols) if symbols else []
+
 # ------------------ MAIN SCAN ------------------
+@timed()
 def scan_symbols(num_symbols=10):
-    start_time = time.time()
     print(f"🔧 DEBUG: scan_symbols called")
+    import pandas as pd
+
     SYMBOLS = get_top_usdt_symbols(num_symbols)
     alerts = []
-    for sym in SYMBOLS:
+    candles = candle_store.refresh(SYMBOLS, timeframe='1h', limit=250)
+    for sym, ohlcv in zip(SYMBOLS, candles):
         try:
-            ohlcv = exchange.fetch_ohlcv(sym, '1h', limit=250)
             df = pd.DataFrame(ohlcv, columns=['time','open','high','low','close','volume'])
-            # df['rsi'] = talib.RSI(df['close'], timeperiod=14)
-            # macd, macdsignal, _ = talib.MACD(df['close'], 12,26,9)
+            # RSI / MACD / golden cross from the incremental per-symbol state
+            values = indicator_book.sync(sym, '1h', ohlcv)
             surge = percent_change(df['open'].iloc[-1], df['close'].iloc[-1])
-            rsi_val = df['rsi'].iloc[-1]
-            macd_val, sig_val = macd.iloc[-1], macdsignal.iloc[-1]
-            golden_cross = check_golden_cross(df)
+            rsi_val = values['rsi']
+            macd_val, sig_val = values['macd'], values['signal']
+            golden_cross = check_golden_cross(values)
             triggered = []
             if surge >= THRESHOLD:
                 triggered.append(f"🚀 Surge +{surge:.2f}%")
@@ -498,7 +514,6 @@ def scan_symbols(num_symbols=10):
                 alerts.append((sym, triggered, surge, rsi_val, macd_val, sig_val, golden_cross, df))
         except Exception:
             continue
-    print(f"⏱️ scan_symbols took {time.time() - start_time:.3f}s")
     return alerts
 
 def add_indicators(df):
@@ -527,13 +542,13 @@ def add_indicators(df):
 
     return df
 
-@sydney_time_logger
-def check_exit_signals(df, entry_price, last_price, sym, amount, entry_time):
+@timed()
+def check_exit_signals(candles, entry_price, last_price, sym, amount, entry_time):
+    """Exit rules on daily records.Candles; the commented-out rules would need add_indicators(candles.to_df())."""
     signals = []
-    df = add_indicators(df)
 
     # --- Risk Management: Stop Loss ---
-    # profit_pct = (last_price - entry_price) / entry_price * 100 if entry_price > 0 else 0
+    profit_pct = (last_price - entry_price) / entry_price * 100 if entry_price > 0 else 0
     # if profit_pct <= -5:
     #     signals.append("Stop Loss Hit (-5%)")
 
@@ -549,17 +564,14 @@ def check_exit_signals(df, entry_price, last_price, sym, amount, entry_time):
     #     signals.append("MACD Bearish Crossover (SELL)")
 
     # --- Trailing Stop: Use max of last 5 close prices ---
-    recent_high = df['close'].tail(5).max()
+    recent_high = candles.close[-5:].max()
     
     
     print(f"🔍 {sym} max of last 5 closes: {recent_high}, last price: {last_price}")
     if last_price < recent_high * (1 - TRAILING_STOP_PCT / 100):
         signals.append("Trailing Stop Triggered (SELL)")
 
-    # --- Place order if any exit condition is met ---
-    if signals:
-        place_order(sym, "sell", amount)
-
+    # The sell itself is placed by check_positions, after the Telegram alert
     return signals
 
 def health_check():
@@ -590,104 +602,207 @@ def health_check():
         print(f"❌ Health check failed: {e}")
         return False
 
-# ------------------ RUN LOOP ------------------
-if __name__ == "__main__":
+# ------------------ CYCLE ------------------
+def process_alerts(alerts):
+    """Persist a batch of buy alerts and place orders for the ones that pass the filters."""
+    # Persist the whole cycle's signals in one transaction before trading on them
+    for sym, candles in alerts:
+        save_to_postgres(sym, close_price=candles.last_close)
+    signal_writer.flush()
 
-    # Print .env file variables
-    print("=== .env Variables ===")
-    env_vars = ['DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASS', 'TELEGRAM_TOKEN', 'CHAT_ID', 'THRESHOLD']
-    for var in env_vars:
-        value = os.getenv(var, 'NOT SET')
-        print(f"{var}={value}")
-    print("=====================")
+    for sym, candles in alerts:
+        
+        close_price = candles.last_close
+
+        # Strong signals only
+        if get_market_indicator():
+        # if True:
+            # Check if already holding position
+            if has_open_position(sym):
+                print(f"⚠️ Already holding position for {sym}, skipping buy signal")
+                continue
 
-    last_future_update = 0
+            # Re-checked per order: one cycle can carry more alerts than free slots
+            if has_open_coin() >= TRADE_MAX:
+                print(f"⚠️ Maximum open trades reached ({TRADE_MAX}), skipping remaining buy signals")
+                break
 
-    # Run immediately on startup
-    health_check()
+            print(f"📊 {sym}\n")
 
-    print(f"Current USDT balance: {get_USDT_balance()}")
-    
-    # Schedule hourly runs
-    schedule.every().hour.do(health_check)
+            msg = f"📊 {sym}\nBuying..price: {close_price}.\n"
+            # msg = f"📊 {sym} \n Buying..price: {close_price} open: {open}, close: {close_price}, change: {price_change:.2f}, up: {up}, prev_up: {prev_up}, volume: {volume:.2f}, vol_change: {volume_change:.2f}, prev_vol_change: {prev_volume_change:.2f}\n"
 
-    while True:  # Ensure minimum balance to trade
 
-        schedule.run_pending()
+            send_telegram_text(msg)
 
-        # buying condition
-        if has_open_coin() < TRADE_MAX and get_USDT_balance() > TRADE_AMOUNT_USD:
+            # Determine trade amount in base currency
+            price = ticker_snapshot.last(sym)
 
-            alerts = scan_symbols_last_day(NUM_SYMBOLS)
+            flow_num = get_flow_balance()
+            
+            trade_amount_usd = flow_num * 10 if flow_num else TRADE_AMOUNT_USD 
+            amount = trade_amount_usd / price
 
-            for sym, df in alerts:
-                
-                close_price = df['close'].iloc[-1]
-                save_to_postgres(sym, close_price)
+            # Place buy order
+            place_order(sym, "buy", amount)
+            send_chart(candles, sym, caption=f"{sym} Chart")
 
-                # Strong signals only
-                if get_market_indicator():
-                # if True:
-                    # Check if already holding position
-                    if has_open_position(sym):
-                        print(f"⚠️ Already holding position for {sym}, skipping buy signal")
-                        continue
+@timed()
+def run_buy_scan(symbols=None, shard_pool=None):
+    """Scan for buy signals if another trade is allowed; symbols=None scans the top NUM_SYMBOLS.
 
-                    print(f"📊 {sym}\n")
+    With a shard_pool the scan is fanned out over its worker processes;
+    orders are still placed here, one at a time.
+    """
+    # buying condition
+    if has_open_coin() < TRADE_MAX and get_USDT_balance() > TRADE_AMOUNT_USD:
+        if shard_pool is not None:
+            alerts = shard_pool.map(symbols or scan_universe(NUM_SYMBOLS))
+        else:
+            alerts = scan_symbols_last_day(NUM_SYMBOLS, symbols=symbols)
+        process_alerts(alerts)
+    else:
+        print(f"⚠️ Maximum open trades reached ({TRADE_MAX}), skipping buy signals  this cycle.")
 
-                    msg = f"📊 {sym}\nBuying..price: {close_price}.\n"
-                    # msg = f"📊 {sym} \n Buying..price: {close_price} open: {open}, close: {close_price}, change: {price_change:.2f}, up: {up}, prev_up: {prev_up}, volume: {volume:.2f}, vol_change: {volume_change:.2f}, prev_vol_change: {prev_volume_change:.2f}\n"
+@timed()
+def check_positions(last_prices=None):
+    """Run exit checks on all open positions.
 
+    last_prices maps symbol -> price (e.g. from the kline stream); symbols
+    missing from it are priced by ticker_snapshot.prices(), which costs
+    request weight per position rather than per market, so this can run far
+    more often than the buy scan.
+    """
+    last_prices = dict(last_prices or {})
+    positions = get_open_positions()
+    missing = {pos.symbol for pos in positions} - last_prices.keys()
+    if missing:
+        last_prices.update(ticker_snapshot.prices(missing))
+    exit_candles = candle_store.refresh([pos.symbol for pos in positions], timeframe='1d', limit=30)
+    for pos, ohlcv in zip(positions, exit_candles):
+        sym, entry_price, amount = pos.symbol, pos.entry_price, pos.amount
+        last_price = last_prices.get(sym)
+
+        if ohlcv is None or last_price is None:
+            print(f"❌ Error getting data for {sym}: fetch failed")
+            continue
 
-                    # print(df)
-                    chart_path = plot_chart(df, sym)
-                    send_telegram_chart(chart_path, caption=f"{sym} Chart")
-                
-                    send_telegram_text(msg)
-                    # os.remove(chart_path)
+        # Get fresh data for exit analysis
+        try:
+            candles = Candles.of(sym, ohlcv)
+            profit_pct = (last_price - entry_price)/entry_price*100 if entry_price > 0 else 0
 
-                    # Determine trade amount in base currency
-                    ticker = exchange.fetch_ticker(sym)
-                    price = ticker['last']
+            print(f"🔍 Checking exit for {sym}: Entry={entry_price}, Last={last_price}, Profit={profit_pct:.2f}%")
+            signals = check_exit_signals(candles, entry_price, last_price, sym, amount, entry_time=pos.timestamp)
+        except Exception as e:
+            print(f"❌ Error getting data for {sym}: {e}")
+            continue
+        if signals:
+            msg = f"📊 {sym}\nSignals: {', '.join(signals)}\nSelling... Entry={entry_price}, Last={last_price}, Profit={profit_pct:.2f}%" 
+            send_telegram_text(msg)
 
-                    flow_num = get_flow_balance()
-                    
-                    TRADE_AMOUNT_USD = flow_num * 10 if flow_num else TRADE_AMOUNT_USD 
-                    amount = TRADE_AMOUNT_USD / price
+            # Place sell order 
+            place_order(sym, "sell", amount)
+            send_chart(candles, sym, caption=f"{sym} Chart")
 
-                    # Place buy order
-                    place_order(sym, "buy", amount)
-        else:
-            print(f"⚠️ Maximum open trades reached ({TRADE_MAX}), skipping buy signals  this cycle.")
-            
+# ------------------ SCHEDULE ------------------
+scheduler = Scheduler()
+universe = []  # top NUM_SYMBOLS by volume, kept current by the refresh_universe job
+kline_stream = None  # KlineStream in stream mode
+
+def poll_cycle(shard_pool=None):
+    """One buy scan and one exit check back to back in the calling thread (bench_cycle.py drives this)."""
+    with span("poll", CYCLES):
+        run_buy_scan(shard_pool=shard_pool)
 
         # Check for exit conditions
-        positions = get_open_positions()
-        for pos_id, sym, side, entry_price, amount in positions:
-                
-            # Get fresh data for exit analysis
-            try:
-                ohlcv = exchange.fetch_ohlcv(sym, '1d', limit=30)
-                df = pd.DataFrame(ohlcv, columns=['timestamp','open','high','low','close','volume'])
-                ticker = exchange.fetch_ticker(sym)
-                last_price = ticker['last']
-                profit_pct = (last_price - entry_price)/entry_price*100 if entry_price > 0 else 0
-
-                print(f"🔍 Checking exit for {sym}: Entry={entry_price}, Last={last_price}, Profit={profit_pct:.2f}%")
-                signals = check_exit_signals(df, entry_price, last_price, sym, amount, entry_time=None)
-            except Exception as e:
-                print(f"❌ Error getting data for {sym}: {e}")
-                continue
-            if signals:
-                msg = f"📊 {sym}\nSignals: {', '.join(signals)}\nSelling... Entry={entry_price}, Last={last_price}, Profit={profit_pct:.2f}%" 
-                send_telegram_text(msg)
-                chart_path = plot_chart(df, sym)    
-                send_telegram_chart(chart_path, caption=f"{sym} Chart")
+        check_positions()
+
+def refresh_universe():
+    """Recompute the scan universe; after a new listing, also run the buy scan early."""
+    global universe
+    universe = scan_universe(NUM_SYMBOLS)
+    if kline_stream is not None:
+        kline_stream.set_symbols(universe + [pos.symbol for pos in get_open_positions()])
+    if listing_wakeup.is_set():
+        listing_wakeup.clear()
+        if "buy_scan" in scheduler.jobs:
+            print("🆕 New listing, scanning early")
+            scheduler.trigger("buy_scan")
+
+def stream_scan():
+    """Scan the symbols whose 1h candle closed since the last call."""
+    # Candles of all symbols close together; drain them and scan once
+    closed = set()
+    try:
+        while True:
+            event = kline_stream.events.get_nowait()
+            if event.kind == "resync":
+                closed.update(universe)
+            elif event.symbol in universe:
+                closed.add(event.symbol)
+    except queue.Empty:
+        pass
+    if closed:
+        run_buy_scan([sym for sym in universe if sym in closed])
+
+def schedule_jobs(shard_pool=None):
+    """Register the loop's jobs for SCAN_MODE; each keeps its own cadence (see scheduler.py)."""
+    scheduler.every(UNIVERSE_SECONDS, refresh_universe)
+    if SCAN_MODE == "stream":
+        # Scans follow the stream's candle-close events; exits use its live prices
+        scheduler.every(1, stream_scan, align=False)
+        scheduler.every(STREAM_EXIT_SECONDS, lambda: check_positions(
+            kline_stream.last_prices if kline_stream.connected.is_set() else None), name="exit_check")
+    else:
+        # On the clock, CANDLE_CLOSE_DELAY after each close, so every hourly close gets scanned
+        scheduler.every(BUY_SCAN_SECONDS, lambda: run_buy_scan(universe or None, shard_pool), name="buy_scan",
+                        offset=CANDLE_CLOSE_DELAY, run_at_start=True)
+        scheduler.every(EXIT_CHECK_SECONDS, check_positions, name="exit_check", run_at_start=True)
+    scheduler.every(3600, health_check)
+    scheduler.every(3600, update_future_returns, offset=FUTURE_RETURNS_OFFSET)
+    scheduler.every(86400, maintain_schema)
+
+# ------------------ RUN LOOP ------------------
+if __name__ == "__main__":
 
-                # Place sell order 
-                place_order(sym, "sell", amount)
+    # Turn `docker stop` into a normal exit so queued notifications and signal rows are flushed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    chart_renderer.start()
+    metrics.serve()
 
+    # Print .env file variables
+    print("=== .env Variables ===")
+    env_vars = ['DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASS', 'TELEGRAM_TOKEN', 'CHAT_ID', 'THRESHOLD']
+    for var in env_vars:
+        value = os.getenv(var, 'NOT SET')
+        print(f"{var}={value}")
+    print("=====================")
 
-        # Wait 10 minutes before next scan
-        print(f"⏳ Waiting 300 seconds...")
-        time.sleep(300)
\ No newline at end of file
+    # Run immediately on startup
+    maintain_schema()
+    try:
+        position_book.load()
+    except Exception as e:
+        print(f"❌ Position book load failed, retrying on first use: {e}")
+    health_check()
+
+    print(f"Current USDT balance: {get_USDT_balance()}")
+
+    refresh_universe()
+    shard_pool = None
+    if SCAN_MODE == "stream":
+        kline_stream = KlineStream(candle_store, universe + [pos.symbol for pos in get_open_positions()],
+                                   timeframe='1h', history=30).start()
+        metrics.register_stats("kline_stream", kline_stream.stats)
+    elif SCAN_MODE == "sharded":
+        shard_pool = ShardPool(scan_shard).start()
+    schedule_jobs(shard_pool)
+    if LISTINGS_ENABLED:
+        listing_detector.start()
+
+    try:
+        scheduler.run_forever()
+    finally:
+        if shard_pool is not None:
+            shard_pool.close()
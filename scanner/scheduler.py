@@ -0,0 +1,121 @@
+"""Asyncio scheduler for the scanner's periodic jobs.
+
+Every job has its own cadence and runs its blocking function on a worker
+thread of its own, so a slow buy scan delays neither the exit checks nor the
+health check, and a slow cycle never pushes later ones back: runs are placed
+on a fixed grid (epoch-aligned, so every=3600 means on the hour and
+every=300 lands on each 5m/1h candle close, plus `offset`). A job still
+running when its next slot comes up skips that slot.
+
+  scheduler = Scheduler()
+  scheduler.every(300, run_buy_scan, offset=5)
+  scheduler.every(30, check_positions)
+  scheduler.trigger("run_buy_scan")   # from any thread: run as soon as possible
+  scheduler.run_forever()
+
+Exported per job: scanner_job_lag_seconds (start minus scheduled time, the
+drift), scanner_job_skipped_total and, through metrics.CYCLES, the duration.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import CYCLES, Counter, Gauge, Histogram, span
+
+JOB_LAG = Histogram("scanner_job_lag_seconds", "Delay between a job's scheduled and actual start", ("job",),
+                    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 60, 300))
+JOB_LAST_LAG = Gauge("scanner_job_last_lag_seconds", "Start delay of the latest run", ("job",))
+JOB_SKIPPED = Counter("scanner_job_skipped_total", "Runs skipped because the previous run was still going", ("job",))
+
+
+def next_slot(now, every, offset=0.0, origin=0.0):
+    """First time after now on the grid origin + offset + k * every."""
+    return ((now - origin - offset) // every + 1) * every + origin + offset
+
+
+class Job:
+    def __init__(self, name, fn, every, offset=0.0, align=True, run_at_start=False):
+        self.name = name
+        self.fn = fn
+        self.every = every
+        self.offset = offset
+        self.align = align  # False: the grid starts when the scheduler does
+        self.run_at_start = run_at_start
+        self.future = None  # the current or last run
+        self.pending = False  # trigger() before the loop started
+        self.wakeup = None  # asyncio.Event, created on the loop
+
+    @property
+    def running(self):
+        return self.future is not None and not self.future.done()
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs = {}
+        self.loop = None
+        self.started = None  # wall-clock start, origin of unaligned grids
+
+    def every(self, seconds, fn, name=None, offset=0.0, align=True, run_at_start=False):
+        """Run fn every `seconds`; the name (default fn.__name__) labels its metrics."""
+        job = Job(name or fn.__name__, fn, seconds, offset, align, run_at_start)
+        self.jobs[job.name] = job
+        return job
+
+    def trigger(self, name):
+        """Run a job now instead of at its next slot; after the current run if one is going. Thread-safe."""
+        job = self.jobs[name]
+        if self.loop is None:
+            job.pending = True
+        else:
+            self.loop.call_soon_threadsafe(job.wakeup.set)
+
+    def _run(self, job):
+        with span(job.name, CYCLES):
+            try:
+                job.fn()
+            except Exception as e:
+                print(f"❌ Job {job.name} failed: {e}")
+
+    def _next(self, job, now):
+        return next_slot(now, job.every, job.offset, 0.0 if job.align else self.started)
+
+    async def _loop(self, job, executor):
+        due = time.time() if job.run_at_start or job.pending else self._next(job, time.time())
+        while True:
+            triggered = False
+            delay = due - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(job.wakeup.wait(), delay)
+                    triggered = True
+                except asyncio.TimeoutError:
+                    pass
+            job.wakeup.clear()
+
+            if triggered and job.running:
+                # Asked for explicitly (e.g. a new listing): run right after the current run
+                await asyncio.shield(job.future)
+            if job.running:
+                JOB_SKIPPED.inc(1, job.name)
+                print(f"⚠️ {job.name} still running, skipping its {time.strftime('%H:%M:%S', time.localtime(due))} run")
+            else:
+                lag = 0.0 if triggered else time.time() - due
+                JOB_LAG.observe(lag, job.name)
+                JOB_LAST_LAG.set(lag, job.name)
+                job.future = self.loop.run_in_executor(executor, self._run, job)
+            if not triggered:
+                due = self._next(job, max(time.time(), due))
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.started = time.time()
+        for job in self.jobs.values():
+            job.wakeup = asyncio.Event()
+        with ThreadPoolExecutor(max_workers=len(self.jobs), thread_name_prefix="job") as executor:
+            await asyncio.gather(*(self._loop(job, executor) for job in self.jobs.values()))
+
+    def run_forever(self):
+        names = ", ".join(f"{j.name}/{j.every:g}s" for j in self.jobs.values())
+        print(f"⏰ Scheduler starting: {names}")
+        asyncio.run(self.run())
@@ -1,3 +1,3 @@
-docker run -it postgres:15 psql -h localhost -U crypto_user -d crypto_db -f postgres_schema.sql
+docker compose run --rm scanner python /app/migrate.py
 
-docker run -it --rm postgres:15 psql -h localhost -U crypto_user -d crypto_db -f postgres_schema.sql
+python migrate.py --status
@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import queue
+import time
+import zlib
+
+import fetcher
+
+# ------------------ CONFIG ------------------
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", 4))  # scanner processes in sharded mode
+SHARD_TIMEOUT = float(os.getenv("SHARD_TIMEOUT", 240))  # seconds to wait for every shard in a cycle
+SHARD_COORDINATOR_SHARE = float(os.getenv("SHARD_COORDINATOR_SHARE", 0.25))  # of RATE_LIMIT_WEIGHT, kept by the coordinator
+
+
+def shard_of(symbol, shards):
+    """Stable shard index for a symbol (crc32, so it is the same in every process and run)."""
+    return zlib.crc32(symbol.encode()) % shards
+
+
+def partition(symbols, shards):
+    parts = [[] for _ in range(shards)]
+    for sym in symbols:
+        parts[shard_of(sym, shards)].append(sym)
+    return parts
+
+
+def weight_budgets(workers, coordinator_share=SHARD_COORDINATOR_SHARE, total=None):
+    """(coordinator, per worker) request weight per minute; together they add up to RATE_LIMIT_WEIGHT."""
+    total = fetcher.RATE_LIMIT_WEIGHT if total is None else total
+    coordinator = total * coordinator_share
+    return coordinator, (total - coordinator) / workers
+
+
+def _worker(index, weight, tasks, results, scan, initializer, initargs):
+    fetcher.limiter = fetcher.WeightLimiter(weight)
+    if initializer is not None:
+        initializer(*initargs)
+    results.put((index, 0, [], None, 0.0))  # ready
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        cycle, symbols = task
+        start_time = time.time()
+        try:
+            results.put((index, cycle, scan(symbols), None, time.time() - start_time))
+        except Exception as e:
+            results.put((index, cycle, [], repr(e), time.time() - start_time))
+
+
+class ShardPool:
+    """Fixed worker processes, each owning one hash partition of the symbol universe.
+
+    A symbol always goes to the same process, so its candle cache and
+    indicator state stay warm there (a ProcessPoolExecutor would hand tasks
+    to any idle worker). scan(symbols) runs in the worker and must return a
+    picklable list of tuples starting with the symbol; map() gathers them
+    back in the coordinator, which does all order placement and DB writes.
+
+    Every process calls the exchange from the same IP, so RATE_LIMIT_WEIGHT
+    is split: the coordinator keeps coordinator_share for its tickers, exit
+    checks and listings, and the workers share the rest equally. start()
+    replaces the coordinator's fetcher.limiter accordingly.
+    """
+
+    def __init__(self, scan, workers=SHARD_WORKERS, initializer=None, initargs=(),
+                 coordinator_share=SHARD_COORDINATOR_SHARE):
+        # spawn: workers build their own exchange sessions instead of inheriting the coordinator's sockets
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = workers
+        self.coordinator_weight, worker_weight = weight_budgets(workers, coordinator_share)
+        self.tasks = [ctx.Queue() for _ in range(workers)]
+        self.results = ctx.Queue()
+        self.processes = [
+            ctx.Process(target=_worker, name=f"shard-{i}", daemon=True,
+                        args=(i, worker_weight, self.tasks[i], self.results, scan, initializer, initargs))
+            for i in range(workers)
+        ]
+        self.cycle = 0
+        self.timings = []  # per-cycle list of worker seconds, in shard order
+
+    def start(self, timeout=SHARD_TIMEOUT):
+        """Start the workers and wait until each has imported its modules and initialised."""
+        fetcher.limiter = fetcher.WeightLimiter(self.coordinator_weight)
+        for p in self.processes:
+            p.start()
+        for _ in self.processes:
+            self.results.get(timeout=timeout)
+        return self
+
+    def map(self, symbols, timeout=SHARD_TIMEOUT):
+        """Scan symbols across the shards; results come back in the order of `symbols`."""
+        self.cycle += 1
+        parts = partition(symbols, self.workers)
+        busy = set()
+        for i, part in enumerate(parts):
+            if part:
+                self.tasks[i].put((self.cycle, part))
+                busy.add(i)
+
+        by_shard = {}
+        timings = [0.0] * self.workers
+        deadline = time.monotonic() + timeout
+        while busy:
+            try:
+                index, cycle, items, error, elapsed = self.results.get(timeout=max(deadline - time.monotonic(), 0.01))
+            except queue.Empty:
+                print(f"❌ Shards {sorted(busy)} did not finish within {timeout:.0f}s, using partial results")
+                break
+            if cycle != self.cycle:
+                continue  # late answer from a cycle that already timed out
+            if error:
+                print(f"❌ Shard {index} failed: {error}")
+            busy.discard(index)
+            by_shard[index] = items
+            timings[index] = elapsed
+        self.timings.append(timings)
+
+        rank = {sym: i for i, sym in enumerate(symbols)}
+        merged = [item for items in by_shard.values() for item in items]
+        return sorted(merged, key=lambda item: rank.get(item[0], len(rank)))
+
+    def close(self, timeout=10):
+        for q in self.tasks:
+            q.put(None)
+        for p in self.processes:
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import queue
+import threading
+from collections import Counter, namedtuple
+
+from metrics import timed
+
+# ------------------ CONFIG ------------------
+BINANCE_WS_URL = os.getenv("BINANCE_WS_URL", "wss://stream.binance.com:9443/stream")
+STREAM_RECONNECT_MAX = float(os.getenv("STREAM_RECONNECT_MAX", 60))  # max seconds between reconnect attempts
+SUBSCRIBE_CHUNK = 200  # streams per SUBSCRIBE message
+
+# kind: "candle" when a kline closes, "resync" after (re)connecting and filling gaps over REST
+StreamEvent = namedtuple("StreamEvent", "kind symbol timeframe row")
+
+
+def stream_id(symbol):
+    """ccxt symbol -> Binance stream symbol, e.g. BTC/USDT -> btcusdt."""
+    return symbol.replace("/", "").lower()
+
+
+class KlineStream:
+    """Binance combined kline + miniTicker stream feeding the candle cache.
+
+    Runs an asyncio loop on a background thread. Every kline update is merged
+    into the CandleStore, last prices are kept in `last_prices`, and closed
+    candles are posted to the `events` queue for the trading loop. After every
+    (re)connect the streams are resubscribed and the cache is brought up to
+    date over REST so candles missed while disconnected are not lost.
+    """
+
+    def __init__(self, candle_store, symbols, timeframe='1h', history=30, url=BINANCE_WS_URL):
+        self.store = candle_store
+        self.timeframe = timeframe
+        self.history = history
+        self.url = url
+        self.symbols = list(symbols)
+        self.by_id = {stream_id(s).upper(): s for s in self.symbols}
+        self.last_prices = {}
+        self.price_times = {}  # symbol -> exchange event time (ms) of the last price
+        self.events = queue.Queue()
+        self.connected = threading.Event()
+        self.stats = Counter()
+        self._loop = None
+        self._ws = None
+        self._stop = False
+        self._next_id = 0
+        self._thread = None
+
+    def _streams(self, symbols):
+        return [f"{stream_id(s)}@{kind}" for s in symbols for kind in (f"kline_{self.timeframe}", "miniTicker")]
+
+    # ------------------ CONTROL ------------------
+    def start(self):
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run()), name="kline-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop = True
+        if self._loop and self._ws:
+            asyncio.run_coroutine_threadsafe(self._ws.close(), self._loop)
+
+    def set_symbols(self, symbols):
+        """Change the tracked symbols, (un)subscribing on the live connection."""
+        symbols = list(dict.fromkeys(symbols))
+        added = [s for s in symbols if s not in self.symbols]
+        removed = [s for s in self.symbols if s not in symbols]
+        self.symbols = symbols
+        self.by_id = {stream_id(s).upper(): s for s in symbols}
+        if self._loop and self._ws and self.connected.is_set():
+            if removed:
+                asyncio.run_coroutine_threadsafe(self._send("UNSUBSCRIBE", self._streams(removed)), self._loop)
+            if added:
+                asyncio.run_coroutine_threadsafe(self._send("SUBSCRIBE", self._streams(added)), self._loop)
+        if added:
+            self.store.refresh(added, timeframe=self.timeframe, limit=self.history)
+
+    # ------------------ CONNECTION ------------------
+    async def _send(self, method, streams):
+        for i in range(0, len(streams), SUBSCRIBE_CHUNK):
+            self._next_id += 1
+            await self._ws.send(json.dumps({"method": method, "params": streams[i:i + SUBSCRIBE_CHUNK],
+                                            "id": self._next_id}))
+
+    @timed("stream_gap_fill")
+    def _fill_gaps(self):
+        self.store.refresh(self.symbols, timeframe=self.timeframe, limit=self.history)
+
+    async def _run(self):
+        # Imported here so poll mode never loads websockets
+        import websockets
+        from websockets.asyncio.client import connect
+
+        self._loop = asyncio.get_running_loop()
+        delay = 1
+        while not self._stop:
+            try:
+                async with connect(self.url, ping_interval=20, ping_timeout=20) as ws:
+                    self._ws = ws
+                    await self._send("SUBSCRIBE", self._streams(self.symbols))
+                    # Subscribe first so nothing closes unseen between the REST fill and the stream
+                    await asyncio.to_thread(self._fill_gaps)
+                    self.connected.set()
+                    self.stats["connects"] += 1
+                    self.events.put(StreamEvent("resync", None, self.timeframe, None))
+                    delay = 1
+                    async for raw in ws:
+                        self._handle(json.loads(raw))
+                    print("⚠️ Kline stream closed by server")
+            except (OSError, asyncio.TimeoutError, websockets.ConnectionClosed, websockets.InvalidHandshake) as e:
+                print(f"❌ Kline stream disconnected: {e}")
+            finally:
+                self.connected.clear()
+                self._ws = None
+            if self._stop:
+                break
+            print(f"⏳ Reconnecting kline stream in {delay}s...")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, STREAM_RECONNECT_MAX)
+
+    def _handle(self, message):
+        data = message.get("data")
+        if data is None:
+            return  # SUBSCRIBE / UNSUBSCRIBE acknowledgement
+        self.stats["frames"] += 1
+        sym = self.by_id.get(data.get("s"))
+        if sym is None:
+            return
+        if data.get("e") == "kline":
+            k = data["k"]
+            row = [k["t"], float(k["o"]), float(k["h"]), float(k["l"]), float(k["c"]), float(k["v"])]
+            self.store.push(sym, k["i"], row)
+            self.last_prices[sym] = row[4]
+            self.price_times[sym] = data["E"]
+            if k["x"]:
+                self.stats["closed"] += 1
+                self.events.put(StreamEvent("candle", sym, k["i"], row))
+        elif data.get("e") == "24hrMiniTicker":
+            self.last_prices[sym] = float(data["c"])
+            self.price_times[sym] = data["E"]
@@ -0,0 +1,178 @@
+"""Check KlineStream against ws_replay.py: reconnects, resubscription, REST gap fill and closed-candle events.
+
+Usage: python stream_check.py [--speed 60] [--drop-after 60]
+
+Serves fixtures/kline_1m_frames.jsonl with `ws_replay.py serve --drop-after N`
+and runs a KlineStream over it. REST requests go to FakeExchange, whose
+clock follows the replay, so the gap fill after a reconnect fetches exactly
+the candles that closed while the stream was away. No network needed.
+
+The frames file is in `ws_replay.py record` format: ten minutes of 1m kline
+and miniTicker frames for two symbols, one every 5s. It is synthetic (built
+by --write-frames with Binance's payload layout), so it stays small and
+deterministic.
+
+Checked: the replay dropped the connection and KlineStream reconnected; every
+connection resubscribed all streams; each reconnect filled the gap over REST,
+leaving no missing minute in the candle cache; closed-candle events came
+through on every connection, without duplicates. Exits non-zero on failure.
+"""
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from candle_cache import CandleStore, TS
+from fake_exchange import FakeExchange
+from stream import KlineStream, stream_id
+from ws_replay import load_frames
+
+FRAMES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "kline_1m_frames.jsonl")
+SYMBOLS = ["BTC/USDT", "ETH/USDT"]
+START_MS = 1_700_000_040_000  # on a minute boundary
+MINUTE = 60_000
+
+
+def write_frames(path, minutes=10, every=5):
+    """Synthetic combined-stream frames: a kline and a miniTicker update per symbol every `every` seconds."""
+    with open(path, "w") as out:
+        for s in range(0, minutes * 60, every):
+            event = START_MS + s * 1000
+            open_ms = START_MS + s // 60 * MINUTE
+            for n, sym in enumerate(SYMBOLS):
+                sid = stream_id(sym)
+
+                def price(sec):
+                    return round((100, 20)[n] * (1 + 0.01 * math.sin(sec / 40 + n)), 4)
+                o, c = price(s // 60 * 60), price(s)
+                k = {"t": open_ms, "T": open_ms + MINUTE - 1, "s": sid.upper(), "i": "1m", "o": str(o),
+                     "c": str(c), "h": str(max(o, c)), "l": str(min(o, c)), "v": str(10 + s % 60),
+                     "x": s % 60 == 60 - every}
+                kline = {"stream": f"{sid}@kline_1m", "data": {"e": "kline", "E": event, "s": sid.upper(), "k": k}}
+                ticker = {"stream": f"{sid}@miniTicker",
+                          "data": {"e": "24hrMiniTicker", "E": event, "s": sid.upper(), "c": str(c)}}
+                for frame in (kline, ticker):
+                    out.write(json.dumps({"t": s, "frame": json.dumps(frame, separators=(",", ":"))}) + "\n")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def run(speed, drop_after, timeout=60):
+    """Replay the frames into a KlineStream; returns (stream, exchange, server output lines, events)."""
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-u", "ws_replay.py", "serve", FRAMES, "--port", str(port),
+                               "--speed", str(speed), "--drop-after", str(drop_after)],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    lines = []
+    finished = threading.Event()
+
+    def read():
+        for line in server.stdout:
+            lines.append(line.strip())
+            if line.startswith("replay finished"):
+                finished.set()
+    threading.Thread(target=read, daemon=True).start()
+
+    exchange = FakeExchange(latency=0, now_ms=START_MS)
+    stream = KlineStream(CandleStore(exchange, max_age=0), SYMBOLS, timeframe="1m", history=30,
+                         url=f"ws://localhost:{port}/stream")
+
+    # The exchange clock runs with the replay: last event time plus wall time since, times speed
+    last_seen = [None]
+    handle = stream._handle
+
+    def handle_and_time(message):
+        handle(message)
+        last_seen[0] = time.monotonic()
+    stream._handle = handle_and_time
+
+    def now_ms():
+        if last_seen[0] is None:
+            return START_MS
+        return max(stream.price_times.values()) + int((time.monotonic() - last_seen[0]) * speed * 1000)
+    exchange._now = now_ms
+
+    try:
+        while not any(line.startswith("replaying") for line in lines):
+            if server.poll() is not None:
+                raise RuntimeError("ws_replay.py exited: " + "\n".join(lines))
+            time.sleep(0.05)
+        stream.start()
+        if not finished.wait(timeout):
+            print(f"⚠️ Replay did not finish within {timeout}s")
+        time.sleep(0.5)  # let the last frames land
+    finally:
+        stream.stop()
+        if stream._thread is not None:
+            stream._thread.join(5)
+        server.terminate()
+        server.wait()
+
+    events = []
+    while not stream.events.empty():
+        events.append(stream.events.get_nowait())
+    return stream, exchange, lines, events
+
+
+def check(stream, exchange, lines, events):
+    frames = [json.loads(item["frame"])["data"] for item in load_frames(FRAMES)]
+    last_closed = max(d["k"]["t"] for d in frames if d["e"] == "kline" and d["k"]["x"])
+    drops = sum(line.startswith("dropping connection") for line in lines)
+    skipped = sum(int(line.split()[1]) for line in lines if line.startswith("skipped"))
+    subscribes = sum(line == f"subscribed to {2 * len(SYMBOLS)} streams" for line in lines)
+    connects = stream.stats["connects"]
+
+    # Closed candles per connection: events between one resync and the next
+    per_connection, candles = [], []
+    for event in events:
+        if event.kind == "resync":
+            per_connection.append(0)
+        else:
+            per_connection[-1] += 1
+            candles.append((event.symbol, int(event.row[TS])))
+
+    results = [
+        ("reconnected after every drop", drops >= 1 and connects == drops + 1,
+         f"{drops} drops, {connects} connects"),
+        ("resubscribed on every connect", subscribes == connects, f"{subscribes} full subscriptions"),
+        ("frames missed while disconnected", skipped > 0, f"{skipped} frames skipped by the replay"),
+        ("gap filled over REST", exchange.calls["fetch_ohlcv"] >= connects * len(SYMBOLS),
+         f"{exchange.calls['fetch_ohlcv']} fetch_ohlcv calls"),
+        ("closed-candle events on every connection", len(per_connection) == connects and all(per_connection),
+         f"{per_connection}"),
+        ("no duplicate candle events", len(candles) == len(set(candles)), f"{len(candles)} events"),
+    ]
+    for sym in SYMBOLS:
+        rows = stream.store.rings[(sym, "1m")].tail(10**6)
+        held = {int(ts) for ts in rows[:, TS]}
+        missing = [ts for ts in range(START_MS, last_closed + 1, MINUTE) if ts not in held]
+        results.append((f"{sym} has every replayed minute", not missing, f"{len(missing)} missing"))
+
+    for name, ok, detail in results:
+        print(f"{'✅' if ok else '❌'} {name}: {detail}")
+    return all(ok for _, ok, _ in results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--speed", type=float, default=60, help="replay speed; a 1s reconnect misses speed seconds")
+    parser.add_argument("--drop-after", type=int, default=60, help="frames per connection (4 per 5s of replay)")
+    parser.add_argument("--write-frames", action="store_true", help=f"regenerate {os.path.relpath(FRAMES)}")
+    args = parser.parse_args()
+
+    if args.write_frames:
+        os.makedirs(os.path.dirname(FRAMES), exist_ok=True)
+        write_frames(FRAMES)
+        print(f"💾 Wrote {FRAMES}")
+        sys.exit(0)
+    sys.exit(0 if check(*run(args.speed, args.drop_after)) else 1)
@@ -0,0 +1,169 @@
+"""Grid search over the backtest parameters on a process pool.
+
+Usage: python sweep.py HISTORY_DIR|HISTORY.npz [--trailing-stop 3,5,7] [--profit-target 5,10,15,20]
+           [--threshold 0,0.5,1] [--trail-days 3,5,7] [--volume-hours 24]
+           [--trade-max 5] [--num-symbols 30] [--workers N]
+           [--out results.parquet|results.csv] [--db]
+
+The aligned candles are written once to a .npy file (in /dev/shm when it
+exists) and every worker maps it read-only, so the history is never copied
+per process. Combinations are grouped by the parameters behind the costly
+intermediates (threshold, trail days, volume window, universe size,
+trailing stop); a worker computes those once per group and replays every
+profit target and TRADE_MAX of the group against them. Results are ranked
+by total PnL.
+"""
+import argparse
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import backtest
+
+# ------------------ CONFIG ------------------
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", os.cpu_count() or 1))
+SHM_DIR = "/dev/shm"
+
+GROUP_KEYS = ("threshold", "trail_days", "volume_hours", "num_symbols", "trailing_stop_pct")
+INNER_KEYS = ("profit_target_pct", "trade_max")
+METRIC_KEYS = ("total_trades", "win_rate", "avg_profit", "avg_loss", "total_pnl", "max_drawdown", "open_at_end")
+RESULT_COLUMNS = ("run_id", "rank") + GROUP_KEYS + INNER_KEYS + METRIC_KEYS
+
+# Per-worker Replay over the shared memmap, set by _init_worker
+_replay = None
+
+
+def _init_worker(path, symbols, ts):
+    global _replay
+    _replay = backtest.Replay(symbols, ts, np.load(path, mmap_mode="r"))
+
+
+def metrics(trades, still_open):
+    """performance_analysis.analyze_positions' numbers for Replay.run() trades."""
+    if not trades:
+        return dict(total_trades=0, win_rate=0.0, avg_profit=0.0, avg_loss=0.0, total_pnl=0.0,
+                    max_drawdown=0.0, open_at_end=len(still_open))
+    _, entry_t, _, entry, exit_, amount, _ = map(np.asarray, zip(*trades))
+    order = np.argsort(entry_t, kind="stable")  # fetch_positions orders by entry timestamp
+    entry, exit_, amount = entry[order], exit_[order], amount[order]
+    pnl = (exit_ - entry) * amount
+    pct = (exit_ - entry) / entry * 100
+    cumulative = np.cumsum(pnl)
+    wins = pnl > 0
+    return dict(
+        total_trades=len(pnl),
+        win_rate=float(wins.mean() * 100),
+        avg_profit=float(pct[wins].mean()) if wins.any() else 0.0,
+        avg_loss=float(pct[~wins].mean()) if (~wins).any() else 0.0,
+        total_pnl=float(pnl.sum()),
+        max_drawdown=float((np.maximum.accumulate(cumulative) - cumulative).max()),
+        open_at_end=len(still_open),
+    )
+
+
+def _run_group(group, inner):
+    results = []
+    for params in inner:
+        trades, still_open = _replay.run(**group, **params)
+        results.append({**group, **params, **metrics(trades, still_open)})
+    _replay.forget()  # one trailing-stop index array per group; signals and ranks stay cached
+    return results
+
+
+def grid(trailing_stop, profit_target, threshold, trail_days, volume_hours, num_symbols, trade_max):
+    """Yield (group params, [inner params]) pairs covering the full cartesian product."""
+    inner = [dict(zip(INNER_KEYS, combo)) for combo in itertools.product(profit_target, trade_max)]
+    for combo in itertools.product(threshold, trail_days, volume_hours, num_symbols, trailing_stop):
+        yield dict(zip(GROUP_KEYS, combo)), inner
+
+
+def sweep(history, workers=SWEEP_WORKERS, **axes):
+    """Run every combination; returns result dicts ranked by total_pnl."""
+    symbols, ts, candles = backtest.align(history)
+    tmpdir = tempfile.mkdtemp(dir=SHM_DIR if os.path.isdir(SHM_DIR) else None)
+    path = os.path.join(tmpdir, "candles.npy")
+    try:
+        shared = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=candles.shape)
+        shared[:] = candles
+        shared.flush()
+        del shared, candles
+
+        groups = list(grid(**axes))
+        results = []
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(path, symbols, ts)) as pool:
+            futures = [pool.submit(_run_group, group, inner) for group, inner in groups]
+            for future in as_completed(futures):
+                results.extend(future.result())
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    results.sort(key=lambda r: r["total_pnl"], reverse=True)
+    for rank, row in enumerate(results, 1):
+        row["rank"] = rank
+    return results
+
+
+def save_results(results, out=None, to_db=False):
+    run_id = time.strftime("%Y%m%d-%H%M%S")
+    for row in results:
+        row["run_id"] = run_id
+    if out:
+        import pandas as pd
+        df = pd.DataFrame(results, columns=RESULT_COLUMNS)
+        if out.endswith(".csv"):
+            df.to_csv(out, index=False)
+        else:
+            df.to_parquet(out, index=False)
+        print(f"💾 Wrote {len(df)} results to {out}")
+    if to_db:
+        import db
+        db.insert_many("sweep_results", RESULT_COLUMNS,
+                       [tuple(row[c] for c in RESULT_COLUMNS) for row in results])
+        print(f"💾 Inserted {len(results)} results into sweep_results (run_id={run_id})")
+    return run_id
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",")]
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("history")
+    parser.add_argument("--trailing-stop", type=_floats, default=[3.0, 5.0, 7.0, 10.0])
+    parser.add_argument("--profit-target", type=_floats, default=[5.0, 10.0, 15.0, 20.0, 30.0])
+    parser.add_argument("--threshold", type=_floats, default=[0.0, 0.5, 1.0])
+    parser.add_argument("--trail-days", type=_ints, default=[3, 5, 7])
+    parser.add_argument("--volume-hours", type=_ints, default=[backtest.VOLUME_HOURS])
+    parser.add_argument("--num-symbols", type=_ints, default=[30])
+    parser.add_argument("--trade-max", type=_ints, default=[backtest.TRADE_MAX])
+    parser.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    parser.add_argument("--out", help="write the ranked table to .parquet or .csv")
+    parser.add_argument("--db", action="store_true", help="insert the ranked table into sweep_results")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    history = backtest.load_history(args.history)
+    results = sweep(history, workers=args.workers, trailing_stop=args.trailing_stop,
+                    profit_target=args.profit_target, threshold=args.threshold, trail_days=args.trail_days,
+                    volume_hours=args.volume_hours, num_symbols=args.num_symbols, trade_max=args.trade_max)
+    elapsed = time.time() - start_time
+    print(f"⏱️ {len(results)} combinations over {len(history)} symbols took {elapsed:.3f}s "
+          f"({len(results) / elapsed:.1f}/s, {args.workers} workers)")
+
+    print(f"{'rank':>4} {'stop%':>6} {'target%':>8} {'thr%':>5} {'days':>5} {'max':>4} "
+          f"{'trades':>7} {'win%':>6} {'pnl $':>9} {'maxdd $':>8}")
+    for row in results[:20]:
+        print(f"{row['rank']:>4} {row['trailing_stop_pct']:>6.1f} {row['profit_target_pct']:>8.1f} "
+              f"{row['threshold']:>5.1f} {row['trail_days']:>5} {row['trade_max']:>4} {row['total_trades']:>7} "
+              f"{row['win_rate']:>6.1f} {row['total_pnl']:>9.2f} {row['max_drawdown']:>8.2f}")
+    save_results(results, args.out, args.db)
@@ -0,0 +1,85 @@
+"""Local stand-in for the Telegram Bot API.
+
+  python telegram_stub.py --port 8081 --rate-limit-every 5
+
+then run the scanner with TELEGRAM_API_URL=http://localhost:8081. Every
+request is logged; with --rate-limit-every N every Nth request is answered
+with 429 and retry_after, like Telegram's flood control.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class TelegramStub:
+    """Records sendMessage/sendPhoto calls; usable from scripts and benchmarks."""
+
+    def __init__(self, host="localhost", port=0, latency=0.0, rate_limit_every=0, retry_after=1, quiet=False):
+        self.latency = latency
+        self.quiet = quiet
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = []  # (method, body size in bytes)
+        self.rate_limited = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                method = self.path.rsplit("/", 1)[-1]
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub.lock:
+                    count = len(stub.requests) + stub.rate_limited + 1
+                    limited = stub.rate_limit_every and count % stub.rate_limit_every == 0
+                    if limited:
+                        stub.rate_limited += 1
+                    else:
+                        stub.requests.append((method, len(body)))
+                if limited:
+                    self._reply(429, {"ok": False, "error_code": 429,
+                                      "parameters": {"retry_after": stub.retry_after}})
+                else:
+                    self._reply(200, {"ok": True, "result": {"message_id": count}})
+
+            def _reply(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, fmt, *args):
+                if stub.quiet:
+                    return
+                print(f"[telegram-stub] {self.command} {self.path} {args[1] if len(args) > 1 else ''}")
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name="telegram-stub", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+    stub = TelegramStub(args.host, args.port, args.latency, args.rate_limit_every, args.retry_after)
+    print(f"Telegram stub listening on {stub.url}")
+    stub.server.serve_forever()
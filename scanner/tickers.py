@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from collections import Counter
+
+from fetcher import WEIGHTS, call, fetch_tickers_many
+from records import Ticker
+
+# ------------------ CONFIG ------------------
+TICKER_TTL = float(os.getenv("TICKER_TTL", 60))  # seconds a bulk snapshot is reused
+TICKER_MAX_AGE = float(os.getenv("TICKER_MAX_AGE", 300))  # older prices are stale and refetched per symbol
+
+
+class TickerSnapshot:
+    """Whole-market tickers from one fetch_tickers call, reused for TICKER_TTL seconds.
+
+    Serves last prices to order pricing, sizing and exit checks so a cycle
+    makes one bulk request instead of a ticker round-trip per symbol. Only
+    records.Ticker fields are kept, not ccxt's full dicts with raw `info`.
+    """
+
+    def __init__(self, exchange, ttl=TICKER_TTL, max_age=TICKER_MAX_AGE):
+        self.exchange = exchange
+        self.ttl = ttl
+        self.max_age = max_age
+        self.tickers = {}
+        self.fetched_at = None  # monotonic time of the last successful bulk fetch
+        self.lock = threading.Lock()
+        self.stats = Counter()
+
+    @property
+    def age(self):
+        """Seconds since the snapshot was taken (inf before the first fetch)."""
+        return time.monotonic() - self.fetched_at if self.fetched_at is not None else float("inf")
+
+    @property
+    def stale(self):
+        return self.age > self.max_age
+
+    def refresh(self, force=False):
+        """Return the snapshot, taking a new one if it is older than the TTL.
+
+        A failed fetch keeps the previous snapshot; check `age`/`stale`.
+        """
+        with self.lock:
+            if force or self.age >= self.ttl:
+                try:
+                    fetched = call(self.exchange.fetch_tickers, weight=WEIGHTS["fetch_tickers"])
+                    self.tickers = {s: Ticker.from_ccxt(t) for s, t in fetched.items()}
+                    self.fetched_at = time.monotonic()
+                    self.stats["bulk"] += 1
+                except Exception as e:
+                    print(f"❌ Ticker snapshot failed, keeping one {self.age:.0f}s old: {e}")
+            else:
+                self.stats["hits"] += 1
+            return self.tickers
+
+    def prices(self, symbols):
+        """{symbol: last price} for a few symbols, e.g. the open positions.
+
+        Served from the snapshot while it is within the TTL. Past it, the
+        symbols are fetched one by one when that costs less request weight
+        than a new bulk snapshot, so a frequent caller with a handful of
+        symbols doesn't pull the whole market each time. Symbols whose
+        fetch failed are left out.
+        """
+        symbols = list(symbols)
+        if self.age >= self.ttl and len(symbols) * WEIGHTS["fetch_ticker"] < WEIGHTS["fetch_tickers"]:
+            self.stats["single"] += len(symbols)
+            fetched = fetch_tickers_many(self.exchange, symbols)
+            return {sym: t["last"] for sym, t in zip(symbols, fetched) if t is not None and t.get("last") is not None}
+        prices = {}
+        for sym in symbols:
+            try:
+                prices[sym] = self.last(sym)
+            except Exception as e:
+                print(f"❌ Error getting price for {sym}: {e}")
+        return prices
+
+    def last(self, symbol):
+        """Last traded price for symbol.
+
+        Falls back to a single fetch_ticker when the symbol is missing from
+        the snapshot or the snapshot is stale.
+        """
+        ticker = self.refresh().get(symbol)
+        if ticker is None or ticker.last is None or self.stale:
+            self.stats["single"] += 1
+            ticker = Ticker.from_ccxt(call(self.exchange.fetch_ticker, symbol, weight=WEIGHTS["fetch_ticker"]))
+        return ticker.last
@@ -0,0 +1,41 @@
+import numpy as np
+
+# Column layout of stacked candles, same as ccxt rows
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+def stack_candles(candles, length):
+    """Stack the newest `length` rows of each symbol into one (symbols, length, 6) array.
+
+    Symbols with fewer rows (or None) are padded at the front with nan, which
+    the signal functions treat as "no signal".
+    """
+    out = np.full((len(candles), length, 6), np.nan)
+    for i, rows in enumerate(candles):
+        if rows is None or not len(rows):
+            continue
+        rows = np.asarray(rows, dtype=np.float64)[-length:]
+        out[i, length - len(rows):] = rows
+    return out
+
+
+def buy_signals(open_, close, volume):
+    """Buy-signal mask over whole histories, shape (symbols, candles).
+
+    Same rule as scanner.check_buy_signal: the candle and the one before it
+    closed up, and volume rose on both of them.
+    """
+    up = close - open_ > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        volume_up = volume[:, 1:] / volume[:, :-1] - 1 > 0
+    signal = np.zeros(up.shape, dtype=bool)
+    signal[:, 2:] = up[:, 2:] & up[:, 1:-1] & volume_up[:, 1:] & volume_up[:, :-1]
+    return signal
+
+
+def latest_buy_signals(stacked):
+    """Buy-signal mask for the newest candle of every symbol in a stack_candles array."""
+    if stacked.shape[1] < 3:
+        return np.zeros(len(stacked), dtype=bool)
+    tail = stacked[:, -3:]
+    return buy_signals(tail[..., OPEN], tail[..., CLOSE], tail[..., VOLUME])[:, -1]
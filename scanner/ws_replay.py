@@ -0,0 +1,118 @@
+"""Local stand-in for the Binance combined stream endpoint.
+
+Record real frames once, then replay them to the scanner without network:
+
+  python ws_replay.py record frames.jsonl btcusdt@kline_1m ethusdt@miniTicker --seconds 300
+  python ws_replay.py serve frames.jsonl --port 8765 --speed 20 --drop-after 500
+
+and run the scanner with SCAN_MODE=stream BINANCE_WS_URL=ws://localhost:8765/stream.
+--drop-after closes the connection every N frames to exercise reconnects.
+Like the real stream, the replay keeps going while nobody is connected: the
+frames of the disconnected time (times --speed) are skipped, so that window
+must be filled over REST. stream_check.py runs this against KlineStream.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+
+from stream import BINANCE_WS_URL
+
+
+async def record(path, streams, seconds):
+    start = time.monotonic()
+    with open(path, "w") as out:
+        async with connect(BINANCE_WS_URL) as ws:
+            await ws.send(json.dumps({"method": "SUBSCRIBE", "params": streams, "id": 1}))
+            while time.monotonic() - start < seconds:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=seconds)
+                except asyncio.TimeoutError:
+                    break
+                if "data" in json.loads(raw):
+                    out.write(json.dumps({"t": time.monotonic() - start, "frame": raw}) + "\n")
+
+
+def load_frames(path):
+    with open(path) as f:
+        frames = [json.loads(line) for line in f if line.strip()]
+    for item in frames:
+        item["stream"] = json.loads(item["frame"])["stream"]
+    return frames
+
+
+async def replay(path, host, port, speed, drop_after):
+    frames = load_frames(path)
+    cursor = {"next": 0, "dropped_at": None}
+
+    async def handler(ws):
+        subscribed = set()
+
+        async def receive():
+            async for raw in ws:
+                msg = json.loads(raw)
+                params = set(msg.get("params", []))
+                if msg.get("method") == "SUBSCRIBE":
+                    subscribed.update(params)
+                    print(f"subscribed to {len(subscribed)} streams", flush=True)
+                elif msg.get("method") == "UNSUBSCRIBE":
+                    subscribed.difference_update(params)
+                await ws.send(json.dumps({"result": None, "id": msg.get("id")}))
+
+        receiver = asyncio.create_task(receive())
+        sent = 0
+        if cursor["dropped_at"] is not None and cursor["next"] < len(frames):
+            # Skip what the stream carried while the client was away
+            missed_until = frames[cursor["next"]]["t"] + (time.monotonic() - cursor["dropped_at"]) * speed
+            skipped = 0
+            while cursor["next"] < len(frames) and frames[cursor["next"]]["t"] < missed_until:
+                cursor["next"] += 1
+                skipped += 1
+            print(f"skipped {skipped} frames while disconnected", flush=True)
+        try:
+            while cursor["next"] < len(frames):
+                item = frames[cursor["next"]]
+                if cursor["next"]:
+                    gap = item["t"] - frames[cursor["next"] - 1]["t"]
+                    await asyncio.sleep(max(gap, 0) / speed)
+                cursor["next"] += 1
+                if item["stream"] not in subscribed:
+                    continue
+                await ws.send(item["frame"])
+                sent += 1
+                if drop_after and sent >= drop_after:
+                    print(f"dropping connection after {sent} frames", flush=True)
+                    return
+            print("replay finished", flush=True)
+            await ws.wait_closed()
+        finally:
+            receiver.cancel()
+            cursor["dropped_at"] = time.monotonic()
+
+    async with serve(handler, host, port):
+        print(f"replaying {len(frames)} frames on ws://{host}:{port}/stream", flush=True)
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    rec = sub.add_parser("record")
+    rec.add_argument("path")
+    rec.add_argument("streams", nargs="+")
+    rec.add_argument("--seconds", type=float, default=300)
+    srv = sub.add_parser("serve")
+    srv.add_argument("path")
+    srv.add_argument("--host", default="localhost")
+    srv.add_argument("--port", type=int, default=8765)
+    srv.add_argument("--speed", type=float, default=1.0)
+    srv.add_argument("--drop-after", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "record":
+        asyncio.run(record(args.path, args.streams, args.seconds))
+    else:
+        asyncio.run(replay(args.path, args.host, args.port, args.speed, args.drop_after))